@@ -72,6 +72,16 @@ class PIStageNew(PIStage):
 
         self.settings.New(ax_name + "_on_target", dtype=bool, ro=True)
 
+        # optional: poll position and motion with the single character commands #3 and #5, on target is confirmed
+        # with ONT? when an axis stops, the error is checked once per second
+        self.settings.New("fast_poll", dtype=bool, initial=False, ro=False)
+        self.settings.New("poll_interval", dtype=float, unit='s', si=False, spinbox_decimals=3, initial=0.05, vmin=0.001, ro=False)
+        self.settings.New("position_feed", dtype=str, initial='', ro=False)
+        self.position_feed = None  # PositionFeed while connected, read_snapshot() runs before it is created
+
+        # query functions, parameter types, axes and stages at connect instead of restoring them from the cache
+        self.settings.New("refresh_capabilities", dtype=bool, initial=False, ro=False)
+
         #===================================================================
         # self.rangemin = self.add_logged_quantity("rangemin", dtype=float, unit='mm', ro=True)
         # self.rangemax = self.add_logged_quantity("rangemax", dtype=float, unit='mm', ro=True)
@@ -0,0 +1,3 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks for the PIPython communication layers, run e.g. "python -m benchmarks.bench_read"."""
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the answers of the decoder fast paths with the generic parser and time both paths."""
+
+from __future__ import print_function
+from timeit import repeat
+
+try:
+    from pipython.pidevice.common import gcscommands_helpers
+    from pipython.pidevice.common.gcsdecoders import decodeoneitem, decodetwoitems, decodevalue
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.common import gcscommands_helpers
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.common.gcsdecoders import decodeoneitem, decodetwoitems, \
+        decodevalue
+
+ANSWERS = (
+    ('qPOS 1', '1=12.345678\n', '1', (float,)),
+    ('qONT', '1=1\n2=0\n3=1\n', None, (bool,)),
+    ('qPOS 16 axes', ''.join('%d=%.6f\n' % (i, i * 0.5) for i in range(1, 17)), None, (float,)),
+)
+
+TABLE = ('qSPA 4x8', ''.join('%d 0x%x=%.6f\n' % (axis, param, param * 0.1)
+                             for axis in range(1, 5) for param in range(1, 9)), None, None, (float,))
+
+
+def generic_oneitem(answer, items, valueconv):
+    """Parse 'answer' with getdict_oneitem() without the fast path."""
+    original = gcscommands_helpers.decodeoneitem
+    gcscommands_helpers.decodeoneitem = lambda *args: None
+    try:
+        return gcscommands_helpers.getdict_oneitem(answer, items, valueconv=valueconv)
+    finally:
+        gcscommands_helpers.decodeoneitem = original
+
+
+def generic_twoitems(answer, items1, items2, valueconv):
+    """Parse 'answer' with getdict_twoitems() without the fast path."""
+    original = gcscommands_helpers.decodetwoitems
+    gcscommands_helpers.decodetwoitems = lambda *args: None
+    try:
+        return gcscommands_helpers.getdict_twoitems(answer, items1, items2, [str, int], valueconv)
+    finally:
+        gcscommands_helpers.decodetwoitems = original
+
+
+def timeit(stmt, number):
+    """Return the best time per call of 'stmt' in microseconds."""
+    return min(repeat(stmt, number=number, repeat=5)) / number * 1E6
+
+
+def main(number=20000):
+    """Print the time per answer of the generic parser, the compatible fast path and the plain value."""
+    print('%14s %14s %16s %10s' % ('', 'generic [us]', 'fast path [us]', 'speedup'))
+    for name, answer, items, valueconv in ANSWERS:
+        itemslist = gcscommands_helpers.getitemslist(items) if items else None
+        assert decodeoneitem(answer, itemslist, None, valueconv) == generic_oneitem(answer, items, valueconv)
+        generic = timeit(lambda: generic_oneitem(answer, items, valueconv), number)
+        fast = timeit(lambda: decodeoneitem(answer, itemslist, None, valueconv), number)
+        print('%14s %14.2f %16.2f %10.1f' % (name, generic, fast, generic / fast))
+    name, answer, items1, items2, valueconv = TABLE
+    assert decodetwoitems(answer, [], [], [str, int], valueconv) == generic_twoitems(answer, items1, items2, valueconv)
+    generic = timeit(lambda: generic_twoitems(answer, items1, items2, valueconv), number // 10)
+    fast = timeit(lambda: decodetwoitems(answer, [], [], [str, int], valueconv), number // 10)
+    print('%14s %14.2f %16.2f %10.1f' % (name, generic, fast, generic / fast))
+    print('%14s %14s %16.2f' % ('decodevalue()', '', timeit(lambda: decodevalue(ANSWERS[0][1]), number)))
+
+
+if __name__ == '__main__':
+    main()
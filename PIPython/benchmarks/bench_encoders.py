@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the command strings of the encoder fast path of GCS2Commands.getcmdstr() with its generic code and
+time both paths."""
+
+from __future__ import print_function
+from timeit import repeat
+
+try:
+    from pipython.pidevice.common.gcscommands_helpers import getitemsvaluestuple
+    from pipython.pidevice.gcs2 import gcs2commands
+    from pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from pipython.pidevice.gcs2.gcs2encoders import encodecmd
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.common.gcscommands_helpers import getitemsvaluestuple
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2 import gcs2commands
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2encoders import encodecmd
+
+AXES = ('1', 'X', 'A1', 2)
+VALUES = (1.0, -0.000123456789012345, 1E-20, 12345678.9, 3, 0, True, False)
+FLOATFORMATS = ('.12g', 'f', 'e', '.3f')
+
+
+class NullMessages(object):
+    """Messages object that keeps the last command string and answers nothing."""
+
+    def __init__(self):
+        self.errcheck = False
+        self.sent = None
+
+    def send(self, tosend):
+        """Keep 'tosend'."""
+        self.sent = tosend
+
+
+def genericcmdstr(pidevice, cmd, *args):
+    """Return getcmdstr(cmd, *args) of 'pidevice' built by the generic code without fast path."""
+    gcs2commands.encodecmd = lambda cmd, args, floatformat: None
+    try:
+        return pidevice.getcmdstr(cmd, *args)
+    finally:
+        gcs2commands.encodecmd = encodecmd
+
+
+def verify(pidevice):
+    """Assert that the fast path returns the same strings as the generic code or None."""
+    numchecked = 0
+    for floatformat in FLOATFORMATS:
+        pidevice.floatformat = floatformat
+        for cmd in ('MOV', 'MVR', 'VEL'):
+            for axis in AXES:
+                for value in VALUES:
+                    args = getitemsvaluestuple(axis, value)
+                    expected = genericcmdstr(pidevice, cmd, *args)
+                    assert encodecmd(cmd, args, floatformat) in (expected, None), (cmd, axis, value)
+                    assert pidevice.getcmdstr(cmd, *args) == expected, (cmd, axis, value)
+                    numchecked += 1
+        for cmd in ('POS?', 'ONT?'):
+            for axis in AXES + (None, [], ['1', '2'], ' 1'):
+                expected = genericcmdstr(pidevice, cmd, axis)
+                assert encodecmd(cmd, (axis,), floatformat) in (expected, None), (cmd, axis)
+                assert pidevice.getcmdstr(cmd, axis) == expected, (cmd, axis)
+                numchecked += 1
+    pidevice.floatformat = '.12g'
+    return numchecked
+
+
+def timeit(stmt, number):
+    """Return the best time per call of 'stmt' in microseconds."""
+    return min(repeat(stmt, number=number, repeat=5)) / number * 1E6
+
+
+def main(number=20000):
+    """Print the time per command string of both paths and per call of MOV()."""
+    msgs = NullMessages()
+    pidevice = GCS2Commands(msgs)
+    print('%d argument combinations are byte-identical' % verify(pidevice))
+    cases = (
+        ('MOV 1 float', ('MOV',) + getitemsvaluestuple('1', 0.123456)),
+        ('MVR 1 int', ('MVR',) + getitemsvaluestuple('1', 1)),
+        ('POS? 1', ('POS?', '1')),
+        ('ONT?', ('ONT?', None)),
+    )
+    print('%14s %16s %16s %10s' % ('', 'generic [us]', 'fast path [us]', 'speedup'))
+    for name, args in cases:
+        fasttime = timeit(lambda: pidevice.getcmdstr(*args), number)  # Cell variable pylint: disable=W0640
+        gcs2commands.encodecmd = lambda cmd, args, floatformat: None
+        try:
+            generictime = timeit(lambda: pidevice.getcmdstr(*args), number)  # Cell variable pylint: disable=W0640
+        finally:
+            gcs2commands.encodecmd = encodecmd
+        print('%14s %16.2f %16.2f %10.1f' % (name, generictime, fasttime, generictime / fasttime))
+    print('%14s %16s %16.2f' % ('MOV() call', '', timeit(lambda: pidevice.MOV('1', 0.123456), number)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure the cold start time of importing pipython and the PI_App plugin, each in a new interpreter."""
+
+from __future__ import print_function
+import os
+import subprocess
+import sys
+
+try:
+    import pipython  # pylint: disable=W0611
+    PACKAGE = 'pipython'
+except ImportError:
+    PACKAGE = 'PI_ScopeFoundry.PIPython.pipython'
+
+# Root directory of the plugin with PI_App.py.
+PLUGINDIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CASES = (
+    ('from pipython import GCSDevice', 'from %s import GCSDevice' % PACKAGE),
+    ('+ first GCSDevice access', 'from %s import GCSDevice\nfrom %s import GCS2Device' % (PACKAGE, PACKAGE)),
+    ('+ numpy for arraymode', 'from %s.pidevice.gcsmessages import importnumpy\nimportnumpy()' % PACKAGE),
+    ('launch PI_App', 'import PI_App\nimport PI_hardware'),
+)
+
+CHILD = '''
+from time import perf_counter
+start = perf_counter()
+exec(compile(%r, '<bench>', 'exec'))
+print(perf_counter() - start)
+'''
+
+
+def coldstart(stmt):
+    """Return the time in seconds to execute 'stmt' in a new interpreter or the error as string."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([PLUGINDIR] + [path for path in sys.path if path])
+    proc = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', CHILD % stmt], cwd=PLUGINDIR, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    out, err = proc.communicate()
+    if proc.returncode:
+        return err.strip().splitlines()[-1]
+    return float(out)
+
+
+def main(repeat=7):
+    """Print the best and the median time of 'repeat' cold starts per case."""
+    print('%28s %12s %12s' % ('', 'best [ms]', 'median [ms]'))
+    for name, stmt in CASES:
+        times = [coldstart(stmt) for _ in range(repeat)]
+        if not isinstance(times[0], float):
+            print('%28s skipped: %s' % (name, times[0]))
+            continue
+        times.sort()
+        print('%28s %12.1f %12.1f' % (name, times[0] * 1E3, times[len(times) // 2] * 1E3))
+
+
+if __name__ == '__main__':
+    main()
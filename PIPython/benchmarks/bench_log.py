@@ -0,0 +1,59 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the cost of a logged query with the background GCSLogger and the former synchronous logging."""
+
+from __future__ import print_function
+import os
+import tempfile
+from timeit import repeat
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.gcslogger import GCSLogger
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcslogger import GCSLogger
+
+from .gateways import ChunkGateway
+
+
+class LegacyLogger(object):
+    """Former logging of GCSMessages: open, append and close the log file for every message."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def log(self, direction, connectionid, msg):  # Unused argument pylint: disable=W0613
+        """Save (i.e. append) 'msg' to self.filepath."""
+        msg = str(msg.encode('cp1252'))
+        msg = '%r' % msg.rstrip('\n')
+        msg = msg.lstrip("'").rstrip("'")
+        with open(self.filepath, 'a') as fobj:
+            fobj.write('%s\n' % msg)
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+
+def main(number=2000):
+    """Print the time per qPOS() call without logging, with the former and with the background logger."""
+    tmpdir = tempfile.mkdtemp()
+    loggers = (
+        ('no logging', lambda: None),
+        ('legacy', lambda: LegacyLogger(os.path.join(tmpdir, 'legacy.log'))),
+        ('GCSLogger text', lambda: GCSLogger(os.path.join(tmpdir, 'text.log'))),
+        ('GCSLogger binary', lambda: GCSLogger(os.path.join(tmpdir, 'binary.log'), binary=True)),
+    )
+    print('%18s %14s' % ('', 'qPOS() [us]'))
+    for name, makelogger in loggers:
+        with ChunkGateway({'POS? 1': '1=1.2345\n'}) as gateway:
+            pidevice = GCS2Device(gateway=gateway)
+            pidevice.logger = makelogger()
+            duration = min(repeat(lambda: pidevice.qPOS('1'), number=number, repeat=3)) / number  # pylint: disable=W0640
+            pidevice.logger = None
+        print('%18s %14.1f' % (name, duration * 1E6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure qSPA() and getparam() with and without the parameter cache against the simulated controller."""
+
+from __future__ import print_function
+from time import perf_counter
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+PARAMS = (0x0A, 0x0B, 0x0C, 0x36)
+
+
+def timecalls(func, number):
+    """Return the time per call of 'func' in microseconds."""
+    start = perf_counter()
+    for _ in range(number):
+        func()
+    return (perf_counter() - start) / number * 1E6
+
+
+def main(number=500):
+    """Print the time per call without and with the parameter cache and the hit rate."""
+    server = SimServer(SimController(), port=0)
+    pidevice = GCS2Device(gateway=PISocket(port=server.port))
+    cases = (
+        ('qSPA 1 param', lambda: pidevice.qSPA('1', PARAMS[0])),
+        ('qSPA 4 params', lambda: pidevice.qSPA(['1'] * len(PARAMS), PARAMS)),
+        ('getparam()', lambda: pidevice.getparam(0x0E000200)),
+    )
+    try:
+        print('%16s %14s %14s' % ('', 'no cache [us]', 'cache [us]'))
+        for name, func in cases:
+            pidevice.paramcache = None
+            uncached = timecalls(func, number)
+            pidevice.paramcache = True
+            cached = timecalls(func, number)
+            print('%16s %14.1f %14.1f' % (name, uncached, cached))
+        print('hit rate %.3f' % pidevice.paramcache.stats['hitrate'])
+    finally:
+        pidevice.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
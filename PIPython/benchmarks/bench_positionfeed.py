@@ -0,0 +1,52 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure the cost of publishing positions to shared memory and of reading them in another process."""
+
+from __future__ import print_function
+import multiprocessing
+from time import perf_counter
+
+try:
+    from pipython.pitools.positionfeed import PositionFeed, PositionReader
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pitools.positionfeed import PositionFeed, PositionReader
+
+NAME = 'bench_positionfeed'
+
+
+def readloop(numreads, results):
+    """Read the latest and the recent samples 'numreads' times while the feed is written, put the times in us."""
+    with PositionReader(NAME) as reader:
+        start = perf_counter()
+        for _ in range(numreads):
+            reader.latest()
+        latest = (perf_counter() - start) / numreads * 1E6
+        start = perf_counter()
+        for _ in range(numreads // 10):
+            reader.recent(1000)
+        recent = (perf_counter() - start) / (numreads // 10) * 1E6
+    results.put((latest, recent))
+
+
+def main(numaxes=3, numsamples=200000, numreads=20000):
+    """Print the time per publish() and per read in the reader process."""
+    axes = [str(i + 1) for i in range(numaxes)]
+    with PositionFeed(NAME, axes) as feed:
+        feed.publish([0.] * numaxes, [True] * numaxes)
+        results = multiprocessing.Queue()
+        reader = multiprocessing.Process(target=readloop, args=(numreads, results))
+        reader.start()
+        start = perf_counter()
+        for i in range(numsamples):
+            feed.publish([i * 1E-3] * numaxes, [True] * numaxes)
+        publish = (perf_counter() - start) / numsamples * 1E6
+        latest, recent = results.get()
+        reader.join()
+    print('%24s %12s' % ('', 'time [us]'))
+    print('%24s %12.2f' % ('publish()', publish))
+    print('%24s %12.2f' % ('latest()', latest))
+    print('%24s %12.2f' % ('recent(1000)', recent))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare GCSMessages._read with the former string based receive loop for large answers."""
+
+from __future__ import print_function
+from timeit import repeat
+
+try:
+    from pipython.pidevice.gcsmessages import GCSMessages, eol
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsmessages import GCSMessages, eol
+
+from .gateways import ChunkGateway
+
+
+def legacy_read(msgs, stopon):
+    """Former implementation of GCSMessages._read, kept as reference."""
+    # Access to a protected member of a client class pylint: disable=W0212
+    rcvbuf = u''
+    while not eol(rcvbuf):
+        received = msgs._interface.read()
+        if received:
+            rcvbuf += received.decode(encoding='cp1252', errors='ignore')
+        if stopon and stopon in rcvbuf.upper():
+            break
+    for i, char in enumerate(rcvbuf[:-1]):
+        if char == '\n' or char == '\r':
+            if i > 0 and rcvbuf[i - 1] != ' ':
+                raise ValueError('LF/CR at %d' % i)
+    return rcvbuf
+
+
+def makeanswer(numlines):
+    """Return a multi-line answer like qHPA with 'numlines' lines."""
+    line = '0x%08x= \t0\t1\tINT\tmotorcontroller\tP term 1 \n'
+    return ''.join(line % i for i in range(numlines - 1)) + 'end of help\n'
+
+
+def makeheader(numlines):
+    """Return a GCS data header like qDRR with 'numlines' lines."""
+    line = '# NAME%d = Commanded Position of Axis AXIS:1 \n'
+    return ''.join(line % i for i in range(numlines)) + '# END_HEADER \n'
+
+
+def main(sizes=(10, 100, 1000, 5000), chunksize=64, number=5):
+    """Print the time for reading answers of different sizes with both implementations."""
+    print('answer until LF without preceeding SPACE (e.g. qHPA)')
+    compare(makeanswer, None, sizes, chunksize, number)
+    print('answer until "# END_HEADER" (e.g. qDRR header)')
+    compare(makeheader, '# END_HEADER', sizes, chunksize, number)
+
+
+# Too many arguments pylint: disable=R0913
+def compare(makefunc, stopon, sizes, chunksize, number):
+    """Print the time for reading answers created by 'makefunc' with both implementations."""
+    # Access to a protected member of a client class pylint: disable=W0212
+    print('%8s %10s %12s %12s %8s' % ('lines', 'bytes', 'legacy [ms]', 'new [ms]', 'speedup'))
+    for numlines in sizes:
+        answer = makefunc(numlines)
+        gateway = ChunkGateway({'HPA?': answer}, chunksize=chunksize)
+        msgs = GCSMessages(gateway)
+
+        def legacy():
+            gateway.send('HPA?\n')
+            assert legacy_read(msgs, stopon) == answer
+
+        def new():
+            gateway.send('HPA?\n')
+            assert msgs._read(stopon) == answer
+
+        tlegacy = min(repeat(legacy, number=number, repeat=3)) / number
+        tnew = min(repeat(new, number=number, repeat=3)) / number
+        print('%8d %10d %12.3f %12.3f %7.1fx' % (numlines, len(answer), tlegacy * 1E3, tnew * 1E3, tlegacy / tnew))
+
+
+if __name__ == '__main__':
+    main()
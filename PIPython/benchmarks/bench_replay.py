@@ -0,0 +1,56 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Record a session against the simulated controller and replay it to measure the overhead of PIPython alone."""
+
+from __future__ import print_function
+import os
+import tempfile
+from time import perf_counter
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.interfaces.pireplay import RecordingGateway, ReplayGateway
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pireplay import RecordingGateway, ReplayGateway
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+
+def session(gateway, numsteps):
+    """Connect, reference and step axis 1 like the voice coil plugin."""
+    pidevice = GCS2Device(gateway=gateway)
+    pidevice.qIDN()
+    pidevice.SVO('1', 1)
+    pidevice.FRF('1')
+    while not pidevice.qFRF('1')['1']:
+        pass
+    for i in range(numsteps):
+        pidevice.MOV('1', (i % 2) * 0.05)
+        while not pidevice.qONT('1')['1']:
+            pass
+        pidevice.qPOS('1')
+
+
+def main(numsteps=50):
+    """Print the duration of a recorded session and of its replays."""
+    filepath = os.path.join(tempfile.mkdtemp(), 'session.bin')
+    with SimServer(SimController(), port=0) as server:
+        start = perf_counter()
+        with RecordingGateway(PISocket(port=server.port), filepath) as gateway:
+            session(gateway, numsteps)
+        recorded = perf_counter() - start
+    print('%26s %12s' % ('', 'time [ms]'))
+    print('%26s %12.1f' % ('recorded', recorded * 1E3))
+    for name, realtime in (('replay with timing', True), ('replay as fast as possible', False)):
+        start = perf_counter()
+        with ReplayGateway(filepath, realtime=realtime) as gateway:
+            session(gateway, numsteps)
+            assert gateway.done
+        print('%26s %12.1f' % (name, (perf_counter() - start) * 1E3))
+
+
+if __name__ == '__main__':
+    main()
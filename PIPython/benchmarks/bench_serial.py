@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure latency, CPU load and throughput of PISerial with and without reader thread over a pseudo terminal.
+The responder runs in a child process, so the CPU load is that of the reading process only. The CPU load is
+measured while querying back to back and while waiting for a slow answer."""
+
+from __future__ import print_function
+import multiprocessing
+import os
+from time import perf_counter, process_time, sleep
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.interfaces.piserial import PISerial
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.piserial import PISerial
+
+ANSWERS = {b'POS? 1\n': b'1=1.2345\n', b'ERR?\n': b'0\n'}
+
+# Queries answered after SLOWDELAY seconds to measure the CPU load while waiting.
+SLOWANSWERS = {b'*IDN?\n': b'(c)2017 Physik Instrumente (PI) GmbH & Co. KG, E-709, 0, 1.0\n'}
+SLOWDELAY = 0.05
+
+
+def respond(master, answer):
+    """Answer each line received on the pseudo terminal 'master' from ANSWERS, other lines with 'answer'."""
+    rcvbuf = b''
+    while True:
+        try:
+            rcvbuf += os.read(master, 4096)
+        except OSError:
+            return
+        while b'\n' in rcvbuf:
+            line, rcvbuf = rcvbuf.split(b'\n', 1)
+            line += b'\n'
+            if line in SLOWANSWERS:
+                sleep(SLOWDELAY)
+                os.write(master, SLOWANSWERS[line])
+            else:
+                os.write(master, ANSWERS.get(line, answer))
+
+
+def cpuload(func, repeat):
+    """Return (wall time in seconds, CPU load of this process in percent) of 'repeat' calls of 'func'."""
+    wall, cpu = perf_counter(), process_time()
+    for _ in range(repeat):
+        func()
+    wall, cpu = perf_counter() - wall, process_time() - cpu
+    return wall, cpu / wall * 100.
+
+
+def measure(portname, reader, numqueries):
+    """Return (latency in ms, CPU load in percent, CPU load while waiting in percent, throughput in kB/s)
+    of qPOS(), of a slow qIDN() and of a large answer."""
+    with PISerial(portname, 115200, reader=reader) as gateway:
+        pidevice = GCS2Device(gateway=gateway)
+        pidevice.qPOS('1')
+        wall, busy = cpuload(lambda: pidevice.qPOS('1'), numqueries)
+        idle = cpuload(pidevice.qIDN, 20)[1]
+        gateway.resetstats()
+        for _ in range(10):
+            pidevice.qHLP()
+        throughput = gateway.stats['throughput']
+    return wall / numqueries * 1E3, busy, idle, throughput / 1E3
+
+
+def main(numqueries=500):
+    """Print the results for PISerial without and with reader thread."""
+    import tty  # POSIX only
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    answer = (' \n'.join('line %d of a long answer' % i for i in range(2000)) + '\n').encode()
+    responder = multiprocessing.get_context('fork').Process(target=respond, args=(master, answer))
+    responder.daemon = True
+    responder.start()
+    try:
+        print('%8s %14s %10s %15s %18s' % ('reader', 'latency [ms]', 'CPU [%]', 'CPU wait [%]',
+                                           'throughput [kB/s]'))
+        for reader in (False, True):
+            print('%8s %14.3f %10.1f %15.1f %18.1f' % ((reader,) + measure(os.ttyname(slave), reader, numqueries)))
+    finally:
+        responder.terminate()
+
+
+if __name__ == '__main__':
+    main()
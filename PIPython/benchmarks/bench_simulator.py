@@ -0,0 +1,80 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure typical plugin workloads against the simulated controller over TCP/IP and throttled serial links."""
+
+from __future__ import print_function
+from time import perf_counter
+
+try:
+    from pipython.pidevice.gcsdevice import GCSDevice
+    from pipython.pidevice.gcs2.gcs2datarectools import Datarecorder
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsdevice import GCSDevice
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2datarectools import Datarecorder
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+# Link name: (latency in seconds, baud rate or None)
+LINKS = (
+    ('tcp', 0., None),
+    ('rs232 115200', 0.001, 115200),
+    ('rs232 9600', 0.001, 9600),
+)
+
+
+def moveloop(pidevice, numsteps, stepsize=0.05):
+    """Step axis 1 like PI_VC_Device.move_and_wait() and return the mean time per step in ms."""
+    start = perf_counter()
+    for i in range(numsteps):
+        pidevice.MOV('1', (i % 2) * stepsize)
+        while not pidevice.qONT('1')['1']:
+            pass
+    return (perf_counter() - start) / numsteps * 1E3
+
+
+def wavescan(pidevice, numpoints=1000, numcycles=5):
+    """Upload a sine scan, run it and wait until the wave generator stops, return the time in ms."""
+    start = perf_counter()
+    pidevice.WAV_SIN_P(1, 0, numpoints, 'X', numpoints // 2, 0.5, 0., numpoints)
+    pidevice.WSL(1, 1)
+    pidevice.WGC(1, numcycles)
+    pidevice.WGO(1, 1)
+    while pidevice.IsGeneratorRunning()[1]:
+        pass
+    return (perf_counter() - start) * 1E3
+
+
+def readout(pidevice, numvalues):
+    """Record commanded and actual position during a move and return the time of the readout in ms."""
+    recorder = Datarecorder(pidevice)
+    recorder.numvalues = numvalues
+    recorder.options = (1, 2)
+    recorder.sources = '1'
+    recorder.trigsources = 1
+    recorder.arm()
+    pidevice.MOV('1', 0.1)
+    recorder.wait()
+    start = perf_counter()
+    recorder.read()
+    return (perf_counter() - start) * 1E3
+
+
+def main(numsteps=20, numvalues=200):
+    """Print the durations of the workloads for each link."""
+    print('%14s %14s %14s %14s' % ('link', 'step [ms]', 'wave [ms]', 'readout [ms]'))
+    for name, latency, baudrate in LINKS:
+        with SimServer(SimController(), port=0, latency=latency, baudrate=baudrate) as server:
+            with PISocket(port=server.port) as gateway:
+                pidevice = GCSDevice(gateway=gateway)
+                pidevice.SVO('1', 1)
+                pidevice.FRF('1')
+                while not pidevice.qFRF('1')['1']:
+                    pass
+                results = (moveloop(pidevice, numsteps), wavescan(pidevice), readout(pidevice, numvalues))
+            print('%14s %14.1f %14.1f %14.1f' % ((name,) + results))
+
+
+if __name__ == '__main__':
+    main()
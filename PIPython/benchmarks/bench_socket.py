@@ -0,0 +1,121 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure throughput and CPU load of PISocket for large answers, e.g. of "DRR?", with different buffer sizes.
+
+The baseline is the former read path: recv(2048) polled without select() and the answer checked with the
+NOEOL regex only. The second row keeps the former socket read and adds the line break count of
+GCSMessages._check_no_eol(), so the effect of the answer check and of recv_into() are shown separately.
+"""
+
+from __future__ import print_function
+import socket
+from statistics import median
+from threading import Thread
+from time import perf_counter, process_time
+
+try:
+    from pipython.pidevice import GCSError, gcserror
+    from pipython.pidevice.gcsmessages import GCSMessages, NOEOL
+    from pipython.pidevice.interfaces.pisocket import PISocket
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError, gcserror
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsmessages import GCSMessages, NOEOL
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+
+
+class LegacySocket(PISocket):
+    """PISocket that returns a new bytes object of at most 2048 bytes per read() and polls the socket."""
+
+    def read(self):
+        """Return received bytes or an empty string if no data is available."""
+        try:
+            return self._socket.recv(2048)
+        except IOError:
+            return b''
+
+
+class LegacyMessages(GCSMessages):
+    """GCSMessages that checks each answer with the NOEOL regex only, like before the line break count."""
+
+    @staticmethod
+    def _check_no_eol(answer):
+        """Check that 'answer' does not contain a LF without a preceeding SPACE except at the end."""
+        if not isinstance(answer, (bytes, bytearray)):
+            answer = answer.encode('cp1252', 'ignore')
+        match = NOEOL.search(answer)
+        if match:
+            raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, '@ LegacyMessages._check_no_eol')
+
+
+class BulkServer(object):
+    """Answer every line received on a socket with the same prepared answer, sent with a single sendall()."""
+
+    def __init__(self, answer, port):
+        self._answer = answer.encode('cp1252')
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('localhost', port))
+        self._server.listen(1)
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        """Serve connections one after the other."""
+        while True:
+            conn = self._server.accept()[0]
+            with conn:
+                rcvbuf = b''
+                while True:
+                    received = conn.recv(4096)
+                    if not received:
+                        break
+                    rcvbuf += received
+                    while b'\n' in rcvbuf:
+                        rcvbuf = rcvbuf.split(b'\n', 1)[1]
+                        conn.sendall(self._answer)
+
+
+def getanswer(numlines):
+    """Return a "DRR?" like answer with 'numlines' lines of two columns."""
+    header = '# REM E-712 \n# NAME0 = Target Position of axis1 \n# END_HEADER \n'
+    lines = ['%.6f %.6f \n' % (i * 1E-3, i * 2E-3) for i in range(numlines)]
+    return header + ''.join(lines)[:-2] + '\n'
+
+
+def measure(gatewaytype, messagestype, port, numreads, **kwargs):
+    """Return (throughput in MB/s, CPU time per MB in ms) of 'numreads' complete answers."""
+    with gatewaytype(port=port, **kwargs) as gateway:
+        msgs = messagestype(gateway)
+        gateway.send('DRR?\n')
+        numbytes = len(msgs._read(stopon=None))  # Access to a protected member pylint: disable=W0212
+        wall, cpu = perf_counter(), process_time()
+        for _ in range(numreads):
+            gateway.send('DRR?\n')
+            msgs._read(stopon=None)  # Access to a protected member pylint: disable=W0212
+        wall, cpu = perf_counter() - wall, process_time() - cpu
+    megabytes = numbytes * numreads / 1E6
+    return megabytes / wall, cpu / megabytes * 1E3
+
+
+def main(port=50124, numlines=100000, numreads=10, repeat=5):
+    """Print median and range of throughput and the median CPU load of the former and the zero-copy
+    read path over 'repeat' runs."""
+    answer = getanswer(numlines)
+    BulkServer(answer, port)
+    cases = [('recv(2048), regex (baseline)', LegacySocket, LegacyMessages, {}),
+             ('recv(2048), line count', LegacySocket, GCSMessages, {})]
+    cases.extend(('recv_into(%d), line count' % bufsize, PISocket, GCSMessages, {'bufsize': bufsize})
+                 for bufsize in (2048, 16384, 65536, 262144))
+    print('answer size: %.1f MB, %d runs' % (len(answer) / 1E6, repeat))
+    print('%-32s %12s %16s %16s' % ('', 'MB/s', 'MB/s min..max', 'CPU [ms/MB]'))
+    for name, gatewaytype, messagestype, kwargs in cases:
+        results = [measure(gatewaytype, messagestype, port, numreads, **kwargs) for _ in range(repeat)]
+        throughputs = [result[0] for result in results]
+        print('%-32s %12.1f %16s %16.1f' % (name, median(throughputs), '%.0f..%.0f' % (min(throughputs),
+                                                                                     max(throughputs)),
+                                              median(result[1] for result in results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure the latency of STP while other threads poll qPOS() in tight loops, with the former RLock
+and with the PriorityLock of GCSMessages."""
+
+from __future__ import print_function
+from threading import RLock, Thread
+from time import perf_counter, sleep
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+
+from .gateways import ChunkGateway
+
+
+class LegacyLock(object):
+    """Former lock of GCSMessages: an RLock that ignores priorities."""
+
+    def __init__(self):
+        self._lock = RLock()
+
+    def __call__(self, priority=None):
+        return self
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._lock.release()
+
+    def acquire(self, priority=None):  # Unused argument pylint: disable=W0613
+        """Acquire the RLock."""
+        return self._lock.acquire()
+
+    def release(self):
+        """Release the RLock."""
+        self._lock.release()
+
+
+def measure(legacy, numpollers, numstops, delay):
+    """Return the list of STP() durations in seconds while 'numpollers' threads call qPOS()."""
+    # Access to a protected member of a client class pylint: disable=W0212
+    with ChunkGateway({'POS? 1': '1=1.2345\n'}, delay=delay) as gateway:
+        pidevice = GCS2Device(gateway=gateway)
+        if legacy:
+            pidevice._msgs._lock = LegacyLock()
+        running = [True]
+
+        def poll():
+            while running[0]:
+                pidevice.qPOS('1')
+
+        threads = [Thread(target=poll) for _ in range(numpollers)]
+        for thread in threads:
+            thread.start()
+        durations = []
+        for _ in range(numstops):
+            sleep(0.01)
+            start = perf_counter()
+            pidevice.STP()
+            durations.append(perf_counter() - start)
+        running[0] = False
+        for thread in threads:
+            thread.join()
+    return durations
+
+
+def main(numpollers=(1, 3, 6), numstops=50, delay=0.001):
+    """Print mean and worst case latency of STP() for different numbers of polling threads."""
+    print('transfer time of the simulated link: %.1f ms per write' % (delay * 1E3))
+    print('%8s %24s %24s' % ('', 'RLock', 'PriorityLock'))
+    print('%8s %11s %12s %11s %12s' % ('pollers', 'mean [ms]', 'max [ms]', 'mean [ms]', 'max [ms]'))
+    for num in numpollers:
+        results = []
+        for legacy in (True, False):
+            durations = measure(legacy, num, numstops, delay)
+            results.extend([sum(durations) / len(durations) * 1E3, max(durations) * 1E3])
+        print('%8d %11.2f %12.2f %11.2f %12.2f' % tuple([num] + results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Measure reply latency and CPU load of GCSMessages with and without blocking waits against ReplyServer."""
+
+from __future__ import print_function
+from time import perf_counter, process_time
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.replyserver import ReplyServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.replyserver import ReplyServer
+
+
+class SpinningSocket(PISocket):
+    """PISocket that does not block while waiting, i.e. the former busy loop in GCSMessages._read."""
+
+    def waitfordata(self, timeout):
+        """Return immediately."""
+        return True
+
+
+def measure(gatewaytype, port, numqueries):
+    """Return (mean latency in ms, CPU load in percent) of 'numqueries' calls of qPOS()."""
+    with gatewaytype(port=port) as gateway:
+        pidevice = GCS2Device(gateway=gateway)
+        pidevice.qPOS('1')
+        wall, cpu = perf_counter(), process_time()
+        for _ in range(numqueries):
+            pidevice.qPOS('1')
+        wall, cpu = perf_counter() - wall, process_time() - cpu
+    return wall / numqueries * 1E3, cpu / wall * 100.
+
+
+def main(port=50123, numqueries=100, delays=(0, 5, 20)):
+    """Print latency and CPU load for different reply delays of the server."""
+    print('%10s %22s %22s' % ('', 'busy loop', 'blocking wait'))
+    print('%10s %11s %10s %11s %10s' % ('delay [ms]', 'latency [ms]', 'CPU [%]', 'latency [ms]', 'CPU [%]'))
+    with ReplyServer(port=port) as server:
+        server.append('POS? 1\n', '1=1.2345\n')
+        server.append('ERR?\n', '0\n')
+        for delay in delays:
+            server.delay = delay
+            spin = measure(SpinningSocket, port, numqueries)
+            wait = measure(PISocket, port, numqueries)
+            print('%10d %11.3f %10.1f %11.3f %10.1f' % ((delay,) + spin + wait))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the upload of a user-defined wave table point by bunch with WAV_PNT() and with uploadwavepoints()
+against the simulated controller over TCP/IP and a throttled serial link."""
+
+from __future__ import print_function
+import os
+from time import perf_counter
+
+try:
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.gcs2.gcs2waveupload import formatwavepoints, uploadwavepoints
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2waveupload import formatwavepoints, uploadwavepoints
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+WAVEFORM = os.path.join(os.path.dirname(__file__), '..', '..', 'PI_stage', 'waveform', 'waveform.txt')
+
+# Link name: (latency in seconds, baud rate or None)
+LINKS = (
+    ('tcp', 0., None),
+    ('rs232 115200', 0.001, 115200),
+)
+
+
+def loadwaveform():
+    """Return the points of the custom profile as numpy array or a sine of the same length."""
+    import numpy
+    if os.path.isfile(WAVEFORM):
+        return numpy.loadtxt(WAVEFORM)
+    return numpy.sin(numpy.linspace(0., 2 * numpy.pi, 3946))
+
+
+def legacyupload(pidevice, wavetable, wavepoints, bunchsize):
+    """Upload like the former writewavepoints(): one WAV_PNT() with error check per bunch."""
+    for startindex in range(0, len(wavepoints), bunchsize):
+        bunch = wavepoints[startindex:startindex + bunchsize]
+        pidevice.WAV_PNT(table=wavetable, firstpoint=startindex + 1, numpoints=len(bunch),
+                         append='&' if startindex else 'X', wavepoint=bunch)
+
+
+def timeit(func, repeat=3):
+    """Return the best time of 'repeat' calls of 'func' in ms."""
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append((perf_counter() - start) * 1E3)
+    return min(times)
+
+
+def main(bunchsize=50):
+    """Print the formatting time and the upload times for each link."""
+    points = loadwaveform()
+    values = points.tolist()
+    offline = GCS2Device()
+    legacyformat = timeit(lambda: offline.getcmdstr('WAV', 1, 'X', 'PNT', 1, len(values), values))
+    fastformat = timeit(lambda: formatwavepoints(points))
+    print('%d points, format: getcmdstr %.2f ms, formatwavepoints %.2f ms' % (len(values), legacyformat, fastformat))
+    print('%14s %18s %14s %14s' % ('link', 'WAV_PNT(%d) [ms]' % bunchsize, 'upload [ms]', 'verified [ms]'))
+    for name, latency, baudrate in LINKS:
+        with SimServer(SimController(), port=0, latency=latency, baudrate=baudrate) as server:
+            pidevice = GCS2Device(gateway=PISocket(port=server.port))
+            legacy = timeit(lambda: legacyupload(pidevice, 1, values, bunchsize))
+            upload = timeit(lambda: uploadwavepoints(pidevice, 1, points))
+            verified = timeit(lambda: uploadwavepoints(pidevice, 1, points, verify=True))
+        print('%14s %18.1f %14.1f %14.1f' % (name, legacy, upload, verified))
+
+
+if __name__ == '__main__':
+    main()
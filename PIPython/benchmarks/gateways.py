@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""In-memory gateways that serve prepared answers, used by the benchmarks."""
+
+from time import sleep
+
+try:
+    from pipython.pidevice.interfaces.pigateway import PIGateway
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pigateway import PIGateway
+
+
+class ChunkGateway(PIGateway):
+    """Answer every query with a prepared reply which is returned in chunks of 'chunksize' bytes."""
+
+    def __init__(self, replies, chunksize=64, delay=0):
+        """Answer every query with a prepared reply.
+        @param replies : Dictionary {command: answer} with command and answer as string with trailing LF.
+        @param chunksize : Number of bytes returned by each call of read() as integer.
+        @param delay : Time in seconds each call of send() takes, simulates the transfer time of a slow link.
+        """
+        self._delay = delay
+        self._replies = dict((cmd, answer.encode('cp1252')) for cmd, answer in replies.items())
+        self._chunksize = chunksize
+        self._outbuf = b''
+        self._pos = 0
+        self._timeout = 7000
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return 'ChunkGateway(chunksize=%d)' % self._chunksize
+
+    @property
+    def timeout(self):
+        """Return timeout in milliseconds."""
+        return self._timeout
+
+    def settimeout(self, value):
+        """Set timeout to 'value' in milliseconds."""
+        self._timeout = value
+
+    @property
+    def connected(self):
+        """Return True if a device is connected."""
+        return True
+
+    @property
+    def connectionid(self):
+        """Return 0 as ID of current connection."""
+        return 0
+
+    def send(self, msg):
+        """Queue the prepared answers of all commands in 'msg'.
+        @param msg : String to send.
+        """
+        if self._delay:
+            sleep(self._delay)
+        answers = []
+        for line in msg.splitlines():
+            answers.append(self._replies.get(line, b'0\n' if line == 'ERR?' else b''))
+        self._outbuf = self._outbuf[self._pos:] + b''.join(answers)
+        self._pos = 0
+
+    def read(self):
+        """Return the next chunk of the prepared answer.
+        @return : Answer as bytes.
+        """
+        chunk = self._outbuf[self._pos:self._pos + self._chunksize]
+        self._pos += len(chunk)
+        return chunk
+
+    def flush(self):
+        """Flush input buffer."""
+        self._outbuf = b''
+        self._pos = 0
+
+    def close(self):
+        """Nothing to close."""
@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 """Collection of libraries to use PI controllers and process GCS data."""
 
-from PI_ScopeFoundry.PIPython.pipython.pidevice import GCS2Device, GCS21Device, GCS2Commands, GCS21Commands
-from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSDevice
+import sys
+
+from PI_ScopeFoundry.PIPython.pipython import pidevice
 from PI_ScopeFoundry.PIPython.pipython.pidevice import gcserror
 from PI_ScopeFoundry.PIPython.pipython.pidevice.gcserror import GCSError
 
@@ -11,3 +12,21 @@ __all__ = ['GCSDevice', 'GCS2Device', 'GCS21Device', 'GCS2Commands', 'GCS21Comma
 
 __version__ = '2.1.1.2'
 __signature__ = 0x8f8860f2b9455c2537de2645ee76d840
+
+
+def __getattr__(name):
+    """Import the classes in __all__ from pipython.pidevice on first access (PEP 562)."""
+    if name not in __all__:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(pidevice, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):  # no module __getattr__, import the classes now
+    for _name in __all__:
+        __getattr__(_name)
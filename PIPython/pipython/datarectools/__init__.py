@@ -2,19 +2,43 @@
 # -*- coding: utf-8 -*-
 """Collection of interfaces to PI controllers."""
 
-# Wildcard import datarectools pylint: disable=W0401
-from .datarectools import *
+from importlib import import_module
+import sys
 
-try:
-    # Wildcard import pipython.gcs2.gcs2datarectools pylint: disable=W0401
-    from pipython.pidevice.gcs2.gcs2datarectools import *
-except ImportError:
-    pass
+__signature__ = 0xbc2dc24b47964c8b4739257578e691c4
 
-try:
-    # Wildcard import pipython.gcs21.gcs21datarectools pylint: disable=W0401
-    from pipython.pidevice.gcs21.gcs21datarectools import *
-except ImportError:
-    pass
+# Modules whose public names are imported on first access, the first one is required.
+TOOLMODULES = ('.datarectools', 'pipython.pidevice.gcs2.gcs2datarectools',
+               'pipython.pidevice.gcs21.gcs21datarectools')
 
-__signature__ = 0xbc2dc24b47964c8b4739257578e691c4
+
+def _loadtools():
+    """Import the public names of TOOLMODULES into this package like "from module import *"."""
+    names = []
+    for modname in TOOLMODULES:
+        try:
+            module = import_module(modname, __name__)
+        except ImportError:
+            if modname == TOOLMODULES[0]:
+                raise
+            continue
+        public = getattr(module, '__all__', None) or [name for name in vars(module) if not name.startswith('_')]
+        globals().update((name, getattr(module, name)) for name in public)
+        names.extend(public)
+    globals()['__all__'] = sorted(set(names))
+
+
+def __getattr__(name):
+    """Import the tools on first access (PEP 562), "from ... import *" asks for "__all__" first."""
+    if name.startswith('__') and name != '__all__':
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    if '__all__' not in globals():
+        _loadtools()
+    try:
+        return globals()[name]
+    except KeyError:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if sys.version_info < (3, 7):  # no module __getattr__, import the tools now
+    _loadtools()
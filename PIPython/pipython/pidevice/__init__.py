@@ -2,32 +2,44 @@
 # -*- coding: utf-8 -*-
 """Collection of libraries to use PI controllers and process GCS data."""
 
+from importlib import import_module
+import sys
+
 from . import gcserror
 from .gcserror import GCSError
 
-try:
-    from .gcs2.gcs2commands import GCS2Commands
-except ImportError:
-    GCS2Commands = None
-
-try:
-    from .gcs2.gcs2device import GCS2Device
-except ImportError:
-    GCS2Device = None
-
-try:
-    from .gcs21.gcs21commands import GCS21Commands
-except ImportError:
-    GCS21Commands = None
-
-try:
-    from .gcs21.gcs21device import GCS21Device
-except ImportError:
-    GCS21Device = None
-
-from .gcsdevice import GCSDevice
-
-
 __all__ = ['GCSDevice', 'GCS2Device', 'GCS21Device', 'GCS2Commands', 'GCS21Commands']
 
 __signature__ = 0x2139516246e921a2bd0b9e1f1355a851
+
+# Classes imported on first access, gcs2commands alone has 7000 lines: {name: (module, class name)}.
+# A class is None if its module is not available.
+LAZYCLASSES = {
+    'GCS2Commands': ('.gcs2.gcs2commands', 'GCS2Commands'),
+    'GCS2Device': ('.gcs2.gcs2device', 'GCS2Device'),
+    'GCS21Commands': ('.gcs21.gcs21commands', 'GCS21Commands'),
+    'GCS21Device': ('.gcs21.gcs21device', 'GCS21Device'),
+    'GCSDevice': ('.gcsdevice', 'GCSDevice'),
+}
+
+
+def __getattr__(name):
+    """Import the classes in LAZYCLASSES on first access (PEP 562)."""
+    if name not in LAZYCLASSES:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    modname, classname = LAZYCLASSES[name]
+    try:
+        value = getattr(import_module(modname, __name__), classname)
+    except ImportError:
+        value = None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZYCLASSES))
+
+
+if sys.version_info < (3, 7):  # no module __getattr__, import the classes now
+    for _name in LAZYCLASSES:
+        __getattr__(_name)
@@ -0,0 +1,9 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Use PI controllers with asyncio, requires Python 3.5 or later."""
+
+from .asyncdevice import AsyncGCSDevice
+from .asyncmessages import AsyncGCSMessages
+from .transports import AsyncSocketTransport, ExecutorTransport
+
+__all__ = ['AsyncGCSDevice', 'AsyncGCSMessages', 'AsyncSocketTransport', 'ExecutorTransport']
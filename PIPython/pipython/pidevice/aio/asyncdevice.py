@@ -0,0 +1,257 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Provide all GCS functions of GCS2Commands as coroutines, e.g. "await pidevice.qPOS()"."""
+
+from logging import debug
+import asyncio
+from functools import partial
+from time import time
+
+from .. import GCSError, gcserror
+from ..gcs2.gcs2commands import GCS2Commands
+from .asyncmessages import AsyncGCSMessages
+from .transports import AsyncSocketTransport, ExecutorTransport
+
+
+class _Pending(BaseException):
+    """Raised by _ReplayMessages to leave a GCS function that needs a transfer which has not been done yet.
+    Derived from BaseException so that it is not caught by "except Exception" in a GCS function.
+    """
+
+
+class _ReplayMessages(object):
+    """Stands in for GCSMessages in GCS2Commands. A GCS function is run until it requests a transfer that
+    has not been done yet, the transfer is then awaited with AsyncGCSMessages and the function is run
+    again from the start with all transfers so far answered from the record.
+    """
+
+    def __init__(self, msgs):
+        """Answer the transfers of a GCS function from a record.
+        @type msgs : AsyncGCSMessages
+        """
+        self._msgs = msgs
+        self._record = {}  # {(kind, request, occurrence): (answer, exception)}
+        self._count = {}  # {(kind, request): number of requests in the current run}
+        self.errcheck = msgs.errcheck
+        self.embederr = msgs.embederr
+
+    def __getattr__(self, name):
+        """Forward settings that are not changed by GCS functions to AsyncGCSMessages."""
+        return getattr(self._msgs, name)
+
+    @property
+    def timeout(self):
+        """Get current timeout setting in milliseconds."""
+        return self._msgs.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        """Set timeout in milliseconds."""
+        self._msgs.timeout = value
+
+    def clear(self):
+        """Forget all recorded transfers, call before a new GCS function is run."""
+        self._record = {}
+        self.rewind()
+
+    def rewind(self):
+        """Prepare the record for another run of the same GCS function."""
+        self._count = {}
+        self.errcheck = self._msgs.errcheck
+        self.embederr = self._msgs.embederr
+
+    def commit(self):
+        """Keep settings that the GCS function has changed, call after it has returned."""
+        self._msgs.errcheck = self.errcheck
+        self._msgs.embederr = self.embederr
+
+    async def transfer(self, pending):
+        """Do the transfer of 'pending' with AsyncGCSMessages and record its answer or exception.
+        @type pending : _Pending
+        """
+        key, coro = pending.args
+        errcheck, embederr = self._msgs.errcheck, self._msgs.embederr
+        self._msgs.errcheck, self._msgs.embederr = self.errcheck, self.embederr
+        try:
+            self._record[key] = (await coro(), None)
+        except GCSError as exc:
+            self._record[key] = (None, exc)
+        finally:
+            self._msgs.errcheck, self._msgs.embederr = errcheck, embederr
+
+    def _replay(self, kind, request, coro):
+        """Return the recorded answer of 'request' or raise _Pending if it has not been transferred yet."""
+        occurrence = self._count.get((kind, request), 0)
+        self._count[(kind, request)] = occurrence + 1
+        key = (kind, request, occurrence)
+        if key not in self._record:
+            raise _Pending(key, coro)
+        answer, exc = self._record[key]
+        if exc is not None:
+            raise exc
+        return answer
+
+    def send(self, tosend):
+        """Replay AsyncGCSMessages.send()."""
+        self._replay('send', tosend, partial(self._msgs.send, tosend))
+
+    def read(self, tosend, gcsdata=0):
+        """Replay AsyncGCSMessages.read()."""
+        return self._replay('read', (tosend, gcsdata), partial(self._msgs.read, tosend, gcsdata))
+
+    def readmany(self, cmds, checkerror=True):
+        """Replay AsyncGCSMessages.readmany()."""
+        return self._replay('readmany', (tuple(cmds), checkerror), partial(self._msgs.readmany, cmds, checkerror))
+
+    def batch(self, locate=False):
+        """Batches are not supported, use readmany() or send several commands in one string."""
+        raise GCSError(gcserror.E_11_COM_NOT_IMPLEMENTED, 'batches are not supported by AsyncGCSDevice')
+
+
+class AsyncGCSDevice(object):
+    """Provide all GCS functions of GCS2Commands as coroutines, e.g. "await pidevice.qPOS()".
+    Use AsyncGCSDevice.connecttcpip() or AsyncGCSDevice.connectgateway() to create an instance.
+    Commands to one device are serialized, different devices can be used concurrently in one event loop.
+    """
+
+    def __init__(self, transport):
+        """Provide all GCS functions as coroutines, 'transport' must be open already.
+        @type transport : pipython.pidevice.aio.transports.AsyncSocketTransport
+        """
+        debug('create an instance of AsyncGCSDevice(transport=%s)', transport)
+        self._transport = transport
+        self._msgs = AsyncGCSMessages(transport)
+        self._replay = _ReplayMessages(self._msgs)
+        self._commands = GCS2Commands(self._replay)
+        self._lock = None  # created in the running event loop
+
+    def __str__(self):
+        return 'AsyncGCSDevice(transport=%s)' % self._transport
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __getattr__(self, name):
+        """Return the GCS function 'name' of GCS2Commands as coroutine function, or the value of its
+        property 'name' if this is available without communication, e.g. "devname" after initialize().
+        """
+        attr = getattr(GCS2Commands, name, None)
+        if attr is None or name.startswith('_'):
+            raise AttributeError('%r object has no attribute %r' % (type(self).__name__, name))
+        if callable(attr):
+            return partial(self.call, name)
+        self._replay.clear()
+        try:
+            return getattr(self._commands, name)
+        except _Pending:
+            raise RuntimeError('%r requires communication, call "await initialize()" first' % name)
+
+    @classmethod
+    async def connecttcpip(cls, host='localhost', port=50000):
+        """Open a TCP/IP connection and return an initialized device.
+        @param host : IP address as string.
+        @param port : IP port to use as integer, defaults to 50000.
+        @return : Instance of AsyncGCSDevice.
+        """
+        transport = AsyncSocketTransport(host, port)
+        await transport.open()
+        pidevice = cls(transport)
+        await pidevice.initialize()
+        return pidevice
+
+    @classmethod
+    async def connectgateway(cls, gateway, executor=None):
+        """Use a connected synchronous gateway, e.g. PISerial or PIUSB, and return an initialized device.
+        @type gateway : pipython.pidevice.interfaces.pigateway.PIGateway
+        @param executor : Instance of concurrent.futures.Executor or None for the default executor of the loop.
+        @return : Instance of AsyncGCSDevice.
+        """
+        transport = ExecutorTransport(gateway, executor)
+        await transport.open()
+        pidevice = cls(transport)
+        await pidevice.initialize()
+        return pidevice
+
+    @property
+    def commands(self):
+        """Return the GCS2Commands instance whose functions are run as coroutines."""
+        return self._commands
+
+    @property
+    def errcheck(self):
+        """Get current error check setting."""
+        return self._msgs.errcheck
+
+    @errcheck.setter
+    def errcheck(self, value):
+        """Set error check property.
+        @param value : True means that after each command the error is queried.
+        """
+        self._msgs.errcheck = bool(value)
+
+    @property
+    def timeout(self):
+        """Get current timeout setting in milliseconds."""
+        return self._msgs.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        """Set timeout in milliseconds."""
+        self._msgs.timeout = value
+
+    @property
+    def bufdata(self):
+        """Get the GCS data of the last qDRR() or similar as 2-dimensional list of float values."""
+        return self._msgs.bufdata
+
+    async def call(self, funcname, *args, **kwargs):
+        """Run the GCS function 'funcname' of GCS2Commands and await its communication.
+        @param funcname : Name of the function as string, e.g. "qPOS".
+        @return : Return value of the function.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        func = getattr(self._commands, funcname)
+        async with self._lock:
+            self._replay.clear()
+            while True:
+                self._replay.rewind()
+                try:
+                    answer = func(*args, **kwargs)
+                except _Pending as pending:
+                    await self._replay.transfer(pending)
+                    continue
+                self._replay.commit()
+                return answer
+
+    async def initialize(self):
+        """Query and cache device name, supported functions and axes, so that the according
+        properties can be used without "await".
+        """
+        for name in ('devname', 'funcs', 'axes'):
+            await self.call('__getattribute__', name)
+
+    async def waitontarget(self, axes=None, timeout=300, polldelay=0.1):
+        """Wait until all closedloop 'axes' are on target, can be cancelled.
+        @param axes : Axes to wait for as string or list/tuple, or None to wait for all axes.
+        @param timeout : Timeout in seconds as float.
+        @param polldelay : Delay time between polls in seconds as float.
+        """
+        axes = self.axes if axes is None else axes
+        servo = await self.qSVO(axes)
+        axes = [axis for axis in servo if servo[axis]]
+        if not axes:
+            return
+        maxtime = time() + timeout
+        while not all((await self.qONT(axes)).values()):
+            if time() > maxtime:
+                msg = 'waitontarget() timed out after %.1f seconds' % timeout
+                raise GCSError(gcserror.E_1082_PI_SOFTWARE_TIMEOUT, msg)
+            await asyncio.sleep(polldelay)
+
+    async def close(self):
+        """Close the connection."""
+        await self._transport.close()
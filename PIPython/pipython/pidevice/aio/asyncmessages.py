@@ -0,0 +1,264 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Provide a GCS communication layer for asyncio, analogous to GCSMessages."""
+
+from logging import debug
+import asyncio
+from time import time
+
+from .. import GCSError, gcserror
+from ..gcslogger import SENT, RECEIVED
+from ..gcsmessages import GCSMessages, eol, eolbytes, splitanswers
+
+ENDOFHEADER = '# END_HEADER'
+
+
+class AsyncGCSMessages(object):
+    """Send GCS commands and read the answers with asyncio, one command at a time per connection."""
+
+    def __init__(self, transport):
+        """Provide a GCS communication layer for asyncio.
+        @type transport : pipython.pidevice.aio.transports.AsyncSocketTransport
+        """
+        debug('create an instance of AsyncGCSMessages(transport=%s)', transport)
+        self._transport = transport
+        self._lock = None  # created in the running event loop
+        self._databuffer = {'size': 0, 'index': 0, 'data': [], 'error': None}
+        self.logger = None  # Writes communication to/from controller in a background thread.
+        self.errcheck = True
+        self.embederr = False
+
+    def __str__(self):
+        return 'AsyncGCSMessages(transport=%s)' % self._transport
+
+    @property
+    def lock(self):
+        """Return the asyncio.Lock that serializes the commands on this connection."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def connectionid(self):
+        """Get ID of current connection as integer."""
+        return self._transport.connectionid
+
+    @property
+    def timeout(self):
+        """Get current timeout setting in milliseconds."""
+        return self._transport.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        """Set timeout.
+        @param value : Timeout in milliseconds as integer.
+        """
+        self._transport.settimeout(int(value))
+
+    @property
+    def bufstate(self):
+        """True if the GCS data of the last read with 'gcsdata' is complete, data is read before the read returns."""
+        if self._databuffer['error']:
+            raise self._databuffer['error']  # Raising NoneType pylint: disable=E0702
+        return self._databuffer['size'] is True
+
+    @property
+    def bufdata(self):
+        """Get the GCS data of the last read with 'gcsdata' as 2-dimensional list of float values."""
+        return self._databuffer['data']
+
+    @property
+    def arraymode(self):
+        """Always False, GCS data is read into lists of floats."""
+        return False
+
+    async def send(self, tosend):
+        """Send 'tosend' to device and check for error.
+        @param tosend : String to send to device, with or without trailing linefeed.
+        """
+        if self.embederr and self.errcheck:
+            if len(tosend) > 1 and not tosend.endswith('\n'):
+                tosend += '\n'
+            tosend += 'ERR?\n'
+        await self._complete(self._sendcmd(tosend))
+
+    async def read(self, tosend, gcsdata=0):
+        """Send 'tosend' to device, read answer and check for error.
+        @param tosend : String to send to device.
+        @param gcsdata : Number of lines, if != 0 then the GCS data is read into the data buffer
+        before the header is returned.
+        @return : Device answer as string.
+        """
+        if gcsdata is not None:
+            gcsdata = None if gcsdata < 0 else gcsdata
+        return await self._complete(self._readcmd(tosend, gcsdata))
+
+    async def readmany(self, cmds, checkerror=True):
+        """Send all queries in 'cmds' with a single write and read their answers in one round trip.
+        @param cmds : List of queries as strings, with or without trailing linefeed.
+        @param checkerror : If True "ERR?" is appended and checked once for all 'cmds'.
+        @return : List of answers as strings in the order of 'cmds'.
+        """
+        cmds = [cmd if len(cmd) == 1 or cmd.endswith('\n') else cmd + '\n' for cmd in cmds]
+        checkerror = checkerror and self.errcheck
+        count = len(cmds) + int(checkerror)
+        answers, rcvbuf = await self._complete(self._readanswers(''.join(cmds) + ('ERR?\n' if checkerror else ''),
+                                                                  count))
+        if rcvbuf or len(answers) > count:
+            msg = '@ AsyncGCSMessages.readmany: %d answers expected, got %r' % (count, ''.join(answers) + rcvbuf)
+            raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, msg)
+        if checkerror:
+            exc = GCSMessages._toerror(answers.pop())  # Access to a protected member pylint: disable=W0212
+            if exc:
+                raise GCSError(exc, '@ AsyncGCSMessages.readmany in %r' % ''.join(cmds))
+        return answers
+
+    async def _complete(self, coro):
+        """Run 'coro' with the lock held. If the caller is cancelled 'coro' still runs to its end in the
+        background, so that the answer of a cancelled command does not remain in the input buffer.
+        @return : Return value of 'coro'.
+        """
+        async def locked():
+            """Run 'coro' with the lock held."""
+            async with self.lock:
+                return await coro
+
+        task = asyncio.ensure_future(locked())
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())  # no "never retrieved" warning
+        return await asyncio.shield(task)
+
+    async def _sendcmd(self, tosend):
+        """Send 'tosend' and check for error."""
+        await self._send(tosend)
+        await self._checkerror(senderr=not self.embederr)
+
+    async def _readcmd(self, tosend, gcsdata):
+        """Send 'tosend', read the answer or the GCS data and check for error."""
+        await self._send(tosend)
+        if gcsdata == 0:
+            answer = await self._read()
+            await self._checkerror()
+            return answer
+        return await self._readheader(gcsdata)
+
+    async def _readanswers(self, tosend, count):
+        """Send 'tosend' and read 'count' consecutive answers.
+        @return : Tuple (list of answers as strings, rest of received data as string).
+        """
+        await self._send(tosend)
+        answers, rcvbuf = [], ''
+        deadline = time() + self.timeout / 1000.
+        while len(answers) < count:
+            received = await self._readchunk(deadline)
+            complete, rcvbuf = splitanswers(rcvbuf + received.decode('cp1252', 'ignore'))
+            answers.extend(complete)
+        self._savelog(RECEIVED, ''.join(answers))
+        return answers, rcvbuf
+
+    async def _readheader(self, gcsdata):
+        """Read the header of GCS data and then the data into the data buffer.
+        @param gcsdata : Number of lines or None if unknown.
+        @return : Header as string.
+        """
+        self._databuffer.update({'data': [], 'index': 0, 'size': gcsdata, 'error': None})
+        answer = await self._read(stopon=ENDOFHEADER + ' \n')  # the header may arrive in several chunks
+        splitpos = answer.upper().find(ENDOFHEADER)
+        if splitpos < 0:
+            await self._send('ERR?\n')
+            err = int((await self._read()).strip()) or gcserror.E_1004_PI_UNEXPECTED_RESPONSE
+            raise GCSError(err, '@ AsyncGCSMessages.read, no %r in %r' % (ENDOFHEADER, answer))
+        splitpos += len(ENDOFHEADER + ' \n')
+        answer, strbuf = answer[:splitpos], answer[splitpos:]
+        if (ENDOFHEADER + ' \n') in answer.upper():
+            await self._readgcsdata(strbuf)
+        else:
+            self._databuffer['size'] = True
+        return answer
+
+    def _savelog(self, direction, msg):
+        """Pass 'msg' to self.logger which writes it to the log file in a background thread."""
+        if self.logger:
+            self.logger.log(direction, self.connectionid, msg)
+
+    async def _send(self, tosend):
+        """Send 'tosend' to device.
+        @param tosend : String to send to device, with or without trailing linefeed.
+        """
+        if len(tosend) > 1 and not tosend.endswith('\n') and tosend[-1] >= ' ':  # not for single char commands
+            tosend += '\n'
+        self._savelog(SENT, tosend)
+        await self._transport.write(tosend)
+
+    async def _readchunk(self, deadline):
+        """Wait for the next received data until the absolute time 'deadline'.
+        @return : Received data as bytes.
+        """
+        try:
+            return await asyncio.wait_for(self._transport.read(), max(0, deadline - time()))
+        except asyncio.TimeoutError:
+            raise GCSError(gcserror.E_7_COM_TIMEOUT, '@ AsyncGCSMessages._read')
+
+    async def _read(self, stopon=None):
+        """Read answer from device until this ends with linefeed with no preceeding space.
+        @param stopon: Addditional uppercase string that stops reading, too.
+        @return : Received data as string.
+        """
+        rcvbuf = bytearray()
+        stopon = stopon.encode('cp1252') if stopon else None
+        deadline = time() + self.timeout / 1000.
+        while not eolbytes(rcvbuf):
+            scanfrom = max(0, len(rcvbuf) - len(stopon) + 1) if stopon else 0
+            rcvbuf += await self._readchunk(deadline)
+            deadline = time() + self.timeout / 1000.
+            if stopon and rcvbuf[scanfrom:].upper().find(stopon) >= 0:
+                break
+        answer = rcvbuf.decode(encoding='cp1252', errors='ignore')
+        self._savelog(RECEIVED, answer)
+        GCSMessages._check_no_eol(rcvbuf)  # Access to a protected member pylint: disable=W0212
+        return answer
+
+    async def _readgcsdata(self, strbuf):
+        """Read GCS data until the last line and save the values as float into the data buffer.
+        @param strbuf : String of already readout data.
+        """
+        numcolumns = None
+        while True:
+            splitpos = strbuf.rfind('\n') + 1
+            block, strbuf = strbuf[:splitpos], strbuf[splitpos:]
+            for line in block.splitlines():
+                values = line.split()
+                if numcolumns is None:
+                    numcolumns = len(values)
+                    self._databuffer['data'] = [[] for _ in range(numcolumns)]
+                try:
+                    if len(values) != numcolumns:
+                        raise ValueError('expected %d, got %d columns' % (numcolumns, len(values)))
+                    for column, value in zip(self._databuffer['data'], values):
+                        column.append(float(value))
+                except ValueError as exc:
+                    self._databuffer['error'] = GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, '%s: %r' % (exc, line))
+                self._databuffer['index'] += 1
+            if eol(block):  # last line ends with LF without preceeding SPACE
+                break
+            strbuf += await self._read(stopon=' \n')
+        size = self._databuffer['size']
+        if size and self._databuffer['index'] != size:
+            err = gcserror.E_1088_PI_TOO_FEW_GCS_DATA if self._databuffer['index'] < size else \
+                gcserror.E_1089_PI_TOO_MANY_GCS_DATA
+            self._databuffer['error'] = GCSError(err, '%s expected, %d received' % (size, self._databuffer['index']))
+        if not self._databuffer['error']:
+            await self._checkerror()
+            self._databuffer['size'] = True
+        debug('AsyncGCSMessages: %d datasets of GCS data read', self._databuffer['index'])
+
+    async def _checkerror(self, senderr=True):
+        """Query error from device and raise GCSError exception.
+        @param senderr : If True send "ERR?\n" to the device.
+        """
+        if not self.errcheck:
+            return
+        if senderr:
+            await self._send('ERR?\n')
+        exc = GCSMessages._toerror(await self._read())  # Access to a protected member pylint: disable=W0212
+        if exc:
+            raise exc
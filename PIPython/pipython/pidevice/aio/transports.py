@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Provide asyncio transports to a PI device, i.e. a TCP/IP stream and any PIGateway run in an executor."""
+
+from logging import debug
+import asyncio
+import socket
+
+from .. import GCSError, gcserror
+
+# Maximum number of bytes returned by one read of AsyncSocketTransport.
+BUFSIZE = 65536
+
+# Maximum time in seconds an executor thread blocks in PIGateway.waitfordata().
+WAITSLICE = 0.1
+
+
+class AsyncSocketTransport(object):
+    """Connect to a PI device via TCP/IP with asyncio streams."""
+
+    def __init__(self, host='localhost', port=50000, bufsize=BUFSIZE):
+        """Connect to a PI device via TCP/IP, call "await open()" before use.
+        @param host : IP address as string, defaults to "localhost".
+        @param port : IP port to use as integer, defaults to 50000.
+        @param bufsize : Maximum number of bytes returned by read() as integer.
+        """
+        debug('create an instance of AsyncSocketTransport(host=%s, port=%s)', host, port)
+        self._host = host
+        self._port = port
+        self._bufsize = bufsize
+        self._reader = None
+        self._writer = None
+        self._timeout = 7000  # milliseconds
+
+    def __str__(self):
+        return 'AsyncSocketTransport(host=%s, port=%s)' % (self._host, self._port)
+
+    @property
+    def timeout(self):
+        """Return timeout in milliseconds."""
+        return self._timeout
+
+    def settimeout(self, value):
+        """Set timeout to 'value' in milliseconds."""
+        self._timeout = value
+
+    @property
+    def connected(self):
+        """Return True if a device is connected."""
+        return self._writer is not None
+
+    @property
+    def connectionid(self):
+        """Return 0 as ID of current connection."""
+        return 0
+
+    async def open(self):
+        """Open the TCP/IP connection."""
+        debug('AsyncSocketTransport.open: connect to %s:%s', self._host, self._port)
+        self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+        sock = self._writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # disable Nagle algorithm
+
+    async def write(self, msg):
+        """Send 'msg' to the device.
+        @param msg : String to send.
+        """
+        debug('AsyncSocketTransport.write: %r', msg)
+        self._writer.write(msg.encode('cp1252'))
+        await self._writer.drain()
+
+    async def read(self):
+        """Wait for data from the device.
+        @return : Received data as bytes, not empty.
+        """
+        received = await self._reader.read(self._bufsize)
+        if not received:
+            raise GCSError(gcserror.E_1_COM_ERROR, '@ AsyncSocketTransport.read: connection closed by %s:%s' %
+                           (self._host, self._port))
+        return received
+
+    async def close(self):
+        """Close the TCP/IP connection."""
+        if self._writer is None:
+            return
+        debug('AsyncSocketTransport.close: close connection to %s:%s', self._host, self._port)
+        writer, self._writer, self._reader = self._writer, None, None
+        writer.close()
+        if hasattr(writer, 'wait_closed'):
+            await writer.wait_closed()
+
+
+class ExecutorTransport(object):
+    """Use a synchronous PIGateway, e.g. PISerial or PIUSB, with asyncio. All calls of the gateway run in
+    'executor', so a blocking read never stalls the event loop. A read that is cancelled, e.g. by a timeout,
+    keeps running and its data is returned by the next read, so no received data is lost.
+    """
+
+    def __init__(self, gateway, executor=None):
+        """Use the synchronous 'gateway' with asyncio.
+        @type gateway : pipython.pidevice.interfaces.pigateway.PIGateway
+        @param executor : Instance of concurrent.futures.Executor or None for the default executor of the loop.
+        """
+        debug('create an instance of ExecutorTransport(gateway=%s)', gateway)
+        self._gateway = gateway
+        self._executor = executor
+        self._pending = None  # future of a read that has not been awaited completely
+
+    def __str__(self):
+        return 'ExecutorTransport(gateway=%s)' % self._gateway
+
+    @property
+    def timeout(self):
+        """Return timeout in milliseconds."""
+        return self._gateway.timeout
+
+    def settimeout(self, value):
+        """Set timeout to 'value' in milliseconds."""
+        self._gateway.settimeout(value)
+
+    @property
+    def connected(self):
+        """Return True if a device is connected."""
+        return self._gateway.connected
+
+    @property
+    def connectionid(self):
+        """Return ID of current connection as integer."""
+        return self._gateway.connectionid
+
+    async def open(self):
+        """Flush the input buffer of the gateway, which is already connected."""
+        await asyncio.get_event_loop().run_in_executor(self._executor, self._gateway.flush)
+
+    async def write(self, msg):
+        """Send 'msg' to the device.
+        @param msg : String to send.
+        """
+        await asyncio.get_event_loop().run_in_executor(self._executor, self._gateway.send, msg)
+
+    async def read(self):
+        """Wait for data from the device.
+        @return : Received data as bytes, not empty.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            if self._pending is None:
+                self._pending = loop.run_in_executor(self._executor, self._receive)
+            received = await asyncio.shield(self._pending)
+            self._pending = None
+            if received:
+                return received
+
+    def _receive(self):
+        """Wait up to WAITSLICE for data and read it, runs in the executor.
+        @return : Received data as bytes, empty if no data has been received.
+        """
+        if not self._gateway.waitfordata(WAITSLICE):
+            return b''
+        return bytes(self._gateway.read())  # a memoryview is only valid until the next call
+
+    async def close(self):
+        """Close the gateway."""
+        await asyncio.get_event_loop().run_in_executor(self._executor, self._gateway.close)
@@ -52,6 +52,30 @@ class GCSBaseCommands(object):
         """Full path to file where to save communication to/from device."""
         self._msgs.logfile = filepath
 
+    @property
+    def logger(self):
+        """Logger that saves communication to/from device in a background thread, or None."""
+        return self._msgs.logger
+
+    @logger.setter
+    def logger(self, logger):
+        """Set logger, e.g. for binary format or rotation of the log file.
+        @type logger : pipython.pidevice.gcslogger.GCSLogger or None
+        """
+        self._msgs.logger = logger
+
+    @property
+    def stats(self):
+        """Counts, bytes and latency histograms per GCS command as GCSStats instance, None if disabled."""
+        return self._msgs.stats
+
+    @stats.setter
+    def stats(self, stats):
+        """Enable or disable the instrumentation of the communication.
+        @param stats : GCSStats instance, True for a new GCSStats instance or None/False to disable.
+        """
+        self._msgs.stats = stats
+
     @property
     def timeout(self):
         """Get current timeout setting in milliseconds."""
@@ -8,6 +8,8 @@ from collections import OrderedDict
 import platform
 import sys
 
+from .gcsdecoders import decodeoneitem, decodetwoitems
+
 # Invalid class name "basestring"  pylint: disable=C0103
 # Redefining built-in 'basestring' pylint: disable=W0622
 try:
@@ -100,6 +102,24 @@ def getsupportedfunctions(qhlp, dostrip=True):
     return funcs
 
 
+def getparamtypes(qhpa):
+    """Parse qHPA answer and return the value types of the numeric parameters.
+    @param qhpa : Answer of qHPA() as string.
+    @return : Dictionary {paramid: type} with paramid as integer and type "INT" or "FLOAT".
+    """
+    paramtypes = {}
+    for line in qhpa.splitlines():
+        if '=' not in line:
+            continue
+        paramid = int(line.split('=')[0].strip(), base=16)
+        convtype = line.split()[3].strip().upper()
+        if convtype in ('INT', 'FLOAT'):
+            paramtypes[paramid] = convtype
+        elif convtype not in ('CHAR', 'STRING'):
+            raise KeyError('unknown parameter type %r' % convtype)
+    return paramtypes
+
+
 def getitemslist(items, valueconv=None, size=None):
     """Return list of 'items'.
     @param items : Can be None, single item or list of items.
@@ -276,13 +296,17 @@ def getdict_oneitem(answer, items, itemconv=None, valueconv=None):
     conversion functions the last given conversion function is used for the remaining values.
     @return : Ordered dictionary {item: [value1, value2, ...]} or {item: value}.
     """
+    if items is not None:
+        items = getitemslist(items)
+    answerdict = decodeoneitem(answer, items, itemconv, valueconv)
+    if answerdict is not None:
+        return answerdict
     readitems, values = splitanswertolists(answer)
     if items is None:
         if not readitems:
             return {}
         items = readitems[0]
     else:
-        items = getitemslist(items)
         itemconv = None
     answerdict = OrderedDict()
     multival = False
@@ -318,6 +342,11 @@ def getdict_twoitems(answer, items1, items2, itemconv, valueconv, convlisttostri
     @return : Ordered dictionary {item1: {item2: [value1, value2, ...]}} or
     {item1: {item2: value}}.
     """
+    if not convlisttostring or tuple(valueconv or ()) in ((None,), (str,)):  # a single string value is not joined
+        answerdict = decodetwoitems(answer, getitemslist(items1) if items1 else [],
+                                    getitemslist(items2) if items2 else [], itemconv, valueconv)
+        if answerdict is not None:
+            return answerdict
     readitems, values = splitanswertolists(answer)
     if not items1:
         if not readitems:
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Fast paths that parse the answers of GCS queries of the common fixed shapes.
+
+Most queries answer one value per item, e.g. "1=12.345678" to "POS? 1", or one value per item and
+parameter, e.g. "1 0x1=0.5" to "SPA? 1 0x1". These answers are split with precompiled patterns
+in one pass and converted without the checks of convertvalue(). getdict_oneitem() and
+getdict_twoitems() use decodeoneitem() and decodetwoitems() and return the same ordered dictionaries.
+The functions return None for all other answers and conversions and the caller falls back to the
+generic parser. decodevalue() and decodevalues() return plain values and lists for callers that do
+not need a dictionary.
+"""
+
+from collections import OrderedDict
+import re
+
+# Line "item=value" and line "item1 item2=value" of an answer, other lines do not match.
+ONEITEMLINE = re.compile(r'^[^\S\n]*([^\s=]+)[^\S\n]*=[^\S\n]*(\S+)[^\S\n]*$', re.MULTILINE)
+TWOITEMSLINE = re.compile(r'^[^\S\n]*([^\s=]+)[^\S\n]+([^\s=]+)[^\S\n]*=[^\S\n]*(\S+)[^\S\n]*$', re.MULTILINE)
+
+BOOLVALUES = {'1': True, 'True': True, '0': False, 'False': False}
+
+
+def _tobool(value):
+    """Convert 'value' like convertvalue(value, bool)."""
+    try:
+        return BOOLVALUES[value]
+    except KeyError:
+        raise ValueError('unexpected response %r for bool conversion' % value)
+
+
+def _toint(value):
+    """Convert 'value' like convertvalue(value, int)."""
+    return int(value, 0)  # proper base is guessed
+
+
+def _unchanged(value):
+    """Return 'value' like convertvalue(value, None) or convertvalue(value, str) for a str 'value'."""
+    return value
+
+
+# {type: conversion function} for a stripped string of type str, other types use the generic parser.
+CONVERTERS = {None: _unchanged, str: _unchanged, float: float, int: _toint, bool: _tobool}
+
+
+def getconverter(totype):
+    """Return the conversion function for 'totype' or None if the generic parser must convert.
+    @param totype : Type to convert to or None to not convert.
+    @return : Callable with one string argument or None.
+    """
+    try:
+        return CONVERTERS[totype]
+    except (KeyError, TypeError):  # e.g. "True" for automatic conversion or an unhashable type
+        return None
+
+
+def _numlines(answer):
+    """Return the number of lines of 'answer' without trailing blank lines."""
+    return answer.rstrip().count('\n') + 1
+
+
+def splitoneitem(answer):
+    """Split the answer "item1=value1<LF>item2=value2<LF>..." with one value per item.
+    @param answer : Answer as string.
+    @return : List [(item1, value1), (item2, value2), ...] of strings or None for other answers.
+    """
+    if not isinstance(answer, str):
+        return None
+    pairs = ONEITEMLINE.findall(answer)
+    if len(pairs) != _numlines(answer):  # a line of another shape or a blank line
+        return None
+    return pairs
+
+
+def splittwoitems(answer):
+    """Split the answer "item1 param1=value1<LF>item2 param2=value2<LF>..." with one value per item and param.
+    @param answer : Answer as string.
+    @return : List [(item1, param1, value1), ...] of strings or None for other answers.
+    """
+    if not isinstance(answer, str):
+        return None
+    rows = TWOITEMSLINE.findall(answer)
+    if len(rows) != _numlines(answer):  # a line of another shape or a blank line
+        return None
+    return rows
+
+
+def decodevalue(answer, valueconv=float):
+    """Return the single value of the one line answer "item=value".
+    @param answer : Answer as string.
+    @param valueconv : Type of the value: float, int, bool, str or None for the string.
+    @return : Converted value or None if 'answer' has another shape.
+    """
+    item, sep, value = answer.partition('=')
+    if not sep or '\n' in item or len(item.split()) != 1:
+        return None
+    value = value.split()
+    if len(value) != 1:
+        return None
+    return CONVERTERS[valueconv](value[0])
+
+
+def decodevalues(answer, valueconv=float):
+    """Return items and values of the answer "item1=value1<LF>item2=value2<LF>..." as lists.
+    @param answer : Answer as string.
+    @param valueconv : Type of the values: float, int, bool, str or None for strings.
+    @return : Tuple ([item1, item2, ...], [value1, value2, ...]) with items as strings or None if
+    'answer' has another shape.
+    """
+    pairs = splitoneitem(answer)
+    if pairs is None:
+        return None
+    convert = CONVERTERS[valueconv]
+    return [pair[0] for pair in pairs], [convert(pair[1]) for pair in pairs]
+
+
+def decodeoneitem(answer, items, itemconv=None, valueconv=None):
+    """Return the answer with one value per item like getdict_oneitem() or None for other answers.
+    @param answer : String "item = value<LF>".
+    @param items : Items as list of the requested items in the order of the answer or None.
+    @param itemconv : Conversion function for the items read from 'answer'.
+    @param valueconv : List of conversion functions for values.
+    @return : Ordered dictionary {item: value} or None.
+    """
+    if not valueconv or len(valueconv) != 1:
+        return None
+    convertvalue, convertitem = getconverter(valueconv[0]), getconverter(None if items else itemconv)
+    if convertvalue is None or convertitem is None:
+        return None
+    pairs = splitoneitem(answer)
+    if pairs is None:
+        return None
+    if items is None:
+        return OrderedDict([(convertitem(item), convertvalue(value)) for item, value in pairs])
+    if len(items) != len(pairs):
+        return None
+    return OrderedDict([(item, convertvalue(pair[1])) for item, pair in zip(items, pairs)])
+
+
+def decodetwoitems(answer, items1, items2, itemconv, valueconv):
+    """Return the answer with one value per item and param like getdict_twoitems() or None for other answers.
+    @param answer : String "item1 item2 = value<LF>".
+    @param items1 : Items as list of the requested items in the order of the answer or empty, the last
+    item is repeated for the remaining lines.
+    @param items2 : Items as list of the requested items in the order of the answer or empty.
+    @param itemconv : List of two conversion functions for the items read from 'answer'.
+    @param valueconv : List of conversion functions for values.
+    @return : Ordered dictionary {item1: {item2: value}} or None.
+    """
+    if not valueconv or len(valueconv) != 1:
+        return None
+    convertvalue = getconverter(valueconv[0])
+    convertitem1 = getconverter(None if items1 else itemconv[0])
+    convertitem2 = getconverter(None if items2 else itemconv[1])
+    if convertvalue is None or convertitem1 is None or convertitem2 is None:
+        return None
+    rows = splittwoitems(answer)
+    if rows is None:
+        return None
+    if items1 and len(items1) < len(rows):  # a single item applies to all lines
+        items1 = items1 + [items1[-1]] * (len(rows) - len(items1))
+    if len(items1 or rows) != len(rows) or len(items2 or rows) != len(rows):
+        return None
+    answerdict = OrderedDict()
+    for index, (readitem1, readitem2, value) in enumerate(rows):  # same order of conversions and errors
+        item1 = items1[index] if items1 else convertitem1(readitem1)
+        item2 = items2[index] if items2 else convertitem2(readitem2)
+        if item1 not in answerdict:
+            answerdict[item1] = OrderedDict()
+        answerdict[item1][item2] = convertvalue(value)
+    return answerdict
@@ -0,0 +1,20 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compact status records of controller axes, used by the status polling functions."""
+
+from collections import OrderedDict, namedtuple
+
+# Status of an axis as returned by GCS2Commands.GetFastStatus(). An axis that is not moving is not
+# necessarily on target, e.g. with servo off or after a stop, use "ONT?" to confirm.
+FastStatus = namedtuple('FastStatus', ['position', 'moving'])
+
+# State of an axis as returned by GCS2Commands.GetSnapshot(), fields that were not queried are None.
+AxisSnapshot = namedtuple('AxisSnapshot', ['position', 'ontarget', 'velocity', 'servo'])
+
+# Query command and value type of each field of AxisSnapshot.
+SNAPSHOTFIELDS = OrderedDict([
+    ('position', ('POS?', float)),
+    ('ontarget', ('ONT?', bool)),
+    ('velocity', ('VEL?', float)),
+    ('servo', ('SVO?', bool)),
+])
@@ -12,6 +12,9 @@ import PI_ScopeFoundry.PIPython.pipython
 from ..common.gcscommands_helpers import *
 from ..common import gcsbasecommands
 from ..common.gcsbasecommands import GCSBaseCommands
+from ..common.gcsstatus import AxisSnapshot, FastStatus, SNAPSHOTFIELDS
+from .gcs2encoders import encodecmd
+from ..gcscache import CapabilityCache, ParamCache, ParamCacheMessages
 from ..import GCSError, gcserror
 
 __signature__ = 0xb75696142d765e4e3bb926556b953b76
@@ -68,7 +71,7 @@ class GCS2Commands(GCSBaseCommands):
         logsysinfo()
         self.__axes = []
         self.__allaxes = []
-        self._settings = {'paramconv': {}}
+        self._settings = {'paramconv': {}, 'paramcache': None, 'capcache': None}
         super(GCS2Commands, self).__init__(msgs)
 
     def __str__(self):
@@ -112,16 +115,20 @@ class GCS2Commands(GCSBaseCommands):
     def devname(self):
         """Return device name from its IDN string."""
         if self._name is None:
-            idn = self.qIDN().upper()
-            if 'PI-E816' in idn:
-                self._name = 'E-816'
-            elif 'DIGITAL PIEZO CONTROLLER' in idn:
-                self._name = 'E-710'
-            else:
-                self._name = idn.split(',')[1].strip()
+            self._name = self._getdevname(self.qIDN())
             debug('GCS2Commands.devname: set to %r', self._name)
         return self._name
 
+    @staticmethod
+    def _getdevname(idn):
+        """Return device name from the answer of qIDN()."""
+        idn = idn.upper()
+        if 'PI-E816' in idn:
+            return 'E-816'
+        if 'DIGITAL PIEZO CONTROLLER' in idn:
+            return 'E-710'
+        return idn.split(',')[1].strip()
+
     @devname.setter
     def devname(self, devname):
         """Set device name as string, only for testing."""
@@ -156,10 +163,16 @@ class GCS2Commands(GCSBaseCommands):
 
     @axes.deleter
     def axes(self):
-        """Reset axes and allaxes property."""
+        """Reset axes and allaxes property and remove the capabilities restored by restorecapabilities()
+        from their cache, e.g. after CST() has changed the stages.
+        """
         self.__axes = []
         self.__allaxes = []
         debug('GCS2Commands.axes: reset')
+        if self._settings['capcache']:
+            cache, idn = self._settings['capcache']
+            self._settings['capcache'] = None
+            cache.clear(idn)
 
     @property
     def numaxes(self):
@@ -201,6 +214,29 @@ class GCS2Commands(GCSBaseCommands):
         if error:
             raise GCSError(error)
 
+    @property
+    def paramcache(self):
+        """Get the cache of parameter values as ParamCache instance or None if disabled."""
+        return self._settings['paramcache']
+
+    @paramcache.setter
+    def paramcache(self, paramcache):
+        """Enable or disable the cache of the values read with qSPA(), qSEP() and qHPA().
+        SPA() and SEP() update the cached values of integer parameters and remove the others,
+        WPA(), RPA(), DPA(), INI(), CST(), SAI() and RBT() remove the affected values.
+        Do not enable the cache if the parameters are changed by another connection or by the controller itself.
+        The cache wraps the messages object, see ParamCacheMessages, so the generated functions are unchanged.
+        @param paramcache : ParamCache instance, True for a new ParamCache instance or None/False to disable.
+        """
+        if paramcache is True:
+            paramcache = ParamCache()
+        if isinstance(self._msgs, ParamCacheMessages):
+            self._msgs = self._msgs.messages
+        if paramcache:
+            self._msgs = ParamCacheMessages(self._msgs, paramcache, self._getintvalue)
+        self._settings['paramcache'] = paramcache or None
+        debug('GCS2Commands.paramcache set to %s', paramcache)
+
     @property
     def floatformat(self):
         """Get format specifier that formats float arguments into command strings."""
@@ -222,6 +258,9 @@ class GCS2Commands(GCSBaseCommands):
         @param args : Single items or lists of string convertibles, can have different lengths.
         @return : String of 'cmd' and zipped arguments.
         """
+        cmdstr = encodecmd(cmd, args, self.floatformat)  # fast path for a single item and value
+        if cmdstr is not None:
+            return cmdstr
         params = []
         for arg in args:
             params.append(getitemslist(arg))
@@ -263,6 +302,79 @@ class GCS2Commands(GCSBaseCommands):
         self._msgs.embederr = bool(value)
         debug('GCS2Commands.embederr set to %s', self._msgs.embederr)
 
+    def batch(self, locate=False):
+        """Get a context manager that sends all set commands issued inside the context with a single
+        write and checks the error only once at the end, e.g.
+            with pidevice.batch():
+                pidevice.CTO(1, 2, 1)
+                pidevice.TRO(1, True)
+        Queries inside the context send the queued commands first. If an exception is raised inside
+        the context the queued commands are discarded.
+        @param locate : If True "ERR?" is pipelined after each command so that a GCSError reports
+        which command of the batch failed. Still needs only one round trip.
+        @return : Context manager.
+        """
+        debug('GCS2Commands.batch(locate=%s)', locate)
+        return self._msgs.batch(locate)
+
+    def GetFastStatus(self, axes=None):
+        """Get position and motion state of 'axes' with the single character commands "#3" and "#5"
+        in one round trip. No error check, call checkerror() periodically instead. An axis that is
+        not moving is not necessarily on target, e.g. with servo off or after a stop, see qONT().
+        @param axes : String convertible or list of them or None.
+        @return : Ordered dictionary of {axis: FastStatus}, FastStatus is a named tuple with
+        "position" as float and "moving" as bool.
+        """
+        debug('GCS2Commands.GetFastStatus(axes=%r)', axes)
+        checksize((), axes)
+        posanswer, movanswer = self._msgs.readmany([chr(3), chr(5)], checkerror=False)
+        positions = getdict_oneitem(posanswer, None, valueconv=(float,))
+        moving = getbitcodeditems(int(movanswer.strip(), base=16), self.allaxes)
+        answerdict = OrderedDict()
+        for axis in getitemslist(axes) or positions:
+            axis = str(axis)
+            answerdict[axis] = FastStatus(positions[axis], moving[axis])
+        debug('GCS2Commands.GetFastStatus = %r', answerdict)
+        return answerdict
+
+    def GetSnapshot(self, axes=None, fields=None):
+        """Get the state of 'axes' with "POS?", "ONT?", "VEL?" and "SVO?" sent in a single write,
+        the answers are read in one round trip and the error is checked once.
+        @param axes : String convertible or list of them or None.
+        @param fields : List of field names of AxisSnapshot to query or None for all fields.
+        @return : Ordered dictionary of {axis: AxisSnapshot}, AxisSnapshot is a named tuple with
+        "position" and "velocity" as float, "ontarget" and "servo" as bool, fields not queried are None.
+        """
+        debug('GCS2Commands.GetSnapshot(axes=%r, fields=%r)', axes, fields)
+        checksize((), axes)
+        fields = list(fields or SNAPSHOTFIELDS)
+        for field in fields:
+            if field not in SNAPSHOTFIELDS:
+                raise ValueError('invalid snapshot field %r, use %s' % (field, ', '.join(SNAPSHOTFIELDS)))
+        answers = self._msgs.readmany([self.getcmdstr(SNAPSHOTFIELDS[field][0], axes) for field in fields])
+        values = {}
+        for field, answer in zip(fields, answers):
+            values[field] = getdict_oneitem(answer, axes, valueconv=(SNAPSHOTFIELDS[field][1],))
+        answerdict = OrderedDict()
+        for axis in values[fields[0]]:
+            answerdict[axis] = AxisSnapshot(**dict((field, values[field][axis] if field in values else None)
+                                                   for field in SNAPSHOTFIELDS))
+        debug('GCS2Commands.GetSnapshot = %r', answerdict)
+        return answerdict
+
+    @property
+    def arraymode(self):
+        """True if GCS data (e.g. qDRR, qGWD) is read into a numpy array instead of lists of floats."""
+        return self._msgs.arraymode
+
+    @arraymode.setter
+    def arraymode(self, value):
+        """Set array mode. Requires the "numpy" package.
+        @param value : True means that self.bufdata is a numpy array of shape (columns, datasets).
+        """
+        self._msgs.arraymode = value
+        debug('GCS2Commands.arraymode set to %s', self._msgs.arraymode)
+
     @property
     def logfile(self):
         """Full path to file where to save communication to/from device."""
@@ -310,7 +422,7 @@ class GCS2Commands(GCSBaseCommands):
 
     @property
     def bufdata(self):
-        """Get buffered data as 2-dimensional list of float values.
+        """Get buffered data as 2-dimensional list of float values or as numpy array if self.arraymode is True.
         Use "while self.bufstate is not True" and then call self.bufdata to get the data. (see docs)
         """
         return super(GCS2Commands, self).bufdata
@@ -367,19 +479,14 @@ class GCS2Commands(GCSBaseCommands):
         """Initialize paramconv .
         """
         if not self._settings['paramconv']:
-            for line in self.qHPA().splitlines():
-                if '=' not in line:
-                    continue
-                paramid = int(line.split('=')[0].strip(), base=16)
-                convtype = line.split()[3].strip()
-                if convtype.upper() == 'INT':
-                    self._settings['paramconv'][paramid] = self._int
-                elif convtype.upper() == 'FLOAT':
-                    self._settings['paramconv'][paramid] = self._float
-                elif convtype.upper() in ('CHAR', 'STRING'):
-                    continue
-                else:
-                    raise KeyError('unknown parameter type %r' % convtype)
+            self._setparamtypes(getparamtypes(self.qHPA()))
+
+    def _setparamtypes(self, paramtypes):
+        """Set paramconv according to 'paramtypes'.
+        @param paramtypes : Dictionary {paramid: type} with paramid as integer and type "INT" or "FLOAT".
+        """
+        convfuncs = {'INT': self._int, 'FLOAT': self._float}
+        self._settings['paramconv'] = dict((paramid, convfuncs[convtype]) for paramid, convtype in paramtypes.items())
 
 
     def clearparamconv(self):
@@ -387,6 +494,60 @@ class GCS2Commands(GCSBaseCommands):
         debug('GCS2Commands.clearparamconv()')
         self._settings['paramconv'] = {}
 
+    def prefetchparams(self, items=None, params=None):
+        """Read 'params' of 'items' with a single "SPA?" and keep the values in the parameter cache
+        even if they are already cached. Call it once for the parameters that are read repeatedly.
+        @param items: Item or list of items or None or dictionary of {item : param}.
+        @param params : Integer convertible or list of them or None. Required if 'items' is not a dict.
+        @return : Ordered dictionary of {item: {param: value}} like qSPA().
+        """
+        items, params = getitemsvaluestuple(items, params, required=False)
+        debug('GCS2Commands.prefetchparams(items=%r, params=%s)', items, gethexstr(params))
+        if self._settings['paramcache']:
+            self._settings['paramcache'].invalidate('SPA', items, params)
+        return self.qSPA(items, params)
+
+    def _getintvalue(self, param, value):
+        """Return 'value' as integer if 'param' is an integer parameter according to qHPA() else None.
+        The parameter types are not queried, see initparamconv().
+        @param param : Parameter ID as string.
+        @param value : Value as string.
+        @return : Integer or None.
+        """
+        try:
+            if self._settings['paramconv'].get(int(param, base=0)) != self._int:
+                return None
+            return self._int(value)
+        except ValueError:
+            return None
+
+    def restorecapabilities(self, cache=None, refresh=False):
+        """Restore supported functions, parameter types, axes and stage names from 'cache' or query
+        them from the controller and save them to 'cache'. Only qIDN() is sent if the cache is valid.
+        CST() removes the cached entry. Call with 'refresh' = True after the stage configuration has been
+        changed by another program or the firmware has been updated.
+        @param cache : Instance of CapabilityCache or None to use the default cache directory.
+        @param refresh : If True query the capabilities from the controller even if they are cached.
+        @return : Dictionary with the keys "funcs", "paramtypes", "axes", "allaxes" and "stages".
+        """
+        debug('GCS2Commands.restorecapabilities(cache=%s, refresh=%s)', cache, refresh)
+        cache = cache or CapabilityCache()
+        idn = self.qIDN().strip()
+        self._name = self._getdevname(idn)
+        caps = None if refresh else cache.load(idn)
+        if caps is None:
+            self._funcs = None
+            caps = {'funcs': list(self.funcs), 'paramtypes': getparamtypes(self.qHPA()) if self.HasqHPA() else {},
+                    'axes': self.qSAI(), 'allaxes': self.qSAI_ALL() if self.HasqSAI_ALL() else self.qSAI()}
+            caps['stages'] = dict(self.qCST(caps['allaxes'])) if self.HasqCST() else {}
+            cache.save(idn, caps)
+        self._funcs = caps['funcs']
+        self._setparamtypes(caps['paramtypes'])
+        self.__axes = list(caps['axes'])
+        self.__allaxes = list(caps['allaxes'])
+        self._settings['capcache'] = (cache, idn)
+        return caps
+
 
     # GCS FUNCTIONS ### DO NOT MODIFY THIS LINE !!! ###############################################
 
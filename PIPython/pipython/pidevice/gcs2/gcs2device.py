@@ -41,8 +41,10 @@ class GCS2Device(GCSBaseDevice, GCS2Commands):
         debug('GCS2Device.unload()')
         del self.funcs
         del self.devname
+        self._settings['capcache'] = None  # keep the cached capabilities for the next connection
         del self.axes
-        self._settings = {'paramconv': {}}
+        self.paramcache = None
+        self._settings = {'paramconv': {}, 'paramcache': None, 'capcache': None}
         self.dll.unload()
 
     def close(self):
@@ -50,8 +52,10 @@ class GCS2Device(GCSBaseDevice, GCS2Commands):
         debug('GCS2Device.close()')
         del self.funcs
         del self.devname
+        self._settings['capcache'] = None  # keep the cached capabilities for the next connection
         del self.axes
-        self._settings = {'paramconv': {}}
+        self.paramcache = None
+        self._settings = {'paramconv': {}, 'paramcache': None, 'capcache': None}
         self.dll.close()
 
     def GetError(self):
@@ -195,6 +199,7 @@ class GCS2Device(GCSBaseDevice, GCS2Commands):
 
     def CloseConnection(self):
         """Reset axes property and close connection to the device."""
+        self._settings['capcache'] = None  # keep the cached capabilities for the next connection
         del self.axes
         self.dll.CloseConnection()
 
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Fast paths that build the command strings of frequently used GCS commands for a single axis.
+
+GCS2Commands.getcmdstr() handles any number of arguments of any type. For a single axis and a scalar
+value, e.g. "MOV 1 0.5" or "POS? 1", encodecmd() builds the same string from a cached template per
+command and axis. It returns None for all other arguments and getcmdstr() uses its generic code.
+"""
+
+# Maximum number of cached templates, further templates are computed on each call.
+MAXTEMPLATES = 1024
+
+# {(cmd, axis): "cmd axis"}, only for axes of type str or int that are formatted unchanged.
+_TEMPLATES = {}
+
+
+def gettemplate(cmd, axis):
+    """Return "<cmd> <axis>" or None if 'axis' cannot be formatted without getcmdstr().
+    @param cmd : Command as string.
+    @param axis : Single axis as string or integer.
+    @return : Command string as string or None.
+    """
+    axistype = type(axis)
+    if axistype is not str and axistype is not int:  # e.g. bool or float would hit the cache of int
+        return None
+    try:
+        return _TEMPLATES[(cmd, axis)]
+    except KeyError:
+        pass
+    if axistype is int:
+        template = '%s %d' % (cmd, axis)
+    elif axis and axis == axis.strip():
+        template = '%s %s' % (cmd, axis)
+    else:
+        return None
+    if len(_TEMPLATES) < MAXTEMPLATES:
+        _TEMPLATES[(cmd, axis)] = template
+    return template
+
+
+def encodequery(cmd, axes):
+    """Return the command string of the query 'cmd' for 'axes' like getcmdstr(cmd, axes).
+    @param cmd : Query as string, e.g. "POS?".
+    @param axes : None or a single axis as string or integer.
+    @return : Command string as string or None if 'axes' needs getcmdstr().
+    """
+    if axes is None:
+        return cmd
+    return gettemplate(cmd, axes)
+
+
+def encodeset(cmd, axes, values, floatformat):
+    """Return the command string of 'cmd' for one axis and value like
+    getcmdstr(cmd, *getitemsvaluestuple(axes, values)).
+    @param cmd : Command as string, e.g. "MOV".
+    @param axes : Single axis as string or integer.
+    @param values : Single value as float, integer or bool.
+    @param floatformat : Format specifier for float values as string.
+    @return : Command string as string or None if 'axes' or 'values' need getcmdstr().
+    """
+    if isinstance(values, bool):
+        value = '1' if values else '0'
+    elif isinstance(values, float):
+        value = format(values, floatformat)
+        if value != value.strip():
+            return None
+    elif type(values) is int:  # unidiomatic-typecheck pylint: disable=C0123
+        value = '%d' % values
+    else:
+        return None
+    template = gettemplate(cmd, axes)
+    if template is None:
+        return None
+    return '%s %s' % (template, value)
+
+
+def encodecmd(cmd, args, floatformat):
+    """Return the command string like GCS2Commands.getcmdstr(cmd, *args) for up to one item and value.
+    @param cmd : Command as string.
+    @param args : Tuple of the arguments of getcmdstr(), each a single item or a list with one item.
+    @param floatformat : Format specifier for float values as string.
+    @return : Command string as string or None if 'args' need getcmdstr().
+    """
+    if not args:
+        return cmd
+    if len(args) > 2:
+        return None
+    single = []
+    for arg in args:
+        if type(arg) is list:  # unidiomatic-typecheck pylint: disable=C0123
+            if len(arg) != 1:
+                return None
+            arg = arg[0]
+        single.append(arg)
+    if len(single) == 1:
+        return encodequery(cmd, single[0])
+    return encodeset(cmd, single[0], single[1], floatformat)
@@ -6,6 +6,7 @@ from logging import debug, info, warning
 from time import sleep, time
 #from pipython import GCSError, gcserror
 from .gcs2commands import GCS2Commands
+from .gcs2waveupload import uploadwavepoints
 from PI_ScopeFoundry.PIPython.pipython.pitools import itemstostr
 from .. import GCSError, gcserror
 from ..common.gcscommands_helpers import getitemsvaluestuple, isdeviceavailable
@@ -364,25 +365,21 @@ def startup(pidevice, stages=None, refmodes=None, servostates=True, **kwargs):
 #                 append='X', wavepoint=bunch)
  
 
-def writewavepoints(pidevice, wavetable, wavepoints, bunchsize=None):
-    """Write 'wavepoints' for 'wavetable' in bunches of 'bunchsize'.
-    The 'bunchsize' is device specific. Please refer to the controller manual.
+def writewavepoints(pidevice, wavetable, wavepoints, bunchsize=None, **kwargs):
+    """Write 'wavepoints' for 'wavetable' in bunches of at most 'bunchsize' with a single error check.
+    The bunches are limited to the maximum command length, see gcs2waveupload.uploadwavepoints().
     @type pidevice : pipython.gcscommands.GCSCommands
     @param wavetable : Wave table ID as integer.
-    @param wavepoints : Single wavepoint as float convertible or list/tuple of them.
-    @param bunchsize : Number of wavepoints in a single bunch or None to send all 'wavepoints' in a single bunch.
+    @param wavepoints : Single wavepoint as float convertible, list/tuple of them or a numpy array.
+    @param bunchsize : Maximum number of wavepoints in a single bunch or None to only limit by the command length.
+    @param kwargs : Optional arguments "maxcmdlen", "verify" and "tolerance" of uploadwavepoints().
+    @return : Number of sent "WAV" commands as integer.
     """
     if not isdeviceavailable([GCS2Commands], pidevice):
         raise TypeError('Type %s of pidevice is not supported!' % type(pidevice).__name__)
- 
-    wavepoints = wavepoints if isinstance(wavepoints, (list, set, tuple)) else [wavepoints]
-    if bunchsize is None:
-        bunchsize = len(wavepoints)
-    for startindex in range(0, len(wavepoints), bunchsize):
-        bunch = wavepoints[startindex:startindex + bunchsize]
-        print(startindex)
-        pidevice.WAV_PNT(table=wavetable, firstpoint=startindex + 1, numpoints=len(bunch),
-                         append='&' if startindex else 'X', wavepoint=bunch)
+
+    return uploadwavepoints(pidevice, wavetable, wavepoints, bunchsize, **kwargs)
+
 
 def getaxeslist(pidevice, axes):
     """Return list of 'axes'.
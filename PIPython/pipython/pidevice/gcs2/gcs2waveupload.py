@@ -0,0 +1,149 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Upload user-defined wave table curves ("WAV PNT") in bunches and verify them with "GWD?".
+
+All points are formatted once. The bunches are as large as the command length of the controller
+allows and all "WAV" commands are sent as one batch with a single error check. The upload can be
+verified by reading the table back and comparing a checksum of the points instead of each point.
+"""
+
+from logging import debug
+from bisect import bisect_right
+from itertools import repeat
+from time import sleep
+
+from ..import GCSError, gcserror
+from ..common.gcscommands_helpers import isdeviceavailable
+from .gcs2commands import GCS2Commands
+
+# Maximum length of a command line including the trailing linefeed. The limit is device specific,
+# this is a conservative default. Please refer to the controller manual.
+MAXCMDLEN = 1024
+
+# Default tolerance of a single point for the verification relative to the largest absolute point.
+RELTOLERANCE = 1E-5
+
+
+def getvalueslist(wavepoints):
+    """Return 'wavepoints' as flat list of values.
+    @param wavepoints : Single wavepoint as float convertible, list/tuple of them or a numpy array.
+    @return : List of values.
+    """
+    if hasattr(wavepoints, 'ravel'):  # numpy array, tolist() converts to Python floats in one pass
+        return wavepoints.ravel().tolist()
+    if isinstance(wavepoints, (list, set, tuple)):
+        return list(wavepoints)
+    return [wavepoints]
+
+
+def formatwavepoints(wavepoints, floatformat='.12g'):
+    """Return the GCS strings of 'wavepoints' like GCS2Commands.getcmdstr().
+    @param wavepoints : Single wavepoint as float convertible, list/tuple of them or a numpy array.
+    @param floatformat : Format specifier for float values as string.
+    @return : List of strings.
+    """
+    values = getvalueslist(wavepoints)
+    if getattr(getattr(wavepoints, 'dtype', None), 'kind', None) == 'f':  # only floats, no type checks needed
+        return list(map(format, values, repeat(floatformat, len(values))))
+    return [('1' if value else '0') if isinstance(value, bool) else
+            format(value, floatformat) if isinstance(value, float) else str(value) for value in values]
+
+
+def getbunches(points, wavetable, maxcmdlen=MAXCMDLEN, bunchsize=None):
+    """Split the formatted 'points' into the largest bunches whose "WAV" command fits into 'maxcmdlen'.
+    @param points : List of formatted wavepoints as strings.
+    @param wavetable : Wave table ID as integer.
+    @param maxcmdlen : Maximum length of a command line including the linefeed as integer.
+    @param bunchsize : Maximum number of wavepoints in a single bunch or None for no limit.
+    @return : List of (start, stop) slice indices of 'points'.
+    """
+    ends, total = [], 0
+    for point in points:  # ends[i] is the length of the points 0..i with a leading space each
+        total += len(point) + 1
+        ends.append(total)
+    bunches, start, offset = [], 0, 0
+    while start < len(points):
+        # "WAV <table> <append> PNT <first> <num><LF>", the room for the points depends on the digits of <num>
+        prefixlen = len('WAV %s & PNT %d \n' % (wavetable, start + 1))
+        stop = start
+        for digits in range(1, len(str(len(points) - start)) + 1):
+            end = bisect_right(ends, offset + maxcmdlen - prefixlen - digits, start)
+            end = min(end, start + 10 ** digits - 1, start + bunchsize if bunchsize else end)
+            if end - start >= 10 ** (digits - 1):  # <num> has 'digits' digits
+                stop = max(stop, end)
+        if stop == start:
+            raise ValueError('wavepoint %r does not fit into a command of %d characters' % (points[start], maxcmdlen))
+        bunches.append((start, stop))
+        start, offset = stop, ends[stop - 1]
+    return bunches
+
+
+def getchecksum(values):
+    """Return the checksum of wave table 'values'.
+    @param values : Sequence of float values.
+    @return : Tuple (number of values, sum of values, sum of values weighted with their 1-based index).
+    """
+    values = list(values)
+    return len(values), sum(values), sum(i * value for i, value in enumerate(values, start=1))
+
+
+def readwavetable(pidevice, wavetable, numvalues, waittime=0.01):
+    """Read 'numvalues' points of 'wavetable' with "GWD?".
+    @type pidevice : pipython.gcscommands.GCSCommands
+    @param wavetable : Wave table ID as integer.
+    @param numvalues : Number of points to be read as integer.
+    @param waittime : Time in seconds to wait between the checks of the read progress as float.
+    @return : List or numpy array of the points.
+    """
+    pidevice.qGWD(wavetable, 1, numvalues)
+    while pidevice.bufstate is not True:
+        sleep(waittime)
+    data = pidevice.bufdata
+    return data[0] if len(data) else []
+
+
+def verifywavetable(pidevice, wavetable, values, tolerance=None):
+    """Read 'wavetable' back and compare its checksum with the checksum of 'values'.
+    @type pidevice : pipython.gcscommands.GCSCommands
+    @param wavetable : Wave table ID as integer.
+    @param values : Expected wavepoints as list of float values.
+    @param tolerance : Allowed deviation of a single point as float or None for a tolerance
+    relative to the largest absolute point, see RELTOLERANCE.
+    """
+    if tolerance is None:
+        tolerance = RELTOLERANCE * max(1., max(abs(value) for value in values) if values else 0.)
+    expected = getchecksum(values)
+    readback = getchecksum(readwavetable(pidevice, wavetable, len(values)))
+    debug('verifywavetable(wavetable=%r): expected %r, read %r', wavetable, expected, readback)
+    numvalues = expected[0]
+    if readback[0] != numvalues or abs(readback[1] - expected[1]) > tolerance * numvalues or \
+            abs(readback[2] - expected[2]) > tolerance * numvalues * (numvalues + 1) / 2.:
+        raise GCSError(gcserror.E_1023_PI_WAV_FAILED, 'checksum of wave table %r is %r, expected %r' %
+                       (wavetable, readback, expected))
+
+
+def uploadwavepoints(pidevice, wavetable, wavepoints, bunchsize=None, maxcmdlen=MAXCMDLEN, verify=False,
+                     tolerance=None):
+    """Write 'wavepoints' to 'wavetable' with as few "WAV PNT" commands as possible and a single error check.
+    @type pidevice : pipython.gcscommands.GCSCommands
+    @param wavetable : Wave table ID as integer.
+    @param wavepoints : Single wavepoint as float convertible, list/tuple of them or a numpy array.
+    @param bunchsize : Maximum number of wavepoints in a single bunch or None to only limit by 'maxcmdlen'.
+    @param maxcmdlen : Maximum length of a command line including the linefeed as integer.
+    @param verify : If True read the wave table back and compare the checksums, see verifywavetable().
+    @param tolerance : Allowed deviation of a single point for the verification as float or None.
+    @return : Number of sent "WAV" commands as integer.
+    """
+    if not isdeviceavailable([GCS2Commands], pidevice):
+        raise TypeError('Type %s of pidevice is not supported!' % type(pidevice).__name__)
+
+    points = formatwavepoints(wavepoints, pidevice.floatformat)
+    bunches = getbunches(points, wavetable, maxcmdlen, bunchsize)
+    debug('uploadwavepoints(wavetable=%r): %d points in %d bunches', wavetable, len(points), len(bunches))
+    with pidevice.batch():
+        for start, stop in bunches:
+            pidevice.send('WAV %s %s PNT %d %d %s' % (wavetable, '&' if start else 'X', start + 1, stop - start,
+                                                        ' '.join(points[start:stop])))
+    if verify:
+        verifywavetable(pidevice, wavetable, getvalueslist(wavepoints), tolerance)
+    return len(bunches)
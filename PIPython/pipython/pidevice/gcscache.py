@@ -0,0 +1,387 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Persistent cache of controller capabilities, i.e. supported functions, parameter types, axes and stages,
+and cache of parameter values read from the controller."""
+
+from collections import OrderedDict
+from logging import debug, warning
+import json
+import os
+import re
+from threading import Lock
+from time import time
+
+from .common.gcscommands_helpers import getdict_twoitems
+
+# Increment if the format of a cache entry changes, older entries are then ignored.
+CACHEVERSION = 1
+
+# Keys of a cache entry besides "version", "idn" and "created".
+CAPABILITIES = ('funcs', 'paramtypes', 'axes', 'allaxes', 'stages')
+
+# Commands that change parameter values: {command: (memory, arguments before the items, arguments per item)}.
+# The memory None means both memories, an arguments per item of 0 means all parameters of the items.
+PARAMCMDS = {
+    'SPA': ('SPA', 0, 3),
+    'SEP': (None, 1, 3),  # the value in volatile memory is unknown afterwards
+    'WPA': ('SEP', 1, 2),
+    'DPA': ('SPA', 1, 2),
+    'RPA': ('SPA', 0, 2),
+    'INI': ('SPA', 0, 1),
+    'CST': ('SPA', 0, 2),
+    'SAI': (None, 0, None),  # all items are renamed
+}
+
+
+def getdefaultdir():
+    """Return the cache directory, i.e. $PIPYTHON_CACHE or "~/.pipython/cache"."""
+    return os.environ.get('PIPYTHON_CACHE') or os.path.join(os.path.expanduser('~'), '.pipython', 'cache')
+
+
+def splitidn(idn):
+    """Return model, serial number and firmware version from the answer of qIDN().
+    @param idn : Answer of qIDN(), e.g. "(c)2015 Physik Instrumente (PI) GmbH & Co. KG, C-413.2GA, 0119024343, 01.234".
+    @return : Tuple (model, serial, firmware) as strings, missing fields are empty.
+    """
+    fields = [field.strip() for field in idn.split(',')] + ['', '', '']
+    return fields[1], fields[2], fields[3]
+
+
+def getparamkey(item, param):
+    """Return the cache key of 'item' and 'param', e.g. ("1", 0x0E000200) for (1, "0xe000200").
+    @param item : Axis/channel/system as string convertible.
+    @param param : Parameter ID as integer or string, hexadecimal strings start with "0x".
+    @return : Tuple (item as string, param as integer).
+    """
+    return str(item), param if isinstance(param, int) else int(str(param), base=0)
+
+
+class CapabilityCache(object):
+    """Save and restore controller capabilities as JSON files, one per model, serial number and firmware."""
+
+    def __init__(self, directory=None, maxage=None):
+        """Save and restore controller capabilities.
+        @param directory : Path to cache directory as string, defaults to getdefaultdir().
+        @param maxage : Entries older than this time in seconds are ignored, None means no limit.
+        """
+        self._directory = directory or getdefaultdir()
+        self._maxage = maxage
+
+    def __str__(self):
+        return 'CapabilityCache(directory=%r)' % self._directory
+
+    @property
+    def directory(self):
+        """Path to cache directory as string."""
+        return self._directory
+
+    def filepath(self, idn):
+        """Return the full path of the cache file for the controller with 'idn'.
+        @param idn : Answer of qIDN() as string.
+        """
+        name = '_'.join(splitidn(idn))
+        return os.path.join(self._directory, '%s.json' % re.sub(r'[^\w.-]', '-', name))
+
+    def load(self, idn):
+        """Return the cached capabilities of the controller with 'idn' or None if missing or invalid.
+        @param idn : Answer of qIDN() as string.
+        @return : Dictionary with the keys in CAPABILITIES or None.
+        """
+        filepath = self.filepath(idn)
+        if not os.path.isfile(filepath):
+            debug('CapabilityCache: no entry %r', filepath)
+            return None
+        try:
+            with open(filepath, 'r') as fobj:
+                entry = json.load(fobj)
+            capabilities = self._validate(entry, idn)
+        except (IOError, OSError, ValueError, KeyError, TypeError) as exc:
+            warning('CapabilityCache: ignore invalid entry %r: %s', filepath, exc)
+            return None
+        debug('CapabilityCache: loaded %r', filepath)
+        return capabilities
+
+    def save(self, idn, capabilities):
+        """Save the capabilities of the controller with 'idn'.
+        @param idn : Answer of qIDN() as string.
+        @param capabilities : Dictionary with the keys in CAPABILITIES.
+        """
+        entry = {'version': CACHEVERSION, 'idn': idn.strip(), 'created': time()}
+        for key in CAPABILITIES:
+            entry[key] = capabilities[key]
+        entry['paramtypes'] = dict(('0x%x' % paramid, convtype) for paramid, convtype in entry['paramtypes'].items())
+        filepath = self.filepath(idn)
+        try:
+            if not os.path.isdir(self._directory):
+                os.makedirs(self._directory)
+            tmppath = '%s.%d.tmp' % (filepath, os.getpid())
+            with open(tmppath, 'w') as fobj:
+                json.dump(entry, fobj, indent=1, sort_keys=True)
+            if os.path.isfile(filepath):
+                os.remove(filepath)
+            os.rename(tmppath, filepath)
+        except (IOError, OSError) as exc:
+            warning('CapabilityCache: cannot save %r: %s', filepath, exc)
+            return
+        debug('CapabilityCache: saved %r', filepath)
+
+    def clear(self, idn=None):
+        """Remove the entry of the controller with 'idn' or all entries if 'idn' is None."""
+        if idn is not None:
+            filepaths = [self.filepath(idn)]
+        elif os.path.isdir(self._directory):
+            filepaths = [os.path.join(self._directory, name) for name in os.listdir(self._directory)
+                         if name.endswith('.json')]
+        else:
+            filepaths = []
+        for filepath in filepaths:
+            if os.path.isfile(filepath):
+                os.remove(filepath)
+
+    def _validate(self, entry, idn):
+        """Return the capabilities in 'entry' if it is a valid entry of the controller with 'idn'.
+        @raise ValueError : If the entry is outdated or does not belong to the controller.
+        """
+        if entry['version'] != CACHEVERSION:
+            raise ValueError('cache version %r instead of %r' % (entry['version'], CACHEVERSION))
+        if entry['idn'] != idn.strip():
+            raise ValueError('entry of %r' % entry['idn'])
+        if self._maxage is not None and time() - entry['created'] > self._maxage:
+            raise ValueError('entry is older than %s seconds' % self._maxage)
+        if not entry['funcs']:
+            raise ValueError('invalid list of functions')
+        paramtypes = {}
+        for paramid, convtype in entry['paramtypes'].items():
+            if convtype not in ('INT', 'FLOAT'):
+                raise ValueError('invalid type %r of parameter %s' % (convtype, paramid))
+            paramtypes[int(paramid, base=16)] = convtype
+        capabilities = dict((key, entry[key]) for key in CAPABILITIES)
+        capabilities['funcs'] = [str(func) for func in entry['funcs']]
+        capabilities['paramtypes'] = paramtypes
+        capabilities['axes'] = [str(axis) for axis in entry['axes']]
+        capabilities['allaxes'] = [str(axis) for axis in entry['allaxes']]
+        capabilities['stages'] = dict((str(axis), str(stage)) for axis, stage in entry['stages'].items())
+        return capabilities
+
+
+class ParamCache(object):
+    """Values of parameters read with "SPA?" and "SEP?" as answered by the controller and the answer of
+    "HPA?" of one controller. ParamCacheMessages keeps the cache up to date, see GCS2Commands.paramcache.
+    """
+
+    # Memories of the cached values, i.e. volatile memory read with "SPA?" and non-volatile memory read with "SEP?".
+    MEMORIES = ('SPA', 'SEP')
+
+    def __init__(self):
+        self._values = {}  # {(memory, item, param): value as string}
+        self._hpa = None
+        self._stats = {'hits': 0, 'misses': 0}
+        self._lock = Lock()
+
+    def __str__(self):
+        return 'ParamCache(size=%d)' % len(self._values)
+
+    @property
+    def hpa(self):
+        """Answer of "HPA?" as string or None if not cached."""
+        return self._hpa
+
+    @hpa.setter
+    def hpa(self, answer):
+        """Cache the answer of "HPA?" as string."""
+        self._hpa = answer
+
+    @property
+    def stats(self):
+        """Dictionary with the number of 'hits' and 'misses', the 'hitrate' as float 0..1 or None and the
+        number of cached values as 'size'.
+        """
+        with self._lock:
+            total = self._stats['hits'] + self._stats['misses']
+            return {'hits': self._stats['hits'], 'misses': self._stats['misses'],
+                    'hitrate': float(self._stats['hits']) / total if total else None, 'size': len(self._values)}
+
+    def resetstats(self):
+        """Reset the counters of hits and misses."""
+        with self._lock:
+            self._stats = {'hits': 0, 'misses': 0}
+
+    def lookup(self, memory, items, params):
+        """Return the cached values of 'params' of 'items' in the order of the arguments.
+        @param memory : "SPA" or "SEP".
+        @param items : List of items, one per param.
+        @param params : List of parameter IDs.
+        @return : Ordered dictionary {item: {param: value}} with the keys as given or None if a value is missing.
+        """
+        answerdict = OrderedDict()
+        with self._lock:
+            for item, param in zip(items, params):
+                try:
+                    key = (memory,) + getparamkey(item, param)
+                except ValueError:  # let the controller report the invalid parameter ID
+                    key = None
+                if key not in self._values:
+                    self._stats['misses'] += len(items)
+                    return None
+                answerdict.setdefault(item, OrderedDict())[param] = self._values[key]
+            self._stats['hits'] += len(items)
+        return answerdict
+
+    def update(self, memory, answerdict):
+        """Cache the values in 'answerdict'.
+        @param memory : "SPA" or "SEP".
+        @param answerdict : Dictionary {item: {param: value}}.
+        """
+        with self._lock:
+            for item in answerdict:
+                for param, value in answerdict[item].items():
+                    self._values[(memory,) + getparamkey(item, param)] = value
+
+    def invalidate(self, memory=None, items=None, params=None):
+        """Remove cached values.
+        @param memory : "SPA", "SEP" or None for both.
+        @param items : List of items or None or empty for all items.
+        @param params : List of parameter IDs or None or empty for all parameters of 'items'. If 'items' and
+        'params' have the same length they are pairs of item and parameter.
+        """
+        memories = self.MEMORIES if memory is None else (memory,)
+        items = [str(item) for item in items or []]
+        try:
+            params = [getparamkey('', param)[1] for param in params or []]
+        except ValueError:
+            params = []
+        with self._lock:
+            if items and params and len(items) == len(params):
+                keys = [(mem, item, param) for mem in memories for item, param in zip(items, params)]
+            else:
+                keys = [key for key in self._values if key[0] in memories and (not items or key[1] in items) and
+                        (not params or key[2] in params)]
+            for key in keys:
+                self._values.pop(key, None)
+        debug('ParamCache.invalidate(memory=%r, items=%r, params=%r)', memory, items, params)
+
+    def clear(self):
+        """Remove all cached values including the answer of "HPA?"."""
+        with self._lock:
+            self._values.clear()
+            self._hpa = None
+        debug('ParamCache.clear()')
+
+
+def splitcmd(cmdstr):
+    """Return mnemonic and arguments of the command string 'cmdstr'.
+    @param cmdstr : Command as string, e.g. "SPA 1 0x1 5".
+    @return : Tuple (mnemonic in upper case, [argument1, argument2, ...]) as strings.
+    """
+    if len(cmdstr) == 1:
+        return cmdstr, []
+    args = cmdstr.split()
+    return (args[0].upper(), args[1:]) if args else ('', [])
+
+
+class ParamCacheMessages(object):
+    """Pass all calls to a GCSMessages instance and keep a ParamCache up to date.
+    "SPA?", "SEP?" and "HPA?" are answered from the cache if possible, the commands in PARAMCMDS
+    remove the affected values and "RBT" clears the cache. After "SPA" and "SEP" the values of
+    integer parameters are cached if the error check confirmed the command.
+    """
+
+    def __init__(self, msgs, paramcache, getintvalue):
+        """Keep 'paramcache' up to date with the commands sent via 'msgs'.
+        @type msgs : pipython.pidevice.gcsmessages.GCSMessages
+        @type paramcache : ParamCache
+        @param getintvalue : Callable (param, value) that returns the value of an integer parameter
+        as integer or None for other parameters, 'param' and 'value' as strings.
+        """
+        object.__setattr__(self, '_msgs', msgs)
+        object.__setattr__(self, '_paramcache', paramcache)
+        object.__setattr__(self, '_getintvalue', getintvalue)
+
+    def __str__(self):
+        return str(self._msgs)
+
+    def __getattr__(self, name):
+        return getattr(self._msgs, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._msgs, name, value)  # e.g. "errcheck" or "timeout"
+
+    @property
+    def messages(self):
+        """The wrapped GCSMessages instance."""
+        return self._msgs
+
+    @property
+    def paramcache(self):
+        """The ParamCache instance."""
+        return self._paramcache
+
+    def send(self, tosend):
+        """Remove the values changed by 'tosend', send it and cache the values of integer parameters.
+        @param tosend : String to send to device, with or without trailing linefeed.
+        """
+        mnemonic, args = splitcmd(tosend)
+        if mnemonic == 'RBT':
+            self._paramcache.clear()
+        elif mnemonic in PARAMCMDS:
+            self._invalidate(mnemonic, args)
+        self._msgs.send(tosend)
+        if mnemonic in ('SPA', 'SEP') and self._msgs.errcheck and not self._msgs.inbatch:
+            self._writevalues(mnemonic, args[PARAMCMDS[mnemonic][1]:])
+
+    def read(self, tosend, gcsdata=0):
+        """Answer "SPA?", "SEP?" and "HPA?" from the cache or send 'tosend' and read the answer.
+        @param tosend : String to send to device.
+        @param gcsdata : Number of lines, if != 0 then GCS data will be read in background task.
+        @return : Device answer as string.
+        """
+        mnemonic, args = splitcmd(tosend)
+        if gcsdata or mnemonic not in ('SPA?', 'SEP?', 'HPA?'):
+            return self._msgs.read(tosend, gcsdata)
+        if mnemonic == 'HPA?':
+            if self._paramcache.hpa is None:
+                self._paramcache.hpa = self._msgs.read(tosend)
+            return self._paramcache.hpa
+        memory = mnemonic[:3]
+        items, params = args[0::2], args[1::2]
+        if args and len(items) == len(params):
+            answerdict = self._paramcache.lookup(memory, items, params)
+            if answerdict is not None:
+                lines = ['%s %s=%s' % (item, param, answerdict[item][param]) for item, param in zip(items, params)]
+                return ' \n'.join(lines) + '\n'
+        answer = self._msgs.read(tosend)
+        try:
+            answerdict = getdict_twoitems(answer, None, None, itemconv=[str, None], valueconv=(None,),
+                                          convlisttostring=True)
+        except (ValueError, IndexError, TypeError) as exc:
+            debug('ParamCacheMessages: cannot cache the answer %r: %s', answer, exc)
+        else:
+            self._paramcache.update(memory, answerdict)
+        return answer
+
+    def _invalidate(self, mnemonic, args):
+        """Remove the values changed by the command 'mnemonic' with 'args' from the cache."""
+        memory, skip, peritem = PARAMCMDS[mnemonic]
+        args = args[skip:]
+        if not peritem or len(args) % peritem:  # unknown items, remove all values of 'memory'
+            self._paramcache.invalidate(memory)
+        elif peritem == 1:
+            self._paramcache.invalidate(memory, args)
+        elif mnemonic == 'CST':
+            self._paramcache.invalidate(memory, args[0::2])
+        elif args:
+            self._paramcache.invalidate(memory, args[0::peritem], args[1::peritem])
+        else:
+            self._paramcache.invalidate(memory)
+
+    def _writevalues(self, memory, args):
+        """Cache the values of integer parameters set with "SPA" or "SEP".
+        @param memory : "SPA" or "SEP".
+        @param args : List of item, param and value as strings for each value.
+        """
+        answerdict = OrderedDict()
+        for item, param, value in zip(args[0::3], args[1::3], args[2::3]):
+            value = self._getintvalue(param, value)
+            if value is not None:  # float values may be rounded by the controller
+                answerdict.setdefault(item, OrderedDict())[param] = '%d' % value
+        self._paramcache.update(memory, answerdict)
@@ -2,9 +2,6 @@
 # -*- coding: utf-8 -*-
 """Provide GCS functions to control a PI device."""
 
-from . import GCS2Commands
-from . import GCS21Commands
-
 try:
     from .gcs21 import gcs21commands_helpers
 except ImportError:
@@ -22,6 +19,8 @@ def GCSCommands(gcsmessage=None, gcscommands=None):
     @param gcscommands : None or pipython.pidevice.GCS2Commands or pipython.pidevice.GCS21Commands
     @return: Instance of GCS2Commnads or GCS21Commands
     """
+    # Imported on first call, see LAZYCLASSES in pipython.pidevice pylint: disable=C0415
+    from . import GCS2Commands, GCS21Commands
 
     if not gcsmessage:
         raise TypeError("gcsmessage must not be 'None'")
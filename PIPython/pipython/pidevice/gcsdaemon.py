@@ -0,0 +1,366 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Share one connection to a PI controller between several processes via a local socket.
+
+The daemon owns the physical connection and speaks plain GCS on a TCP/IP port on localhost or on a
+UNIX domain socket, so clients connect with GCSDevice(gateway=PISocket(port=DEFAULTPORT)) or with
+GCSDevice(gateway=PIUnixSocket(path)). Each command of a client is sent together with "ERR?" to the
+controller, the error is kept per client and "ERR?" of a client is answered without communication.
+A query that fails, e.g. with a timeout, is answered with an empty line and the error is reported by
+the next "ERR?" of the client. A client that sends SUBSCRIBE receives the current position and on
+target state in every poll cycle, see GCSSubscriber.
+
+    python -m pipython.pidevice.gcsdaemon --usb 0119024343 --port 50100
+"""
+
+from logging import debug, error, warning
+import re
+import socket
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from time import time
+
+from . import GCSError, gcserror
+from .gcsmessages import GCSMessages
+from .gcsscheduler import POLL, PriorityLock, getpriority
+
+DEFAULTPORT = 50100
+
+# Queries whose answers do not change until one of INVALIDATECMDS is sent, they are answered from a cache.
+CACHEDCMDS = ('*IDN?', 'IDN?', 'VER?', 'HLP?', 'HPA?', 'SAI?', 'CST?', 'TMN?', 'TMX?')
+INVALIDATECMDS = ('CST', 'SAI', 'SPA', 'SEP', 'WPA', 'RPA', 'DPA', 'RBT', 'VST')
+
+# Single character commands without answer.
+NOANSWERCMDS = (chr(24),)
+
+# Commands of the daemon protocol, they are no valid GCS commands.
+SUBSCRIBE = '%SUBSCRIBE'
+STATUS = '%STATUS'
+
+# Single character command or complete line.
+COMMAND = re.compile(r'[\x00-\x09\x0b-\x1f]|[^\x00-\x1f]*\n')
+
+
+def splitcommands(rcvbuf):
+    """Split 'rcvbuf' into complete GCS commands.
+    @param rcvbuf : Received data as string.
+    @return : Tuple ([command1, command2, ...], rest) where 'rest' is an incomplete command as string.
+    """
+    cmds = []
+    end = 0
+    for match in COMMAND.finditer(rcvbuf):
+        if match.start() != end:
+            break
+        if match.group().strip() or len(match.group()) == 1 and match.group() != '\n':
+            cmds.append(match.group())
+        end = match.end()
+    return cmds, rcvbuf[end:]
+
+
+def getmnemonic(cmd):
+    """Return the uppercase mnemonic of 'cmd', e.g. "POS?" for "pos? 1\n"."""
+    return cmd if len(cmd) == 1 else cmd.split(None, 1)[0].upper()
+
+
+def hasanswer(cmd):
+    """Return True if the controller answers 'cmd'."""
+    if len(cmd) == 1:
+        return cmd not in NOANSWERCMDS
+    return getmnemonic(cmd).endswith('?')
+
+
+class GCSDaemon(object):
+    """Serve several clients on a local socket with one connection to a PI controller."""
+
+    def __init__(self, gateway, port=DEFAULTPORT, path=None, pollinterval=0.05):
+        """Serve several clients on a local socket with the connected 'gateway'.
+        @type gateway : pipython.pidevice.interfaces.pigateway.PIGateway
+        @param port : TCP/IP port on localhost as integer, only used if 'path' is None.
+        @param path : Path to a UNIX domain socket file as string or None to use 'port'.
+        @param pollinterval : Time in seconds between two status updates to subscribers.
+        """
+        debug('create an instance of GCSDaemon(gateway=%s, port=%s, path=%s)', gateway, port, path)
+        self._msgs = GCSMessages(gateway)
+        self._msgs.errcheck = False
+        self._lock = PriorityLock()  # command and its "ERR?" are sent atomically, stop commands first
+        self._cache = {}
+        self._cachelock = Lock()
+        self._clients = []
+        self._subscribers = []  # dictionaries of the clients, see _serve()
+        self._settings = {'pollinterval': float(pollinterval), 'ontarget': True}
+        self._stopped = Event()
+        if path is None:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind(('localhost', port))
+        else:
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # no member pylint: disable=E1101
+            self._server.bind(path)
+        self._server.listen(8)
+        self._address = self._server.getsockname()
+        self._threads = [Thread(target=self._accept, name='GCSDaemon.accept'),
+                         Thread(target=self._poll, name='GCSDaemon.poll')]
+        for thread in self._threads:
+            thread.daemon = True
+
+    def __str__(self):
+        return 'GCSDaemon(address=%r)' % (self._address,)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def address(self):
+        """Address the daemon listens on, (host, port) or path to socket file."""
+        return self._address
+
+    @property
+    def cache(self):
+        """Copy of the cached answers as dictionary {command: answer}."""
+        with self._cachelock:
+            return dict(self._cache)
+
+    def start(self):
+        """Start serving clients in background threads."""
+        for thread in self._threads:
+            thread.start()
+
+    def serve_forever(self):
+        """Serve clients until close() is called or the process is interrupted."""
+        self.start()
+        while not self._stopped.wait(1.0):
+            pass
+
+    def close(self):
+        """Stop serving and close all connections to clients, the gateway is not closed."""
+        debug('GCSDaemon.close()')
+        self._stopped.set()
+        with self._cachelock:
+            conns = [self._server] + self._clients
+        for conn in conns:  # shutdown() wakes up the threads blocking in accept() and recv()
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except (IOError, OSError):
+                pass
+            conn.close()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(1.0)  # the gateway may be used by others after close()
+
+    def execute(self, cmd, client):
+        """Send 'cmd' to the controller, check the error and return the answer.
+        @param cmd : GCS command as string with trailing linefeed or single character.
+        @param client : Dictionary of the client, its 'error' is set if the controller reports an error
+        or the communication fails.
+        @return : Answer as string, an empty line if a query failed, or None if 'cmd' has no answer.
+        """
+        mnemonic = getmnemonic(cmd)
+        if mnemonic == 'ERR?':
+            err, client['error'] = client['error'], 0
+            return '%d\n' % err
+        if mnemonic in CACHEDCMDS:
+            with self._cachelock:
+                if cmd in self._cache:
+                    return self._cache[cmd]
+        answer = None
+        try:
+            with self._lock(getpriority(cmd)):
+                if len(cmd) > 1 and hasanswer(cmd):  # query and "ERR?" in one round trip
+                    answer, err = self._msgs.readmany([cmd, 'ERR?\n'], checkerror=False)
+                else:  # single character commands would overtake the answer of a pipelined query
+                    if hasanswer(cmd):
+                        answer = self._msgs.read(cmd)
+                    else:
+                        self._msgs.send(cmd)
+                    err = self._msgs.read('ERR?\n')
+                err = int(err.strip())
+        except (GCSError, ValueError) as exc:
+            error('GCSDaemon: %r failed: %s', cmd, exc)
+            client['error'] = getattr(exc, 'val', gcserror.E_1004_PI_UNEXPECTED_RESPONSE) or client['error']
+            return '\n' if hasanswer(cmd) else None  # the client waits for an answer
+        if err:
+            client['error'] = err
+        elif mnemonic in CACHEDCMDS:
+            with self._cachelock:
+                self._cache[cmd] = answer
+        if mnemonic in INVALIDATECMDS:
+            with self._cachelock:
+                self._cache = {}
+        return answer
+
+    def _accept(self):
+        """Accept clients and serve each in its own thread."""
+        while not self._stopped.is_set():
+            try:
+                conn = self._server.accept()[0]
+            except (IOError, OSError):
+                break
+            if self._stopped.is_set():
+                conn.close()
+                break
+            with self._cachelock:
+                self._clients.append(conn)
+            thread = Thread(target=self._serve, args=(conn,), name='GCSDaemon.client')
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, conn):
+        """Execute the commands of a client and send the answers back until the client disconnects."""
+        debug('GCSDaemon: client connected')
+        client = {'error': 0, 'conn': conn, 'sendlock': Lock()}  # answers and status lines are not interleaved
+        rcvbuf = ''
+        try:
+            while not self._stopped.is_set():
+                received = conn.recv(4096)
+                if not received:
+                    break
+                cmds, rcvbuf = splitcommands(rcvbuf + received.decode('cp1252', 'ignore'))
+                for cmd in cmds:
+                    if cmd.strip().upper() == SUBSCRIBE:
+                        with self._cachelock:
+                            self._subscribers.append(client)
+                        continue
+                    answer = self.execute(cmd, client)
+                    if answer is not None:
+                        with client['sendlock']:
+                            conn.sendall(answer.encode('cp1252'))
+        except (IOError, OSError) as exc:
+            warning('GCSDaemon: client disconnected: %s', exc)
+        finally:
+            with self._cachelock:
+                if client in self._subscribers:
+                    self._subscribers.remove(client)
+                if conn in self._clients:
+                    self._clients.remove(conn)
+            conn.close()
+        debug('GCSDaemon: client disconnected')
+
+    def _poll(self):
+        """Query position and on target state and send them to all subscribers."""
+        while not self._stopped.wait(self._settings['pollinterval']):
+            with self._cachelock:
+                subscribers = list(self._subscribers)
+            if not subscribers:
+                continue
+            try:
+                line = self._querystatus()
+            except (GCSError, ValueError) as exc:
+                error('GCSDaemon: cannot query status: %s', exc)
+                continue
+            for client in subscribers:
+                try:
+                    with client['sendlock']:
+                        client['conn'].sendall(line.encode('cp1252'))
+                except (IOError, OSError):
+                    with self._cachelock:
+                        if client in self._subscribers:
+                            self._subscribers.remove(client)
+
+    def _querystatus(self):
+        """Return position and on target state as line "%STATUS <time> <axis>=<pos>,<ont> ...\n"."""
+        cmds = ['POS?', 'ONT?', 'ERR?'] if self._settings['ontarget'] else ['POS?', 'ERR?']
+        with self._lock(POLL):
+            answers = self._msgs.readmany(cmds, checkerror=False)
+        timestamp = time()
+        if int(answers[-1].strip()):
+            if self._settings['ontarget']:
+                warning('GCSDaemon: "ONT?" is not supported, publish position only')
+                self._settings['ontarget'] = False
+            return ''
+        positions = OrderedDict(item.strip().split('=', 1) for item in answers[0].splitlines() if '=' in item)
+        ontarget = OrderedDict(item.strip().split('=', 1) for item in answers[1].splitlines() if '=' in item) \
+            if len(answers) > 2 else {}
+        items = ['%s=%s,%s' % (axis, value.strip(), ontarget.get(axis, '').strip())
+                 for axis, value in positions.items()]
+        return '%s %.6f %s\n' % (STATUS, timestamp, ' '.join(items))
+
+
+class GCSSubscriber(object):
+    """Receive position and on target state from a GCSDaemon, can be used as context manager."""
+
+    def __init__(self, port=DEFAULTPORT, path=None):
+        """Subscribe to the status updates of a GCSDaemon.
+        @param port : TCP/IP port on localhost as integer, only used if 'path' is None.
+        @param path : Path to a UNIX domain socket file as string or None to use 'port'.
+        """
+        if path is None:
+            self._socket = socket.create_connection(('localhost', port))
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # no member pylint: disable=E1101
+            self._socket.connect(path)
+        self._socket.sendall(('%s\n' % SUBSCRIBE).encode('cp1252'))
+        self._rcvbuf = ''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def read(self, timeout=1.0):
+        """Wait for the next status update.
+        @param timeout : Maximum time to wait in seconds as float.
+        @return : Tuple (timestamp, {axis: position}, {axis: ontarget}), ontarget is None if not supported.
+        """
+        self._socket.settimeout(timeout)
+        while '\n' not in self._rcvbuf:
+            received = self._socket.recv(4096)
+            if not received:
+                raise IOError('GCSDaemon closed the connection')
+            self._rcvbuf += received.decode('cp1252', 'ignore')
+        line, self._rcvbuf = self._rcvbuf.split('\n', 1)
+        items = line.split()
+        positions, ontarget = OrderedDict(), OrderedDict()
+        for item in items[2:]:
+            axis, values = item.split('=', 1)
+            position, ont = values.split(',', 1)
+            positions[axis] = float(position)
+            ontarget[axis] = bool(int(ont)) if ont else None
+        return float(items[1]), positions, ontarget
+
+    def close(self):
+        """Close the connection to the daemon."""
+        self._socket.close()
+
+
+def main():
+    """Start a daemon for a controller connected via USB, RS-232 or TCP/IP."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Share one connection to a PI controller between processes.')
+    parser.add_argument('--usb', help='serial number of a controller connected via USB')
+    parser.add_argument('--rs232', help='serial port, e.g. COM1 or /dev/ttyS0')
+    parser.add_argument('--baudrate', type=int, default=115200, help='baud rate for --rs232')
+    parser.add_argument('--tcpip', help='IP address of a controller connected via TCP/IP')
+    parser.add_argument('--port', type=int, default=DEFAULTPORT, help='TCP/IP port of the daemon on localhost')
+    parser.add_argument('--path', help='serve on this UNIX domain socket instead of --port')
+    parser.add_argument('--pollinterval', type=float, default=0.05, help='seconds between status updates')
+    args = parser.parse_args()
+    if args.usb:
+        from .interfaces.piusb import PIUSB
+        gateway = PIUSB()
+        gateway.connect(serialnumber=args.usb)
+    elif args.rs232:
+        from .interfaces.piserial import PISerial
+        gateway = PISerial(port=args.rs232, baudrate=args.baudrate)
+    elif args.tcpip:
+        from .interfaces.pisocket import PISocket
+        gateway = PISocket(host=args.tcpip)
+    else:
+        parser.error('one of --usb, --rs232 or --tcpip is required')
+    daemon = GCSDaemon(gateway, port=args.port, path=args.path, pollinterval=args.pollinterval)
+    print('serving %s on %s, press CTRL+C to stop' % (gateway, daemon.address))
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        gateway.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,555 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Share one link between all controllers of a daisy chain, e.g. several C-863 on one RS-232 port.
+
+DaisyChain owns the gateway and does all communication in one background thread. The commands of
+each controller wait in their own queue and the queues are served in turns: each round takes the next
+request of every controller that has one, sends them with a single write and demultiplexes the answers
+by the address of the responding controller. While a round waits for answers, the next request of each
+controller that is not waiting joins it. So queries to different controllers are pipelined and a slow
+query of one controller does not hold up the others. Stop commands are sent first in each round.
+
+Commands are addressed as "<deviceid> <command>", single character commands as "<deviceid> #<n>",
+the controllers answer with "0 <deviceid> <answer>".
+
+    with DaisyChain(PISerial('/dev/ttyUSB0', 115200)) as chain:
+        stage1, stage2 = chain.device(1), chain.device(2)
+        stage1.MOV('1', 1.0)
+        stage2.MOV('1', 2.0)
+        positions = chain.poll()  # {1: {'1': 0.12}, 2: {'1': 0.34}}
+"""
+
+from collections import OrderedDict, deque
+from logging import debug, error
+import re
+from threading import Condition, Event, RLock, Thread
+from time import time
+
+from . import GCSError, gcserror
+from .gcs2.gcs2commands import GCS2Commands
+from .gcslogger import GCSLogger, RECEIVED, SENT
+from .gcsmessages import GCSBatch, WAITSLICE, importnumpy
+from .gcsscheduler import getpriority
+
+# Valid addresses of controllers in a daisy chain.
+MINDEVICEID = 1
+MAXDEVICEID = 16
+
+# Prefix "<target> <sender> " of each answer line of a chained controller.
+ANSWERPREFIX = re.compile(r'(\d+) (\d+) ')
+
+# Maximum time in seconds a new request waits until it joins a round that is waiting for answers.
+JOINSLICE = 0.005
+
+
+def getaddressed(deviceid, cmd):
+    """Return 'cmd' addressed to the controller 'deviceid'.
+    @param deviceid : Address of the controller as integer.
+    @param cmd : Command as string, single character commands are converted to "#<n>".
+    @return : Addressed command as string with trailing linefeed.
+    """
+    if len(cmd) == 1:
+        cmd = '#%d' % ord(cmd)
+    return '%d %s%s' % (deviceid, cmd, '' if cmd.endswith('\n') else '\n')
+
+
+class DaisyChain(object):
+    """Schedule the commands of all controllers of a daisy chain on one link, can be used as context manager."""
+
+    def __init__(self, gateway):
+        """Schedule the commands of all controllers connected to 'gateway'.
+        @type gateway : pipython.pidevice.interfaces.pigateway.PIGateway
+        """
+        debug('create an instance of DaisyChain(gateway=%s)', gateway)
+        self._gateway = gateway
+        self._queues = OrderedDict()  # {deviceid: deque of requests}
+        self._devices = {}
+        self._condition = Condition()
+        self._round = 0
+        self._taken = []  # all requests taken from the queues in the current round
+        self._logger = None
+        self._stopped = False
+        self._thread = Thread(target=self._run, name='DaisyChain')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __str__(self):
+        return 'DaisyChain(gateway=%s)' % self._gateway
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def gateway(self):
+        """Return the shared gateway."""
+        return self._gateway
+
+    @property
+    def connectionid(self):
+        """Get ID of the shared connection as integer."""
+        return self._gateway.connectionid
+
+    @property
+    def timeout(self):
+        """Get timeout of the shared connection in milliseconds."""
+        return self._gateway.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        """Set timeout of the shared connection to 'value' in milliseconds."""
+        self._gateway.settimeout(int(value))
+
+    @property
+    def logger(self):
+        """Get the logger of the shared connection as GCSLogger instance or None."""
+        return self._logger
+
+    @logger.setter
+    def logger(self, logger):
+        """Set logger of the shared connection, the current logger is closed.
+        @type logger : pipython.pidevice.gcslogger.GCSLogger or None
+        """
+        if self._logger and self._logger is not logger:
+            self._logger.close()
+        self._logger = logger
+        debug('DaisyChain.logger set to %s', logger)
+
+    @property
+    def deviceids(self):
+        """Addresses of all controllers created with device() as list of integers."""
+        with self._condition:
+            return list(self._queues)
+
+    def device(self, deviceid):
+        """Return the commands object of the controller with address 'deviceid', it is created on first use.
+        @param deviceid : Address of the controller in the daisy chain as integer.
+        @return : Instance of GCS2Commands.
+        """
+        deviceid = int(deviceid)
+        if not MINDEVICEID <= deviceid <= MAXDEVICEID:
+            raise ValueError('invalid device ID %d, use %d..%d' % (deviceid, MINDEVICEID, MAXDEVICEID))
+        with self._condition:
+            if deviceid not in self._devices:
+                self._queues[deviceid] = deque()
+                self._devices[deviceid] = GCS2Commands(DaisyChainMessages(self, deviceid))
+            return self._devices[deviceid]
+
+    def request(self, deviceid, cmds, numanswers):
+        """Queue 'cmds' for the controller 'deviceid' and wait for their answers.
+        @param deviceid : Address of the controller as integer.
+        @param cmds : List of commands as strings, they are sent with a single write.
+        @param numanswers : Number of answers expected for 'cmds' as integer.
+        @return : List of answers as strings.
+        """
+        return self.wait(self.submit(deviceid, cmds, numanswers))
+
+    def submit(self, deviceid, cmds, numanswers):
+        """Queue 'cmds' for the controller 'deviceid' without waiting, see wait().
+        @param deviceid : Address of the controller as integer.
+        @param cmds : List of commands as strings, they are sent with a single write.
+        @param numanswers : Number of answers expected for 'cmds' as integer.
+        @return : Request as dictionary to pass to wait().
+        """
+        if deviceid not in self._queues:
+            raise ValueError('unknown device ID %r, call device(%r) first' % (deviceid, deviceid))
+        request = {'deviceid': deviceid, 'tosend': ''.join(getaddressed(deviceid, cmd) for cmd in cmds),
+                   'priority': min(getpriority(cmd) for cmd in cmds), 'numanswers': numanswers,
+                   'answers': [], 'error': None, 'done': Event()}
+        with self._condition:
+            if self._stopped:
+                raise GCSError(gcserror.E_1_COM_ERROR, '@ DaisyChain.submit: daisy chain is closed')
+            self._queues[deviceid].append(request)
+            self._condition.notify()
+        return request
+
+    def wait(self, request):
+        """Wait until 'request' has been answered.
+        @param request : Dictionary returned by submit().
+        @return : List of answers as strings.
+        """
+        while not request['done'].wait(WAITSLICE):
+            if not self._thread.is_alive():
+                raise GCSError(gcserror.E_1_COM_ERROR, '@ DaisyChain.wait: daisy chain is closed')
+        if request['error']:
+            raise request['error']
+        return request['answers']
+
+    def poll(self, deviceids=None):
+        """Query the positions of all axes of all controllers in one round trip.
+        @param deviceids : List of addresses as integers or None for all controllers created with device().
+        @return : Ordered dictionary {deviceid: ordered dictionary {axis: position as float}}.
+        """
+        deviceids = self.deviceids if deviceids is None else [int(deviceid) for deviceid in deviceids]
+        requests = [self.submit(deviceid, ['POS?\n', 'ERR?\n'], 2) for deviceid in deviceids]
+        positions = OrderedDict()
+        for deviceid, request in zip(deviceids, requests):
+            answer, err = self.wait(request)
+            err = int(err.strip())
+            if err:
+                raise GCSError(err, '@ DaisyChain.poll device %d' % deviceid)
+            positions[deviceid] = OrderedDict()
+            for line in answer.splitlines():
+                axis, value = line.split('=', 1)
+                positions[deviceid][axis.strip()] = float(value)
+        return positions
+
+    def close(self):
+        """Stop the scheduler, pending requests fail. The gateway is closed too."""
+        debug('DaisyChain.close()')
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._gateway.close()
+        self.logger = None
+
+    def _run(self):
+        """Serve the queues in rounds until close() is called."""
+        while True:
+            with self._condition:
+                while not self._stopped and not any(self._queues.values()):
+                    self._condition.wait()
+                if self._stopped:
+                    break
+                requests = self._nextround()
+            pending = {}
+            self._taken = list(requests)
+            try:
+                self._send(requests, pending)
+                self._readanswers(pending)
+            except (GCSError, IOError, OSError) as exc:
+                error('DaisyChain: communication failed: %s', exc)
+                for request in self._taken:  # also the requests whose write failed
+                    if not request['done'].is_set():
+                        request['error'] = exc if isinstance(exc, GCSError) else GCSError(gcserror.E_1_COM_ERROR, exc)
+                        request['done'].set()
+                self._gateway.flush()
+        with self._condition:
+            for queue in self._queues.values():
+                for request in queue:
+                    request['error'] = GCSError(gcserror.E_1_COM_ERROR, '@ DaisyChain: daisy chain is closed')
+                    request['done'].set()
+                queue.clear()
+
+    def _nextround(self):
+        """Take the next request of each controller, call with the condition acquired.
+        The controller that is served first changes with each round, stop commands are always first.
+        @return : List of requests.
+        """
+        deviceids = list(self._queues)
+        start = self._round % len(deviceids)
+        self._round += 1
+        requests = [self._queues[deviceid].popleft() for deviceid in deviceids[start:] + deviceids[:start]
+                    if self._queues[deviceid]]
+        return sorted(requests, key=lambda request: request['priority'])  # stable, keeps the order of turns
+
+    def _joinround(self, pending):
+        """Take the next request of each controller that has no request in the current round.
+        @param pending : Dictionary {deviceid: request} of the requests waiting for answers.
+        @return : List of requests.
+        """
+        with self._condition:
+            requests = [queue.popleft() for deviceid, queue in self._queues.items() if queue and deviceid not in pending]
+        self._taken.extend(requests)
+        return requests
+
+    def _send(self, requests, pending):
+        """Send 'requests' with a single write and add those that expect answers to 'pending'."""
+        tosend = ''.join(request['tosend'] for request in requests)
+        self._gateway.send(tosend)
+        if self._logger:
+            self._logger.log(SENT, self.connectionid, tosend)
+        for request in requests:
+            if request['numanswers']:
+                pending[request['deviceid']] = request
+            else:
+                request['done'].set()
+
+    def _readanswers(self, pending):
+        """Read the answers of all 'pending' requests, each request is released when it is complete.
+        While waiting, new requests of controllers without pending request are sent, too.
+        @param pending : Dictionary {deviceid: request}, is emptied.
+        """
+        lines = {}  # {deviceid: list of received lines of the current answer}
+        current = None  # address of the controller whose multi-line answer is not complete
+        rcvbuf = u''
+        timeout = time() + self.timeout / 1000.
+        while pending:
+            received = self._gateway.read()
+            if received:
+                received = bytes(received).decode(encoding='cp1252', errors='ignore')
+                if self._logger:
+                    self._logger.log(RECEIVED, self.connectionid, received)
+                rcvbuf += received
+                timeout = time() + self.timeout / 1000.
+                splitpos = rcvbuf.rfind('\n') + 1
+                for line in rcvbuf[:splitpos].splitlines(True):
+                    current = self._addline(line, current, lines, pending)
+                rcvbuf = rcvbuf[splitpos:]
+            requests = self._joinround(pending)
+            if requests:
+                self._send(requests, pending)
+                timeout = time() + self.timeout / 1000.
+            if received or requests:
+                continue
+            remaining = timeout - time()
+            if remaining <= 0:
+                raise GCSError(gcserror.E_7_COM_TIMEOUT, '@ DaisyChain: no answer from device(s) %s' %
+                               ', '.join('%d' % deviceid for deviceid in sorted(pending)))
+            self._gateway.waitfordata(min(remaining, JOINSLICE))
+
+    @staticmethod
+    def _addline(line, current, lines, pending):
+        """Add the received 'line' to the answer of its controller.
+        Continuation lines of a multi-line answer may come with or without address prefix.
+        @return : Address of the controller whose answer continues with the next line or None.
+        """
+        match = ANSWERPREFIX.match(line)
+        if current is None:
+            if not match or int(match.group(2)) not in pending:
+                raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, '@ DaisyChain: unexpected answer %r' % line)
+            current = int(match.group(2))
+        if match and int(match.group(2)) == current:
+            line = line[match.end():]
+        lines.setdefault(current, []).append(line)
+        if line.endswith(' \n'):
+            return current
+        request = pending[current]
+        request['answers'].append(''.join(lines.pop(current)))
+        if len(request['answers']) == request['numanswers']:
+            del pending[current]
+            request['done'].set()
+        return None
+
+
+# Too many instance attributes pylint: disable=R0902
+class DaisyChainMessages(object):
+    """Provide the interface of GCSMessages for one controller of a DaisyChain.
+    "ERR?" is always sent with the command it checks, so each command needs a single round trip.
+    """
+
+    def __init__(self, chain, deviceid):
+        """Communicate with the controller 'deviceid' of 'chain'.
+        @type chain : DaisyChain
+        @param deviceid : Address of the controller as integer.
+        """
+        debug('create an instance of DaisyChainMessages(chain=%s, deviceid=%d)', chain, deviceid)
+        self._chain = chain
+        self._deviceid = deviceid
+        self._lock = RLock()  # a batch blocks the other threads of this controller
+        self._batch = {'cmds': None, 'depth': 0, 'locate': False}
+        self._databuffer = {'size': False, 'data': [], 'error': None}
+        self._arraymode = False
+        self.errcheck = True
+        self.embederr = True  # always, has no effect
+
+    def __str__(self):
+        return 'DaisyChainMessages(chain=%s, deviceid=%d)' % (self._chain, self._deviceid)
+
+    @property
+    def deviceid(self):
+        """Address of the controller in the daisy chain as integer."""
+        return self._deviceid
+
+    @property
+    def connectionid(self):
+        """Get ID of the shared connection as integer."""
+        return self._chain.connectionid
+
+    @property
+    def logfile(self):
+        """Full path to file where the communication of the daisy chain is logged, empty if not logged."""
+        return self._chain.logger.filepath if self._chain.logger else ''
+
+    @logfile.setter
+    def logfile(self, filepath):
+        """Log the communication of the whole daisy chain to 'filepath', empty string disables logging."""
+        self._chain.logger = GCSLogger(filepath) if filepath else None
+
+    @property
+    def logger(self):
+        """Get logger of the daisy chain as GCSLogger instance or None."""
+        return self._chain.logger
+
+    @logger.setter
+    def logger(self, logger):
+        """Set logger of the daisy chain, the current logger is closed."""
+        self._chain.logger = logger
+
+    @property
+    def stats(self):
+        """Instrumentation is not available for daisy chains, always None."""
+        return None
+
+    @stats.setter
+    def stats(self, stats):
+        """Instrumentation is not available for daisy chains."""
+        if stats:
+            raise GCSError(gcserror.E_11_COM_NOT_IMPLEMENTED, 'instrumentation is not available for daisy chains')
+
+    @property
+    def timeout(self):
+        """Get timeout of the shared connection in milliseconds."""
+        return self._chain.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        """Set timeout of the shared connection, applies to all controllers of the daisy chain."""
+        self._chain.timeout = value
+
+    @property
+    def bufstate(self):
+        """False if no buffered data is available, True if buffered data is ready to use.
+        GCS data is read completely before read() returns, so there is no progress value.
+        """
+        if self._databuffer['error']:
+            raise self._databuffer['error']  # Raising NoneType pylint: disable=E0702
+        return self._databuffer['size']
+
+    @property
+    def bufdata(self):
+        """Get buffered data as 2-dimensional list of float values or, if 'arraymode' is True, as
+        2-dimensional numpy array of shape (columns, datasets).
+        """
+        return self._databuffer['data']
+
+    @property
+    def arraymode(self):
+        """True if GCS data is read into a numpy array instead of lists of floats."""
+        return self._arraymode
+
+    @arraymode.setter
+    def arraymode(self, value):
+        """Set array mode, i.e. if GCS data is read into a numpy array. Requires the "numpy" package."""
+        if value:
+            importnumpy()
+        self._arraymode = bool(value)
+
+    @property
+    def inbatch(self):
+        """True if set commands are currently queued by a batch."""
+        return self._batch['cmds'] is not None
+
+    def batch(self, locate=False):
+        """Get a context manager that queues all set commands and sends them as one request.
+        @param locate : If True an error reports the index of the failing command in the batch.
+        @return : Instance of GCSBatch.
+        """
+        return GCSBatch(self, locate)
+
+    def beginbatch(self, locate=False):
+        """Start queueing set commands. Nested calls join the outer batch."""
+        self._lock.acquire()
+        if not self._batch['depth']:
+            self._batch['cmds'] = []
+            self._batch['locate'] = bool(locate)
+        self._batch['depth'] += 1
+
+    def endbatch(self, discard=False):
+        """Finish the current batch and send the queued commands if this is the outermost batch."""
+        try:
+            self._batch['depth'] -= 1
+            if self._batch['depth'] > 0:
+                return
+            if not discard:
+                self.flushbatch()
+        finally:
+            if self._batch['depth'] <= 0:  # also if sending or the error check raised
+                self._batch['cmds'] = None
+                self._batch['depth'] = 0
+            self._lock.release()
+
+    def flushbatch(self):
+        """Send the queued commands as one request and check for error."""
+        with self._lock:
+            cmds = self._batch['cmds']
+            if not cmds:
+                return
+            self._batch['cmds'] = []
+            if not self.errcheck:
+                self._chain.request(self._deviceid, cmds, 0)
+            elif not self._batch['locate']:
+                self._raiseerror(self._chain.request(self._deviceid, cmds + ['ERR?\n'], 1)[0], cmds)
+            else:  # each line is addressed on its own, so "ERR?" is a separate command
+                answers = self._chain.request(self._deviceid, [line for cmd in cmds for line in (cmd, 'ERR?\n')],
+                                              len(cmds))
+                for cmd, answer in zip(cmds, answers):
+                    self._raiseerror(answer, [cmd])
+
+    def send(self, tosend):
+        """Send 'tosend' to the controller and check for error.
+        @param tosend : String to send, with or without trailing linefeed.
+        """
+        if len(tosend) > 1 and not tosend.endswith('\n'):
+            tosend += '\n'
+        with self._lock:
+            if self.inbatch:
+                self._batch['cmds'].append(tosend)
+                return
+        if self.errcheck:
+            self._raiseerror(self._chain.request(self._deviceid, [tosend, 'ERR?\n'], 1)[0], [tosend])
+        else:
+            self._chain.request(self._deviceid, [tosend], 0)
+
+    def read(self, tosend, gcsdata=0):
+        """Send 'tosend' to the controller, read answer and check for error.
+        @param tosend : String to send.
+        @param gcsdata : If != 0 the answer contains GCS data that is stored in 'bufdata'.
+        @return : Answer as string, only the header if 'gcsdata' is != 0.
+        """
+        answer = self.readmany([tosend])[0]
+        if gcsdata != 0:
+            answer = self._storegcsdata(answer)
+        return answer
+
+    def readmany(self, cmds, checkerror=True):
+        """Send all queries in 'cmds' as one request and read their answers.
+        @param cmds : List of queries as strings, with or without trailing linefeed.
+        @param checkerror : If True "ERR?" is appended and checked once for all 'cmds'.
+        @return : List of answers as strings in the order of 'cmds'.
+        """
+        cmds = [cmd if len(cmd) == 1 or cmd.endswith('\n') else cmd + '\n' for cmd in cmds]
+        checkerror = checkerror and self.errcheck
+        self.flushbatch()
+        answers = self._chain.request(self._deviceid, cmds + (['ERR?\n'] if checkerror else []),
+                                      len(cmds) + int(checkerror))
+        if checkerror:
+            self._raiseerror(answers.pop(), cmds)
+        return answers
+
+    def _raiseerror(self, answer, cmds):
+        """Raise GCSError if 'answer' of "ERR?" reports an error for 'cmds'."""
+        try:
+            err = int(answer.strip())
+        except ValueError:
+            raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, '@ DaisyChainMessages: ERR? answered %r' % answer)
+        if err:
+            raise GCSError(err, '@ device %d in %r' % (self._deviceid, ''.join(cmds)))
+
+    def _storegcsdata(self, answer):
+        """Store the data of the GCS data 'answer' in 'bufdata' and return its header."""
+        self._databuffer = {'size': False, 'data': [], 'error': None}
+        splitpos = answer.upper().find('# END_HEADER')
+        if splitpos < 0:
+            raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, '@ DaisyChainMessages: no header in %r' % answer)
+        splitpos = answer.find('\n', splitpos) + 1
+        header, lines = answer[:splitpos], answer[splitpos:].splitlines()
+        numcolumns = len(lines[0].split()) if lines else 0
+        data = [[] for _ in range(numcolumns)]
+        for line in lines:
+            try:
+                values = [float(value) for value in line.split()]
+            except ValueError:
+                values = []
+            if len(values) != numcolumns:
+                self._databuffer['error'] = GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, 'invalid line %r' % line)
+                continue
+            for column, value in zip(data, values):
+                column.append(value)
+        self._databuffer['data'] = importnumpy().array(data) if self._arraymode else data
+        self._databuffer['size'] = True
+        return header
@@ -0,0 +1,256 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Log the communication to/from a GCS device in a background thread."""
+
+from logging import debug, error, warning
+import atexit
+import os
+import struct
+from collections import deque
+from threading import Event, Thread
+from time import time
+
+# Direction of a logged message.
+SENT = 0
+RECEIVED = 1
+
+# First bytes of a binary log file.
+BINMAGIC = b'GCSLOG1\n'
+
+# Header of a binary record: timestamp, direction, connection ID, number of data bytes.
+BINRECORD = struct.Struct('<dBiI')
+
+# Time in seconds the writer thread waits for new records.
+WRITEINTERVAL = 0.05
+
+# Default maximum time in seconds flush() and close() wait for the writer thread.
+WAITTIMEOUT = 10.0
+
+# Default maximum number of records waiting for the writer thread, further records are dropped.
+MAXRECORDS = 100000
+
+_STOP = object()
+
+
+def totext(direction, data):
+    """Return 'data' as line for a text log file, i.e. with escaped control characters.
+    @param direction : SENT or RECEIVED, received data is indented by two spaces.
+    @param data : Message as bytes without trailing linefeed.
+    @return : Line as string without trailing linefeed.
+    """
+    text = repr(data)
+    text = text[text.index(text[-1]) + 1:-1]  # no "b" prefix and quotes, e.g. b'POS?' -> POS?
+    return '  ' + text if direction == RECEIVED else text
+
+
+def readlog(filepath):
+    """Read a binary log file written by GCSLogger.
+    @param filepath : Full path to log file.
+    @return : Generator of (timestamp, direction, connectionid, data) tuples, 'data' as bytes.
+    """
+    with open(filepath, 'rb') as fobj:
+        if fobj.read(len(BINMAGIC)) != BINMAGIC:
+            raise ValueError('%r is not a binary GCS log file' % filepath)
+        while True:
+            header = fobj.read(BINRECORD.size)
+            if len(header) < BINRECORD.size:
+                break
+            timestamp, direction, connectionid, size = BINRECORD.unpack(header)
+            yield timestamp, direction, connectionid, fobj.read(size)
+
+
+class GCSLogger(object):
+    """Write the communication to/from a GCS device to a file in a background thread.
+    Records are only appended to a deque by the caller, encoding and buffered writing is done by the writer thread.
+    If the writer thread cannot keep up, e.g. on a slow disk, records are dropped and their number is logged.
+    """
+
+    def __init__(self, filepath, binary=False, timestamps=False, maxbytes=0, maxage=0, backups=3,
+                 flushinterval=1.0, maxrecords=MAXRECORDS):
+        """Write the communication to/from a GCS device to 'filepath'.
+        @param filepath : Full path to log file, is appended to if it exists.
+        @param binary : If True write compact binary records that can be read with readlog().
+        @param timestamps : If True prepend timestamp and connection ID to each line of a text log.
+        @param maxbytes : Rotate log file when it reaches this size in bytes, 0 means never.
+        @param maxage : Rotate log file when it is older than this time in seconds, 0 means never.
+        @param backups : Number of rotated files to keep as "filepath.1" to "filepath.<backups>".
+        @param flushinterval : Maximum time in seconds until a record is written to disk.
+        @param maxrecords : Maximum number of records waiting for the writer thread, 0 means no limit.
+        """
+        debug('create an instance of GCSLogger(filepath=%r, binary=%s)', filepath, binary)
+        self._filepath = filepath
+        self._settings = {'binary': binary, 'timestamps': timestamps, 'maxbytes': int(maxbytes),
+                          'maxage': float(maxage), 'backups': int(backups), 'flushinterval': float(flushinterval),
+                          'maxrecords': int(maxrecords)}
+        self._file = {'fobj': None, 'opened': 0}
+        self._records = deque()  # flush events and _STOP are not limited by 'maxrecords'
+        self._dropped = {'total': 0, 'reported': 0}
+        self._wakeup = Event()
+        self._thread = Thread(target=self._run, name='GCSLogger')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __str__(self):
+        return 'GCSLogger(filepath=%r, binary=%s)' % (self._filepath, self._settings['binary'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def filepath(self):
+        """Full path to log file as string."""
+        return self._filepath
+
+    @property
+    def binary(self):
+        """True if records are written in binary format."""
+        return self._settings['binary']
+
+    @property
+    def dropped(self):
+        """Number of records that have been dropped because the writer thread could not keep up."""
+        return self._dropped['total']
+
+    @property
+    def closed(self):
+        """True if the writer thread has been stopped."""
+        return not self._thread.is_alive()
+
+    def log(self, direction, connectionid, msg):
+        """Enqueue a record for the writer thread, returns immediately.
+        @param direction : SENT or RECEIVED.
+        @param connectionid : ID of the connection as integer.
+        @param msg : Message as string or bytes with or without trailing linefeed.
+        """
+        if self._settings['maxrecords'] and len(self._records) >= self._settings['maxrecords']:
+            self._dropped['total'] += 1
+            return
+        self._records.append((time(), direction, connectionid, msg))
+
+    def flush(self, timeout=WAITTIMEOUT):
+        """Block until all enqueued records are written to disk.
+        @param timeout : Maximum time to wait in seconds as float or None to wait without limit.
+        @return : True if all records have been written, False if 'timeout' has expired.
+        """
+        if self.closed:
+            return True
+        flushed = Event()
+        self._records.append(flushed)
+        self._wakeup.set()
+        if not flushed.wait(timeout):
+            error('GCSLogger: flushing %r timed out after %s s', self._filepath, timeout)
+            return False
+        return True
+
+    def close(self, timeout=WAITTIMEOUT):
+        """Write all enqueued records, close the log file and stop the writer thread.
+        @param timeout : Maximum time to wait for the writer thread in seconds as float or None to wait without limit.
+        """
+        if hasattr(atexit, 'unregister'):  # Python 3 only
+            atexit.unregister(self.close)
+        if self.closed:
+            return
+        debug('GCSLogger.close(%r)', self._filepath)
+        self._records.append(_STOP)
+        self._wakeup.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            error('GCSLogger: closing %r timed out after %s s', self._filepath, timeout)
+
+    def _run(self):
+        """Write records from the deque in a background thread until _STOP is received."""
+        lastflush = time()
+        while True:
+            self._wakeup.wait(WRITEINTERVAL)
+            self._wakeup.clear()
+            while self._records:
+                record = self._records.popleft()
+                if record is _STOP:
+                    self._reportdropped()
+                    self._close()
+                    return
+                if isinstance(record, tuple):
+                    self._write(*record)
+                else:
+                    self._flush()
+                    lastflush = time()
+                    record.set()
+            self._reportdropped()
+            if time() - lastflush >= self._settings['flushinterval']:
+                self._flush()
+                lastflush = time()
+
+    def _reportdropped(self):
+        """Log the number of records dropped since the last report."""
+        dropped = self._dropped['total'] - self._dropped['reported']
+        if dropped:
+            self._dropped['reported'] += dropped
+            warning('GCSLogger: %d records dropped, writing to %r cannot keep up', dropped, self._filepath)
+
+    def _write(self, timestamp, direction, connectionid, msg):
+        """Write a record, errors are logged and do not stop the writer thread."""
+        try:
+            self._writerecord(timestamp, direction, connectionid, msg)
+        except Exception as exc:  # Catching too general exception pylint: disable=W0703
+            error('GCSLogger: cannot write to %r: %s', self._filepath, exc)
+
+    def _writerecord(self, timestamp, direction, connectionid, msg):
+        """Encode a record and write it to the log file, rotate the log file if required."""
+        if not isinstance(msg, bytes):
+            msg = msg.encode('cp1252', 'replace')
+        if self._file['fobj'] is None:
+            self._open()
+        elif self._isexpired():
+            self._rotate()
+        if self._settings['binary']:
+            self._file['fobj'].write(BINRECORD.pack(timestamp, direction, connectionid, len(msg)) + msg)
+        else:
+            line = totext(direction, msg.rstrip(b'\n'))
+            if self._settings['timestamps']:
+                line = '%.6f %d %s' % (timestamp, connectionid, line)
+            self._file['fobj'].write(('%s\n' % line).encode('cp1252', 'replace'))
+
+    def _isexpired(self):
+        """Return True if the log file has to be rotated according to its size or age."""
+        if self._settings['maxbytes'] and self._file['fobj'].tell() >= self._settings['maxbytes']:
+            return True
+        if self._settings['maxage'] and time() - self._file['opened'] >= self._settings['maxage']:
+            return True
+        return False
+
+    def _open(self):
+        """Open the log file for appending with a buffered file object."""
+        fobj = open(self._filepath, 'ab')
+        if self._settings['binary'] and not fobj.tell():
+            fobj.write(BINMAGIC)
+        self._file = {'fobj': fobj, 'opened': time()}
+
+    def _flush(self):
+        """Write buffered data to disk."""
+        if self._file['fobj']:
+            try:
+                self._file['fobj'].flush()
+            except Exception as exc:  # Catching too general exception pylint: disable=W0703
+                error('GCSLogger: cannot write to %r: %s', self._filepath, exc)
+
+    def _close(self):
+        """Flush and close the log file."""
+        if self._file['fobj']:
+            self._file['fobj'].close()
+        self._file['fobj'] = None
+
+    def _rotate(self):
+        """Rename "filepath" to "filepath.1", "filepath.1" to "filepath.2" and so on and open a new log file."""
+        debug('GCSLogger: rotate %r', self._filepath)
+        self._close()
+        names = [self._filepath] + ['%s.%d' % (self._filepath, i) for i in range(1, self._settings['backups'] + 1)]
+        if os.path.exists(names[-1]):
+            os.remove(names[-1])
+        for i in range(len(names) - 1, 0, -1):
+            if os.path.exists(names[i - 1]):
+                os.rename(names[i - 1], names[i])
+        self._open()
@@ -3,13 +3,43 @@
 """Process messages between GCSCommands and an interface."""
 
 from logging import debug, error
-from threading import RLock, Thread
+import re
+from threading import Thread
 import sys
 from time import time
 from . import GCSError, gcserror
+from .gcslogger import GCSLogger, SENT, RECEIVED
+from .gcsscheduler import PriorityLock, getpriority, MOTION
+from .gcsstats import GCSStats
+
+# Imported by importnumpy() when the array mode is enabled, numpy takes longer to import than pipython itself.
+numpy = None
 
 __signature__ = 0x27b2146109004ce71165ac4a87f0ace2
 
+# LF or CR without preceeding SPACE that is not the last character of an answer
+NOEOL = re.compile(b'[^ ][\r\n](?=.)', re.DOTALL)
+
+# Maximum time in seconds to block in the interface before the timeout is checked again
+WAITSLICE = 0.1
+
+# LF without preceeding SPACE, i.e. end of the last line of GCS data
+ENDOFDATA = re.compile(r'[^ ]\n')
+
+
+def importnumpy():
+    """Import numpy on first use.
+    @return : The numpy module.
+    @raise ImportError : If the "numpy" package is not installed.
+    """
+    global numpy  # Using the global statement pylint: disable=W0603
+    if numpy is None:
+        try:
+            import numpy  # Redefining name from outer scope pylint: disable=W0621
+        except ImportError:
+            raise ImportError('arraymode requires the "numpy" package (pip install numpy)')
+    return numpy
+
 
 def eol(rcvbuf):
     """Return True if 'rcvbuf' is complete in terms of GCS syntax.
@@ -27,6 +57,70 @@ def eol(rcvbuf):
     return False
 
 
+def eolbytes(rcvbuf):
+    """Return True if 'rcvbuf' is complete in terms of GCS syntax.
+    @param rcvbuf : Answer as bytes or bytearray.
+    @return : True if 'rcvbuf' is complete else False.
+    """
+    size = len(rcvbuf)
+    if not size:
+        return False
+    if size == 1:
+        return rcvbuf[0] < 32
+    return rcvbuf[-1] == 10 and rcvbuf[-2] != 32
+
+
+def _haslinebreak(answer):
+    """Return True if 'answer' may contain a LF/CR without a preceeding SPACE except at the start and the end.
+    Counting is much faster than NOEOL.search() for large answers, e.g. of "DRR?", that are valid.
+    @param answer : Answer as bytes or bytearray.
+    """
+    linebreaks = answer.count(b'\n') + answer.count(b'\r') - answer.count(b' \n') - answer.count(b' \r')
+    if linebreaks <= 0:
+        return False
+    if answer[:1] in (b'\n', b'\r'):
+        linebreaks -= 1
+    if len(answer) > 1 and answer[-1:] in (b'\n', b'\r') and answer[-2:-1] != b' ':
+        linebreaks -= 1
+    return linebreaks > 0
+
+
+def splitanswers(rcvbuf):
+    """Split 'rcvbuf' into complete answers in terms of GCS syntax.
+    @param rcvbuf : Received data as string, may contain several consecutive answers.
+    @return : Tuple ([answer1, answer2, ...], rest) where 'rest' is an incomplete answer as string.
+    """
+    answers = []
+    start = 0
+    pos = rcvbuf.find('\n')
+    while pos >= 0:
+        if pos == 0 or rcvbuf[pos - 1] != ' ':
+            answers.append(rcvbuf[start:pos + 1])
+            start = pos + 1
+        pos = rcvbuf.find('\n', pos + 1)
+    return answers, rcvbuf[start:]
+
+
+class GCSBatch(object):
+    """Queue set commands and send them with a single write, can be used as context manager."""
+
+    def __init__(self, msgs, locate=False):
+        """Queue set commands of 'msgs' and send them with a single write when the context is left.
+        @type msgs : GCSMessages
+        @param locate : If True "ERR?" is embedded after each command to report the failing command,
+        else a single "ERR?" is appended to the batch. Both variants need only one round trip.
+        """
+        self._msgs = msgs
+        self._locate = locate
+
+    def __enter__(self):
+        self._msgs.beginbatch(self._locate)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._msgs.endbatch(discard=exc_type is not None)
+
+
 class GCSMessages(object):
     """Provide a GCS communication layer."""
 
@@ -35,13 +129,17 @@ class GCSMessages(object):
         @type interface : pipython.interfaces.pigateway.PIGateway
         """
         debug('create an instance of GCSMessages(interface=%s)', interface)
-        self._lock = RLock()
+        self._lock = PriorityLock()  # STP/HLT are served before set commands, polls and diagnostics
         self._interface = interface
         self._databuffer = {'size': 0, 'index': 0, 'lastindex': 0, 'lastupdate': None, 'data': [], 'error': None}
         self._stopthread = False
-        self.logfile = ''  # Full path to file where communication to/from controller is logged.
+        self._logger = None  # Writes communication to/from controller in a background thread.
         self.errcheck = True
         self.embederr = False
+        self._batch = {'cmds': None, 'depth': 0, 'locate': False}
+        self._rcvbuf = bytearray()
+        self._arraymode = False
+        self._stats = {'stats': None, 'interface': '', 'sentkey': None, 'sentat': None}
 
     def __str__(self):
         return 'GCSMessages(interface=%s), id=%d' % (self._interface, self.connectionid)
@@ -51,11 +149,73 @@ class GCSMessages(object):
         """Get ID of current connection as integer."""
         return self._interface.connectionid
 
+    @property
+    def logfile(self):
+        """Full path to file where communication to/from controller is logged, empty if not logged."""
+        return self._logger.filepath if self._logger else ''
+
+    @logfile.setter
+    def logfile(self, filepath):
+        """Log communication to/from controller to 'filepath' in text format, empty string disables logging.
+        Use self.logger for binary format or rotation of the log file.
+        @param filepath : Full path to log file as string.
+        """
+        self.logger = GCSLogger(filepath) if filepath else None
+
+    @property
+    def logger(self):
+        """Get current logger as GCSLogger instance or None."""
+        return self._logger
+
+    @logger.setter
+    def logger(self, logger):
+        """Set logger, the current logger is closed.
+        @type logger : pipython.pidevice.gcslogger.GCSLogger or None
+        """
+        if self._logger and self._logger is not logger:
+            self._logger.close()
+        self._logger = logger
+        debug('GCSMessages.logger set to %s', logger)
+
     @property
     def timeout(self):
         """Get current timeout setting in milliseconds."""
         return self._interface.timeout
 
+    @property
+    def stats(self):
+        """Get instrumentation as GCSStats instance or None if disabled."""
+        return self._stats['stats']
+
+    @stats.setter
+    def stats(self, stats):
+        """Enable or disable the instrumentation of the communication.
+        @param stats : GCSStats instance, True for a new GCSStats instance or None/False to disable.
+        """
+        if stats is True:
+            stats = GCSStats()
+        self._stats = {'stats': stats or None, 'interface': type(self._interface).__name__, 'sentkey': None,
+                       'sentat': None}
+        debug('GCSMessages.stats set to %s', stats)
+
+    @property
+    def waitstats(self):
+        """Time commands have waited for the connection as {priority: {'count', 'mean', 'max'}} in seconds,
+        priorities are gcsscheduler.EMERGENCY, MOTION, POLL and DIAGNOSTIC.
+        """
+        return self._lock.stats
+
+    def resetwaitstats(self):
+        """Clear the waiting time statistics."""
+        self._lock.resetstats()
+
+    @property
+    def maxwaiting(self):
+        """Dictionary {priority: maximum number of waiting threads or None}, can be changed in place.
+        A command that exceeds the limit raises GCSError E_1008_PI_CONTROLLER_BUSY.
+        """
+        return self._lock.maxwaiting
+
     @timeout.setter
     def timeout(self, value):
         """Set timeout.
@@ -90,19 +250,130 @@ class GCSMessages(object):
 
     @property
     def bufdata(self):
-        """Get buffered data as 2-dimensional list of float values."""
+        """Get buffered data as 2-dimensional list of float values or, if 'arraymode' is True, as
+        2-dimensional numpy array of shape (columns, datasets) which is a view on the buffer.
+        """
         debug('GCSMessages.bufdata: %d datasets', self._databuffer['index'])
+        if self._arraymode and numpy is not None and isinstance(self._databuffer['data'], numpy.ndarray):
+            return self._databuffer['data'][:, :self._databuffer['index']]
         return self._databuffer['data']
 
+    @property
+    def arraymode(self):
+        """True if GCS data is read into a preallocated numpy array instead of lists of floats."""
+        return self._arraymode
+
+    @arraymode.setter
+    def arraymode(self, value):
+        """Set array mode, i.e. if GCS data is read into a numpy array. Requires the "numpy" package.
+        @param value : True to use a numpy array, False to use lists of floats (default).
+        """
+        if value:
+            importnumpy()
+        self._arraymode = bool(value)
+        debug('GCSMessages.arraymode set to %s', self._arraymode)
+
+    @property
+    def inbatch(self):
+        """True if set commands are currently queued by a batch. The batch holds the connection lock,
+        so all other threads wait until it is finished."""
+        return self._batch['cmds'] is not None
+
+    def batch(self, locate=False):
+        """Get a context manager that queues all set commands and sends them with a single write and
+        a single error check when the context is left. Queries inside the batch send the queued
+        commands first. Other threads are blocked until the batch is finished.
+        @param locate : If True an error reports the index of the failing command in the batch.
+        @return : Instance of GCSBatch.
+        """
+        return GCSBatch(self, locate)
+
+    def beginbatch(self, locate=False):
+        """Start queueing set commands. Nested calls join the outer batch.
+        @param locate : If True an error reports the index of the failing command in the batch.
+        """
+        self._lock.acquire(MOTION)
+        if not self._batch['depth']:
+            self._batch['cmds'] = []
+            self._batch['locate'] = bool(locate)
+        self._batch['depth'] += 1
+        debug('GCSMessages.beginbatch(locate=%s): depth %d', locate, self._batch['depth'])
+
+    def endbatch(self, discard=False):
+        """Finish the current batch and send the queued commands if this is the outermost batch.
+        @param discard : If True the queued commands are dropped without sending them.
+        """
+        try:
+            self._batch['depth'] -= 1
+            if self._batch['depth'] > 0:
+                return
+            if discard:
+                debug('GCSMessages.endbatch: discard %d commands', len(self._batch['cmds']))
+            else:
+                self.flushbatch()
+        finally:
+            if self._batch['depth'] <= 0:  # also if sending or the error check raised
+                self._batch['cmds'] = None
+                self._batch['depth'] = 0
+            self._lock.release()
+
+    def flushbatch(self):
+        """Send the queued commands with a single write and check for error once."""
+        with self._lock:
+            cmds = self._batch['cmds']
+            if not cmds:
+                return
+            self._batch['cmds'] = []
+            debug('GCSMessages.flushbatch: send %d commands', len(cmds))
+            if not self.errcheck:
+                self._send(''.join(cmds))
+                return
+            if not self._batch['locate']:
+                self._send(''.join(cmds) + 'ERR?\n')
+                exc = self._checkerror(senderr=False, doraise=False)
+                if exc:
+                    raise GCSError(exc, '@ GCSMessages.flushbatch in %r' % ''.join(cmds))
+                return
+            self._send(''.join(cmd + 'ERR?\n' for cmd in cmds))
+            for i, answer in enumerate(self._readanswers(len(cmds))):
+                exc = self._toerror(answer)
+                if exc:
+                    raise GCSError(exc, '@ GCSMessages.flushbatch command %d of %d: %r' % (i + 1, len(cmds), cmds[i]))
+
+    def readmany(self, cmds, checkerror=True):
+        """Send all queries in 'cmds' with a single write and read their answers in one round trip.
+        Do not mix single character commands with other queries, they are answered immediately and
+        would overtake the answers of the preceeding queries.
+        @param cmds : List of queries as strings, with or without trailing linefeed.
+        @param checkerror : If True "ERR?" is appended and checked once for all 'cmds'.
+        @return : List of answers as strings in the order of 'cmds'.
+        """
+        cmds = [cmd if len(cmd) == 1 or cmd.endswith('\n') else cmd + '\n' for cmd in cmds]
+        checkerror = checkerror and self.errcheck
+        with self._lock(min(getpriority(cmd) for cmd in cmds)):
+            self.flushbatch()
+            self._send(''.join(cmds) + ('ERR?\n' if checkerror else ''))
+            answers = self._readanswers(len(cmds) + int(checkerror))
+        if checkerror:
+            exc = self._toerror(answers.pop())
+            if exc:
+                raise GCSError(exc, '@ GCSMessages.readmany in %r' % ''.join(cmds))
+        return answers
+
     def send(self, tosend):
         """Send 'tosend' to device and check for error.
         @param tosend : String to send to device, with or without trailing linefeed.
         """
-        if self.embederr and self.errcheck:
-            if len(tosend) > 1 and not tosend.endswith('\n'):
-                tosend += '\n'
-            tosend += 'ERR?\n'
-        with self._lock:
+        with self._lock(getpriority(tosend)):
+            if self.inbatch:
+                if len(tosend) > 1 and not tosend.endswith('\n'):
+                    tosend += '\n'
+                self._batch['cmds'].append(tosend)
+                return
+            if self.embederr and self.errcheck:
+                if len(tosend) > 1 and not tosend.endswith('\n'):
+                    tosend += '\n'
+                tosend += 'ERR?\n'
             self._send(tosend)
             self._checkerror(senderr=not self.embederr)
 
@@ -120,9 +391,10 @@ class GCSMessages(object):
             self._databuffer['data'] = []
             self._databuffer['index'] = 0
             self._databuffer['error'] = None
-        with self._lock:
+        with self._lock(getpriority(tosend)):
+            self.flushbatch()
             self._send(tosend)
-            answer = self._read(stopon)
+            answer = self._read(stopon + ' \n' if stopon else None)  # the header may arrive in several chunks
             if gcsdata != 0:
                 splitpos = answer.upper().find(stopon)
                 if splitpos < 0:
@@ -143,57 +415,128 @@ class GCSMessages(object):
                 self._checkerror()
         return answer
 
-    def _savelog(self, msg):
-        """Save (i.e. append) 'msg' to self.logfile.
-        @param msg : Message to save with or without trailing linefeed.
+    def _savelog(self, direction, msg):
+        """Pass 'msg' to self.logger which writes it to the log file in a background thread.
+        @param direction : gcslogger.SENT or gcslogger.RECEIVED.
+        @param msg : Message to save as string or bytes with or without trailing linefeed.
         """
-        if not self.logfile:
-            return
-        msg = str(msg.encode('cp1252'))  # no "u" prefix in log file, e.g. u'POS?' -> 'POS?'
-        msg = '%r' % msg.rstrip('\n')
-        msg = msg.lstrip("'").rstrip("'")
-        with open(self.logfile, 'a') as fobj:
-            fobj.write('%s\n' % msg)
+        if self._logger:
+            self._logger.log(direction, self.connectionid, msg)
 
     def _send(self, tosend):
         """Send 'tosend' to device.
         @param tosend : String to send to device, with or without trailing linefeed.
         """
-        if len(tosend) > 1 and not tosend.endswith('\n'):
+        if len(tosend) > 1 and not tosend.endswith('\n') and tosend[-1] >= ' ':  # not for single char commands
             tosend += '\n'
-        self._interface.send(tosend)
-        self._savelog(tosend)
+        if self._stats['stats'] is None:
+            self._interface.send(tosend)
+        else:
+            start = time()
+            self._interface.send(tosend)
+            self._addsent(tosend, start)
+        self._savelog(SENT, tosend)
+
+    def _addsent(self, tosend, start):
+        """Record the write of 'tosend' that started at 'start' in self.stats."""
+        stats = self._stats
+        stats['sentat'] = time()
+        stats['sentkey'] = stats['stats'].addsent(stats['interface'], tosend, len(tosend), stats['sentat'] - start)
+
+    def _addreceived(self, numbytes, firstbyte):
+        """Record a reply of 'numbytes' whose first byte was received at 'firstbyte' in self.stats."""
+        stats = self._stats
+        if stats['sentat'] is None:
+            return  # e.g. further lines of GCS data
+        now = time()
+        stats['stats'].addreceived(stats['sentkey'], numbytes, (firstbyte or now) - stats['sentat'], now - stats['sentat'])
+        stats['sentat'] = None
 
     def _read(self, stopon):
         """Read answer from device until this ends with linefeed with no preceeding space.
+        Received bytes are collected in a reusable buffer, only the newly received part is scanned
+        for 'stopon' and the answer is decoded once at the end.
         @param stopon: Addditional uppercase string that stops reading, too.
         @return : Received data as string.
         """
-        rcvbuf = u''
+        rcvbuf = self._rcvbuf
+        del rcvbuf[:]
+        stopon = stopon.encode('cp1252') if stopon else None
         timeout = time() + self.timeout / 1000.
-        while not eol(rcvbuf):
+        firstbyte = None
+        while not eolbytes(rcvbuf):
             received = self._interface.read()
             if received:
-                rcvbuf += received.decode(encoding='cp1252', errors='ignore')
+                if firstbyte is None and self._stats['stats'] is not None:
+                    firstbyte = time()
+                scanfrom = max(0, len(rcvbuf) - len(stopon) + 1) if stopon else 0
+                rcvbuf += received
                 timeout = time() + self.timeout / 1000.
-            if time() > timeout:
+                if stopon and rcvbuf[scanfrom:].upper().find(stopon) >= 0:
+                    break
+            elif not self._waitfordata(timeout):
                 raise GCSError(gcserror.E_7_COM_TIMEOUT, '@ GCSMessages._read')
-            if stopon and stopon in rcvbuf.upper():
-                break
-        self._savelog('  ' + rcvbuf)
+        if self._stats['stats'] is not None:
+            self._addreceived(len(rcvbuf), firstbyte)
+        answer = rcvbuf.decode(encoding='cp1252', errors='ignore')
+        self._savelog(RECEIVED, answer)
         self._check_no_eol(rcvbuf)
-        return rcvbuf
+        return answer
+
+    def _waitfordata(self, timeout):
+        """Block in the interface until data is available or the absolute 'timeout' has expired.
+        @param timeout : Absolute time as returned by time.time().
+        @return : False if 'timeout' has expired else True.
+        """
+        remaining = timeout - time()
+        if remaining <= 0:
+            return False
+        self._interface.waitfordata(min(remaining, WAITSLICE))
+        return True
+
+    def _readanswers(self, count):
+        """Read 'count' consecutive answers from device that have been requested with a single write.
+        @param count : Number of answers to read as integer.
+        @return : List of answers as strings.
+        """
+        answers = []
+        rcvbuf = u''
+        timeout = time() + self.timeout / 1000.
+        firstbyte = None
+        while len(answers) < count:
+            received = self._interface.read()
+            if received:
+                if firstbyte is None and self._stats['stats'] is not None:
+                    firstbyte = time()
+                rcvbuf += bytes(received).decode(encoding='cp1252', errors='ignore')
+                timeout = time() + self.timeout / 1000.
+                complete, rcvbuf = splitanswers(rcvbuf)
+                answers.extend(complete)
+            elif not self._waitfordata(timeout):
+                raise GCSError(gcserror.E_7_COM_TIMEOUT, '@ GCSMessages._readanswers')
+        if self._stats['stats'] is not None:
+            self._addreceived(sum(len(answer) for answer in answers) + len(rcvbuf), firstbyte)
+        self._savelog(RECEIVED, ''.join(answers))
+        if rcvbuf or len(answers) > count:
+            msg = '@ GCSMessages._readanswers: %d answers expected, got %r' % (count, ''.join(answers) + rcvbuf)
+            raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, msg)
+        return answers
 
     @staticmethod
     def _check_no_eol(answer):
         """Check that 'answer' does not contain a LF without a preceeding SPACE except at the end.
-        @param answer : Answer to verify as string.
+        @param answer : Answer to verify as string, bytes or bytearray.
         """
-        for i, char in enumerate(answer[:-1]):
-            if char == '\n' or char == '\r':
-                if i > 0 and answer[i - 1] != ' ':
-                    msg = '@ GCSMessages._check_no_eol: LF/CR at %r' % answer[max(0, i - 10):min(i + 10, len(answer))]
-                    raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, msg)
+        if not isinstance(answer, (bytes, bytearray)):
+            answer = answer.encode('cp1252', 'ignore')
+        if not _haslinebreak(answer):
+            return
+        match = NOEOL.search(answer)
+        if match:
+            i = match.start() + 1
+            snippet = answer[max(0, i - 10):min(i + 10, len(answer))].decode('cp1252', 'ignore')
+            msg = '@ GCSMessages._check_no_eol: LF/CR at %r' % snippet
+            raise GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, msg)
 
     def _readgcsdata(self, strbuf):
         """Start a background task to read out GCS data and save it in the instance.
@@ -202,10 +545,16 @@ class GCSMessages(object):
         if not eol(strbuf):
             strbuf += self._read(stopon=' \n')
         numcolumns = len(strbuf.split('\n')[0].split())
-        self._databuffer['data'] = [[] for _ in range(numcolumns)]
-        debug('GCSMessages: start background task to query GCS data')
         self._stopthread = False
-        thread = Thread(target=self._fillbuffer, args=(strbuf, lambda: self._stopthread))
+        if self._arraymode:
+            numvalues = self._databuffer['size'] if self._databuffer['size'] is not None else 1024
+            self._databuffer['data'] = numpy.empty((numcolumns, max(1, numvalues)))
+            debug('GCSMessages: start background task to query GCS data into %s array', numcolumns)
+            thread = Thread(target=self._fillarray, args=(strbuf, lambda: self._stopthread))
+        else:
+            self._databuffer['data'] = [[] for _ in range(numcolumns)]
+            debug('GCSMessages: start background task to query GCS data')
+            thread = Thread(target=self._fillbuffer, args=(strbuf, lambda: self._stopthread))
         thread.start()
 
     def _fillbuffer(self, answer, stop):
@@ -242,8 +591,75 @@ class GCSMessages(object):
                     error('GCSMessages: stop background task to query GCS data')
                     return
 
+    def _fillarray(self, answer, stop):
+        """Read answers and convert each block of complete lines at once into the data array.
+        An invalid block is converted line by line, i.e. invalid lines are skipped and the error flag is set.
+        @param answer : String of already readout answer.
+        @param stop : Callback function that stops the loop if True.
+        """
+        with self._lock:
+            while True:
+                lastline = ENDOFDATA.search(answer)
+                if lastline:
+                    block, answer = answer[:lastline.end()], ''
+                else:
+                    splitpos = answer.rfind('\n') + 1
+                    block, answer = answer[:splitpos], answer[splitpos:]
+                if block:
+                    self._convertblock(block)
+                if lastline:
+                    debug('GCSMessages: end background task to query GCS data')
+                    self._endofdata(block[block.rfind('\n', 0, -1) + 1:])
+                    if not self._databuffer['error']:
+                        self._databuffer['error'] = self._checkerror(doraise=False)
+                    if not self._databuffer['error']:
+                        self._databuffer['size'] = True
+                    return
+                try:
+                    answer += self._read(stopon=' \n')
+                except:  # No exception type(s) specified pylint: disable=W0702
+                    exc = GCSError(gcserror.E_1090_PI_GCS_DATA_READ_ERROR, sys.exc_info()[1])
+                    self._databuffer['error'] = exc
+                    error('GCSMessages: end background task with GCSError: %s', exc)
+                    self._databuffer['size'] = True
+                    return
+                if stop():
+                    error('GCSMessages: stop background task to query GCS data')
+                    return
+
+    def _convertblock(self, block):
+        """Convert all lines in 'block' to float and store them in the data array.
+        @param block : Complete lines of the qDRR answer with data values as string.
+        """
+        numcolumns = self._databuffer['data'].shape[0]
+        try:
+            values = numpy.array(block.split(), dtype=float)
+        except ValueError:
+            values = None
+        if values is None or values.size != numcolumns * block.count('\n'):
+            for line in block.splitlines(True):
+                self._convertfloats(line)
+            return
+        values = values.reshape(-1, numcolumns)
+        index = self._databuffer['index']
+        self._reservearray(index + values.shape[0])
+        self._databuffer['data'][:, index:index + values.shape[0]] = values.T
+        self._databuffer['index'] += values.shape[0]
+
+    def _reservearray(self, numvalues):
+        """Enlarge the data array so that it can hold at least 'numvalues' datasets.
+        @param numvalues : Number of datasets as integer.
+        """
+        data = self._databuffer['data']
+        if data.shape[1] >= numvalues:
+            return
+        newdata = numpy.empty((data.shape[0], max(numvalues, 2 * data.shape[1])))
+        newdata[:, :data.shape[1]] = data
+        self._databuffer['data'] = newdata
+
     def _convertfloats(self, line):
         """Convert items in 'line' to float and append them to 'self._databuffer'.
+        In array mode an invalid line is stored as NaN values.
         @param line : One line in qDRR answer with data values as string.
         """
         numcolumns = len(self._databuffer['data'])
@@ -257,9 +673,16 @@ class GCSMessages(object):
             exc = GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, msg)
             self._databuffer['error'] = exc
             error('GCSMessages: GCSError: %s', exc)
+            if self._arraymode:
+                self._reservearray(self._databuffer['index'] + 1)
+                self._databuffer['data'][:, self._databuffer['index']] = numpy.nan
         else:
-            for i in range(numcolumns):
-                self._databuffer['data'][i].append(values[i])
+            if self._arraymode:
+                self._reservearray(self._databuffer['index'] + 1)
+                self._databuffer['data'][:, self._databuffer['index']] = values
+            else:
+                for i in range(numcolumns):
+                    self._databuffer['data'][i].append(values[i])
         self._databuffer['index'] += 1
 
     def _endofdata(self, line):
@@ -287,17 +710,29 @@ class GCSMessages(object):
         """
         if not self.errcheck:
             return 0
+        stats = self._stats['stats']
+        if stats is not None:
+            start, checked = time(), stats.current
         if senderr:
             self._send('ERR?\n')
         answer = self._read(stopon=None)
-        exc = None
-        try:
-            err = int(answer)
-        except ValueError:
-            exc = GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, 'invalid answer on "ERR?": %r' % answer)
-        else:
-            if err:
-                exc = GCSError(err)
+        if stats is not None and checked is not None:
+            stats.adderrcheck(checked, time() - start)
+        exc = self._toerror(answer)
         if exc and doraise:
             raise exc  # Raising NoneType while only classes or instances are allowed pylint: disable=E0702
         return exc
+
+    @staticmethod
+    def _toerror(answer):
+        """Convert the answer to "ERR?" into a GCS exception.
+        @param answer : Answer to "ERR?" as string.
+        @return : GCSError instance if 'answer' is not zero else None.
+        """
+        try:
+            err = int(answer)
+        except ValueError:
+            return GCSError(gcserror.E_1004_PI_UNEXPECTED_RESPONSE, 'invalid answer on "ERR?": %r' % answer)
+        if err:
+            return GCSError(err)
+        return None
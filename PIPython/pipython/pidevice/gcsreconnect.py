@@ -0,0 +1,313 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Keep the connection to a PI controller: reconnect in the background after the link is lost and
+restore the configuration without a new reference move.
+
+ReconnectingDevice passes all calls to the connected device. The configuration commands in
+SNAPSHOTCMDS are recorded when they succeed, commands of a batch when the whole batch succeeds.
+If a call fails because the link is lost, the call raises as usual and a background thread
+connects again. If the controller still reports its axes
+as referenced with "FRF?", the recorded configuration is sent with a single write, so the device is
+usable again within milliseconds. Attributes set on the device, e.g. "timeout", are set again, too.
+Motion commands are never recorded and a failed call is never repeated, the caller decides how to
+continue.
+
+    pidevice = ReconnectingDevice(lambda: connectusb('0119024343'))
+    pidevice.SVO('1', True)
+    pidevice.FRF('1')
+    ...
+    pidevice.MOV('1', 1.0)  # raises GCSError if the USB cable is pulled, later calls wait for the reconnect
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from logging import debug, error, warning
+from threading import Event, Lock, Thread, local
+from time import time
+
+from . import GCSError, gcserror
+from .common.gcscommands_helpers import getitemslist, getitemsvaluestuple
+
+# Configuration commands that are recorded and restored in this order: {command: names of arguments}.
+SNAPSHOTCMDS = OrderedDict([
+    ('RON', ('axes', 'values')),
+    ('VEL', ('axes', 'values')),
+    ('SVO', ('axes', 'values')),
+    ('CTO', ('lines', 'params', 'values')),
+    ('TRO', ('lines', 'values')),
+])
+
+# Errors of the interface that are not caused by a lost link.
+NOLINKLOSS = (gcserror.E_8_COM_MULTILINE_RESPONSE, gcserror.E_11_COM_NOT_IMPLEMENTED,
+              gcserror.E_63_COM_DEVICE_CONNECTED)
+
+
+def islinkloss(exc):
+    """Return True if the exception 'exc' indicates that the connection to the controller is lost."""
+    if isinstance(exc, GCSError):
+        return gcserror.E_63_COM_DEVICE_CONNECTED <= exc.val < 0 and exc.val not in NOLINKLOSS
+    return isinstance(exc, (IOError, OSError))
+
+
+# Too many instance attributes pylint: disable=R0902
+class ReconnectingDevice(object):
+    """Pass all calls to a device and reconnect it in the background when the link is lost,
+    can be used as context manager.
+    """
+
+    def __init__(self, connect, heartbeat=1.0, retryinterval=0.5, waitreconnect=10.0):
+        """Connect with 'connect' and keep the connection.
+        @param connect : Callable without arguments that returns a connected GCSDevice, it is called
+        again to reconnect and must raise GCSError, IOError or OSError if the controller is not available.
+        @param heartbeat : Interval in seconds to check the idle link with "IDN?", None disables the check.
+        @param retryinterval : Time in seconds between two reconnect attempts.
+        @param waitreconnect : Maximum time in seconds a call waits for the reconnect before it raises.
+        """
+        debug('create an instance of ReconnectingDevice(connect=%r, heartbeat=%s)', connect, heartbeat)
+        self._connect = connect
+        self._settings = {'heartbeat': heartbeat, 'retryinterval': retryinterval, 'waitreconnect': waitreconnect}
+        self._snapshot = OrderedDict()  # {(command, item, ...): value}
+        self._snapshotlock = Lock()
+        self._local = local()  # 'batches': list of the commands to record per open batch of a thread
+        self._attributes = OrderedDict()  # {name: value} of attributes set on the device
+        self._status = {'reconnects': 0, 'recoverytime': None, 'referenced': True, 'lasterror': None,
+                        'lastaccess': time()}
+        self._device = connect()
+        self._connected = Event()
+        self._connected.set()
+        self._lost = Event()
+        self._stopped = False
+        self._thread = Thread(target=self._supervise, name='ReconnectingDevice')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __str__(self):
+        return 'ReconnectingDevice(device=%s)' % self._device
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getattr__(self, name):
+        attr = getattr(self._getdevice(), name)
+        if not callable(attr):
+            return attr
+        if name == 'batch':
+            return lambda *args, **kwargs: self._recordbatch(attr(*args, **kwargs))
+
+        def call(*args, **kwargs):
+            """Call 'attr' and record it in the snapshot, a lost link starts the reconnect."""
+            try:
+                result = attr(*args, **kwargs)
+            except (GCSError, IOError, OSError) as exc:
+                if islinkloss(exc):
+                    self._linklost(exc)
+                raise
+            self._status['lastaccess'] = time()
+            if name in SNAPSHOTCMDS:
+                batches = getattr(self._local, 'batches', None)
+                if batches:  # the command is sent and checked when the batch is left
+                    batches[-1].append((name, args, kwargs))
+                else:
+                    self._record(name, args, kwargs)
+            return result
+
+        return call
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+            return
+        setattr(self._getdevice(), name, value)
+        self._attributes[name] = value  # e.g. "stats" or "timeout", set again after a reconnect
+
+    @property
+    def device(self):
+        """Return the currently connected device, e.g. for functions of pitools."""
+        return self._getdevice()
+
+    @property
+    def connected(self):
+        """True if the link to the controller is up."""
+        return self._connected.is_set()
+
+    @property
+    def status(self):
+        """Dictionary with the number of 'reconnects', the 'recoverytime' in seconds of the last reconnect,
+        'referenced' False if the controller has lost its reference and 'lasterror' that caused a reconnect.
+        """
+        return dict((key, self._status[key]) for key in ('reconnects', 'recoverytime', 'referenced', 'lasterror'))
+
+    @property
+    def snapshot(self):
+        """Recorded configuration as ordered dictionary {(command, item, ...): value}."""
+        with self._snapshotlock:
+            return OrderedDict(self._snapshot)
+
+    def takesnapshot(self, axes=None):
+        """Record the current reference mode, velocity and servo state of 'axes' and the trigger output
+        state queried from the controller. Trigger conditions are only recorded when they are set by CTO().
+        @param axes : String convertible or list of them or None for all axes.
+        """
+        device = self._getdevice()
+        for command in ('RON', 'VEL', 'SVO', 'TRO'):
+            if not getattr(device, 'Hasq%s' % command)():
+                continue
+            answer = getattr(device, 'q%s' % command)(None if command == 'TRO' else axes)
+            with self._snapshotlock:
+                for item, value in answer.items():
+                    self._snapshot[(command, str(item))] = value
+        debug('ReconnectingDevice.takesnapshot: %r', self._snapshot)
+
+    def clearsnapshot(self):
+        """Forget the recorded configuration."""
+        with self._snapshotlock:
+            self._snapshot.clear()
+
+    def close(self):
+        """Stop reconnecting and close the connection."""
+        debug('ReconnectingDevice.close()')
+        self._stopped = True
+        self._lost.set()
+        self._thread.join()
+        try:
+            self._device.close()
+        except (GCSError, IOError, OSError) as exc:
+            debug('ReconnectingDevice.close: %s', exc)
+
+    def _getdevice(self):
+        """Return the connected device, wait for the reconnect if the link is lost."""
+        if not self._connected.wait(self._settings['waitreconnect']):
+            raise GCSError(gcserror.E_4_NOT_CONNECTED_ERROR, '@ ReconnectingDevice: not reconnected after %s s, '
+                                                             'last error: %s' % (self._settings['waitreconnect'],
+                                                                                 self._status['lasterror']))
+        return self._device
+
+    @contextmanager
+    def _recordbatch(self, batch):
+        """Enter 'batch' and record its configuration commands only if the batch succeeds.
+        @type batch : pipython.pidevice.gcsmessages.GCSBatch
+        """
+        if getattr(self._local, 'batches', None) is None:
+            self._local.batches = []
+        records = []
+        self._local.batches.append(records)
+        try:
+            with batch as entered:
+                yield entered
+        except (GCSError, IOError, OSError) as exc:
+            if islinkloss(exc):
+                self._linklost(exc)
+            raise
+        finally:
+            self._local.batches.pop()
+        if self._local.batches:  # nested batch, recorded when the outermost batch succeeds
+            self._local.batches[-1].extend(records)
+            return
+        for command, args, kwargs in records:
+            self._record(command, args, kwargs)
+
+    def _record(self, command, args, kwargs):
+        """Record the configuration command 'command' with 'args' and 'kwargs' in the snapshot."""
+        names = SNAPSHOTCMDS[command]
+        args = list(args) + [kwargs.get(argname) for argname in names[len(args):]]
+        if command == 'CTO':
+            lines, params, values = [getitemslist(arg) for arg in args]
+            items = [(str(line), int(param)) for line, param in zip(lines, params)]
+        else:
+            items, values = getitemsvaluestuple(args[0], args[1])
+            items = [(str(item),) for item in items]
+        with self._snapshotlock:
+            for item, value in zip(items, values):
+                self._snapshot[(command,) + item] = value
+
+    def _linklost(self, exc):
+        """Mark the link as lost and start the reconnect."""
+        if not self._connected.is_set():
+            return
+        warning('ReconnectingDevice: link lost: %s', exc)
+        self._status['lasterror'] = exc
+        self._connected.clear()
+        self._lost.set()
+
+    def _supervise(self):
+        """Check the idle link and reconnect after it is lost until close() is called."""
+        while not self._stopped:
+            if not self._lost.wait(self._settings['heartbeat']):
+                self._checklink()
+                continue
+            if self._stopped:
+                break
+            self._reconnect()
+
+    def _checklink(self):
+        """Query "IDN?" if the device has not been used since the last heartbeat."""
+        if time() - self._status['lastaccess'] < self._settings['heartbeat']:
+            return
+        try:
+            self._device.qIDN()
+            self._status['lastaccess'] = time()
+        except (GCSError, IOError, OSError) as exc:
+            if islinkloss(exc):
+                self._linklost(exc)
+
+    def _reconnect(self):
+        """Connect again and restore the configuration, retry until it succeeds or close() is called."""
+        start = time()
+        try:
+            self._device.close()
+        except (GCSError, IOError, OSError) as exc:
+            debug('ReconnectingDevice: close lost connection: %s', exc)
+        while not self._stopped:
+            device = None
+            try:
+                device = self._connect()
+                self._restore(device)
+            except (GCSError, IOError, OSError) as exc:
+                debug('ReconnectingDevice: reconnect failed: %s', exc)
+                if device is not None:  # release the interface, e.g. a claimed USB device, before retrying
+                    try:
+                        device.close()
+                    except (GCSError, IOError, OSError) as closeexc:
+                        debug('ReconnectingDevice: close after failed restore: %s', closeexc)
+                self._lost.clear()
+                if self._lost.wait(self._settings['retryinterval']) and self._stopped:
+                    return
+                continue
+            self._device = device
+            self._status['reconnects'] += 1
+            self._status['recoverytime'] = time() - start
+            self._status['lastaccess'] = time()
+            self._lost.clear()
+            self._connected.set()
+            debug('ReconnectingDevice: reconnected in %.3f s', self._status['recoverytime'])
+            return
+
+    def _restore(self, device):
+        """Check the reference state of the recorded axes and send the recorded configuration to 'device'.
+        @type device : pipython.pidevice.gcs2.gcs2commands.GCS2Commands
+        """
+        for name, value in self._attributes.items():
+            setattr(device, name, value)
+        snapshot = self.snapshot
+        axes = sorted(set(key[1] for key in snapshot if key[0] in ('RON', 'VEL', 'SVO')))
+        referenced = True
+        if axes and device.HasqFRF():
+            referenced = all(device.qFRF(axes).values())
+        self._status['referenced'] = referenced
+        if not referenced:
+            error('ReconnectingDevice: axes %s have lost their reference, reference them again', axes)
+        if not snapshot:
+            return
+        with device.batch():
+            for command in SNAPSHOTCMDS:
+                keys = [key for key in snapshot if key[0] == command]
+                if not keys:
+                    continue
+                if command == 'CTO':
+                    device.CTO([key[1] for key in keys], [key[2] for key in keys], [snapshot[key] for key in keys])
+                else:
+                    getattr(device, command)([key[1] for key in keys], [snapshot[key] for key in keys])
+        debug('ReconnectingDevice: restored %r', snapshot)
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Schedule access of several threads to one GCS connection according to the priority of their commands."""
+
+from heapq import heapify, heappop, heappush
+from itertools import count
+from threading import Condition, Lock
+from time import time
+from . import GCSError, gcserror
+
+try:
+    from threading import get_ident
+except ImportError:
+    from thread import get_ident  # Python 2 pylint: disable=E0401
+
+# Priorities of GCS commands, a lower value is served first.
+EMERGENCY = 0  # stop commands
+MOTION = 1  # all other set commands
+POLL = 2  # status queries
+DIAGNOSTIC = 3  # help, parameter and data queries
+
+PRIORITYNAMES = {EMERGENCY: 'emergency', MOTION: 'motion', POLL: 'poll', DIAGNOSTIC: 'diagnostic'}
+
+EMERGENCYCMDS = ('STP', 'HLT', chr(24), chr(27))
+
+DIAGNOSTICCMDS = ('*IDN?', 'IDN?', 'VER?', 'HLP?', 'HPA?', 'HPV?', 'HDR?', 'SPA?', 'SEP?', 'DRR?',
+                  'GWD?', 'TWS?', 'CST?', 'VST?', 'SAI?', 'TVI?', 'IFC?', 'IFS?', 'MAC?', 'ERR?', 'SSN?')
+
+# Default maximum number of threads waiting with a priority, None means unbounded. A limit is opt-in,
+# e.g. PriorityLock(maxwaiting={POLL: 16}), because an exceeding thread gets an error instead of waiting.
+MAXWAITING = {EMERGENCY: None, MOTION: None, POLL: None, DIAGNOSTIC: None}
+
+
+def getpriority(cmd):
+    """Return the priority of the GCS command 'cmd'.
+    @param cmd : Command as string, with or without arguments and trailing linefeed.
+    @return : EMERGENCY, MOTION, POLL or DIAGNOSTIC.
+    """
+    mnemonic = cmd.split(' ', 1)[0].strip().upper() if len(cmd) > 1 else cmd
+    if mnemonic in EMERGENCYCMDS:
+        return EMERGENCY
+    if mnemonic in DIAGNOSTICCMDS:
+        return DIAGNOSTIC
+    if len(cmd) == 1 or mnemonic.endswith('?'):
+        return POLL
+    return MOTION
+
+
+class PriorityLock(object):
+    """Reentrant lock that is handed over to the waiting thread with the highest priority on release,
+    threads with the same priority are served in order of arrival. Can be used as context manager
+    with the default priority MOTION or with "with lock(priority):".
+    """
+
+    def __init__(self, maxwaiting=None):
+        """Reentrant lock that is handed over according to priorities.
+        @param maxwaiting : Dictionary {priority: maximum number of waiting threads or None} or None for no limits.
+        """
+        self._cond = Condition(Lock())
+        self._owner = None
+        self._depth = 0
+        self._waiting = []  # heap of (priority, arrival, thread ID)
+        self._arrival = count()
+        self.maxwaiting = dict(MAXWAITING)
+        self.maxwaiting.update(maxwaiting or {})
+        self._stats = {}
+
+    def __call__(self, priority=MOTION):
+        return _PriorityContext(self, priority)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    @property
+    def stats(self):
+        """Time the lock owners have waited for the lock as {priority: {'count', 'mean', 'max'}} in seconds."""
+        with self._cond:
+            return dict((priority, {'count': item['count'], 'mean': item['total'] / item['count'], 'max': item['max']})
+                        for priority, item in self._stats.items())
+
+    def resetstats(self):
+        """Clear the waiting time statistics."""
+        with self._cond:
+            self._stats = {}
+
+    def acquire(self, priority=MOTION):
+        """Block until the lock is owned by the calling thread.
+        @param priority : EMERGENCY, MOTION, POLL or DIAGNOSTIC, only used if the thread is no owner yet.
+        @return : True.
+        """
+        ident = get_ident()
+        with self._cond:
+            if self._owner == ident:
+                self._depth += 1
+                return True
+            if self._owner is None and not self._waiting:
+                self._owner, self._depth = ident, 1
+                self._addstats(priority, 0.)
+                return True
+            maxwaiting = self.maxwaiting.get(priority)
+            if maxwaiting is not None and sum(1 for item in self._waiting if item[0] == priority) >= maxwaiting:
+                raise GCSError(gcserror.E_1008_PI_CONTROLLER_BUSY, '%d threads with %s priority are waiting' %
+                               (maxwaiting, PRIORITYNAMES.get(priority, priority)))
+            entry = (priority, next(self._arrival), ident)
+            heappush(self._waiting, entry)
+            start = time()
+            try:
+                while self._owner != ident:
+                    self._cond.wait()
+            except BaseException:  # e.g. KeyboardInterrupt, do not leave the entry or the lock behind
+                if self._owner == ident:
+                    self._handover()
+                else:
+                    self._waiting.remove(entry)
+                    heapify(self._waiting)
+                raise
+            self._depth = 1
+            self._addstats(priority, time() - start)
+            return True
+
+    def release(self):
+        """Release the lock, if it is released completely it is handed over to the next waiting thread."""
+        with self._cond:
+            if self._owner != get_ident():
+                raise RuntimeError('cannot release un-acquired lock')
+            self._depth -= 1
+            if self._depth:
+                return
+            self._handover()
+
+    def _handover(self):
+        """Hand the lock over to the next waiting thread or free it. Call with the condition acquired."""
+        if self._waiting:
+            self._owner = heappop(self._waiting)[2]
+            self._cond.notify_all()
+        else:
+            self._owner = None
+
+    def _addstats(self, priority, waited):
+        """Add the time 'waited' in seconds to the statistics of 'priority'."""
+        item = self._stats.setdefault(priority, {'count': 0, 'total': 0., 'max': 0.})
+        item['count'] += 1
+        item['total'] += waited
+        item['max'] = max(item['max'], waited)
+
+
+class _PriorityContext(object):  # Too few public methods pylint: disable=R0903
+    """Context manager that acquires a PriorityLock with a given priority."""
+
+    def __init__(self, lock, priority):
+        self._lock = lock
+        self._priority = priority
+
+    def __enter__(self):
+        self._lock.acquire(self._priority)
+        return self._lock
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._lock.release()
@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Collect counts, bytes and latency histograms of the GCS communication per interface and command."""
+
+from bisect import bisect_left
+from collections import OrderedDict
+import csv
+import json
+import sys
+from threading import Lock
+
+# Measured phases of a command: duration of the write, time from end of write to first byte and to
+# complete reply, duration of the "ERR?" round trip that checks the command.
+PHASES = ('write', 'firstbyte', 'reply', 'errcheck')
+
+# Upper edges of the histogram bins in seconds, 10 us to ~10 s in steps of factor 2, plus overflow bin.
+BINEDGES = tuple(10E-6 * 2 ** i for i in range(21))
+
+
+def getmnemonic(cmd):
+    """Return the mnemonic of 'cmd', e.g. "POS?" for "POS? 1 2\n" or "#5" for chr(5).
+    @param cmd : Command as string.
+    @return : Mnemonic as string.
+    """
+    if len(cmd) == 1 or (len(cmd) > 1 and cmd[0] < ' '):
+        return '#%d' % ord(cmd[0])
+    return cmd.split(None, 1)[0].upper() if cmd.strip() else ''
+
+
+class Histogram(object):
+    """Latency histogram with logarithmic bins."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BINEDGES) + 1)
+        self.count = 0
+        self.total = 0.
+        self.min = None
+        self.max = 0.
+
+    def add(self, value):
+        """Add 'value' in seconds."""
+        self.counts[bisect_left(BINEDGES, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        """Mean value in seconds or None if empty."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        """Return the upper bin edge in seconds below which 'percent' of the values are, None if empty."""
+        if not self.count:
+            return None
+        threshold = self.count * percent / 100.
+        accumulated = 0
+        for i, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= threshold:
+                return min(BINEDGES[i], self.max) if i < len(BINEDGES) else self.max
+        return self.max
+
+    def todict(self):
+        """Return the histogram as dictionary that can be serialized as JSON."""
+        return OrderedDict([('count', self.count), ('mean', self.mean), ('min', self.min), ('max', self.max),
+                            ('edges', list(BINEDGES)), ('counts', list(self.counts))])
+
+
+class GCSStats(object):
+    """Counts, bytes and latency histograms per interface and GCS mnemonic."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._items = OrderedDict()  # {(interface, mnemonic): {'count', 'sent', 'received', phase: Histogram}}
+        self.current = None  # (interface, mnemonic) of the last sent command that is not "ERR?"
+
+    def __str__(self):
+        return 'GCSStats(%d commands)' % len(self._items)
+
+    def _getitem(self, key):
+        """Return the statistics of 'key', create them if required."""
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = {'count': 0, 'sent': 0, 'received': 0}
+        return item
+
+    def addsent(self, interface, cmd, numbytes, duration):
+        """Record a write and make it the current command unless it is "ERR?".
+        @param interface : Name of the interface as string.
+        @param cmd : Sent string.
+        @param numbytes : Number of sent bytes as integer.
+        @param duration : Duration of the write in seconds.
+        @return : Key (interface, mnemonic) of the command.
+        """
+        key = (interface, getmnemonic(cmd))
+        with self._lock:
+            item = self._getitem(key)
+            item['count'] += 1
+            item['sent'] += numbytes
+            item.setdefault('write', Histogram()).add(duration)
+        if key[1] != 'ERR?':
+            self.current = key
+        return key
+
+    def addreceived(self, key, numbytes, firstbyte, reply):
+        """Record a reply.
+        @param key : (interface, mnemonic) of the command that is answered.
+        @param numbytes : Number of received bytes as integer.
+        @param firstbyte : Time in seconds from end of write to the first received byte.
+        @param reply : Time in seconds from end of write to the complete reply.
+        """
+        with self._lock:
+            item = self._getitem(key)
+            item['received'] += numbytes
+            item.setdefault('firstbyte', Histogram()).add(firstbyte)
+            item.setdefault('reply', Histogram()).add(reply)
+
+    def adderrcheck(self, key, duration):
+        """Record the duration of the "ERR?" round trip that checks the command 'key'."""
+        with self._lock:
+            self._getitem(key).setdefault('errcheck', Histogram()).add(duration)
+
+    def reset(self):
+        """Clear all statistics."""
+        with self._lock:
+            self._items = OrderedDict()
+            self.current = None
+
+    def summary(self):
+        """Return one row per interface and command, times are in milliseconds.
+        @return : List of ordered dictionaries with keys "interface", "command", "count", "sent",
+        "received" and "<phase>_mean", "<phase>_p50", "<phase>_p99", "<phase>_max" for each phase.
+        """
+        rows = []
+        with self._lock:
+            for (interface, mnemonic), item in self._items.items():
+                row = OrderedDict([('interface', interface), ('command', mnemonic), ('count', item['count']),
+                                   ('sent', item['sent']), ('received', item['received'])])
+                for phase in PHASES:
+                    hist = item.get(phase, Histogram())
+                    for name, value in (('mean', hist.mean), ('p50', hist.percentile(50)),
+                                        ('p99', hist.percentile(99)), ('max', hist.max if hist.count else None)):
+                        row['%s_%s' % (phase, name)] = None if value is None else value * 1E3
+                rows.append(row)
+        return rows
+
+    def histograms(self):
+        """Return all histograms as {interface: {command: {phase: histogram dictionary}}}."""
+        answer = OrderedDict()
+        with self._lock:
+            for (interface, mnemonic), item in self._items.items():
+                phases = OrderedDict((phase, item[phase].todict()) for phase in PHASES if phase in item)
+                answer.setdefault(interface, OrderedDict())[mnemonic] = phases
+        return answer
+
+    def totext(self, maxrows=None):
+        """Return the summary as table sorted by total reply time, e.g. for a read-only setting.
+        @param maxrows : Maximum number of commands in the table or None for all.
+        @return : Table as string.
+        """
+        rows = sorted(self.summary(), key=lambda row: -(row['reply_mean'] or 0) * row['count'])[:maxrows]
+        lines = ['%-10s %8s %10s %10s %10s %10s' % ('command', 'count', 'write', 'reply', 'reply p99', 'errcheck')]
+        for row in rows:
+            values = ['%10s' % ('-' if row[key] is None else '%.3f' % row[key])
+                      for key in ('write_mean', 'reply_mean', 'reply_p99', 'errcheck_mean')]
+            lines.append('%-10s %8d %s' % (row['command'], row['count'], ' '.join(values)))
+        return '\n'.join(lines)
+
+    def tocsv(self, filepath):
+        """Save the summary to 'filepath' in CSV format, times are in milliseconds."""
+        rows = self.summary()
+        if sys.version_info[0] < 3:
+            fobj = open(filepath, 'wb')
+        else:
+            fobj = open(filepath, 'w', newline='')  # Unexpected keyword argument in Python 2 pylint: disable=E1123
+        with fobj:
+            fieldnames = list(rows[0]) if rows else ['interface', 'command', 'count', 'sent', 'received']
+            writer = csv.DictWriter(fobj, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def tojson(self, filepath):
+        """Save summary and histograms to 'filepath' in JSON format."""
+        with open(filepath, 'w') as fobj:
+            json.dump(OrderedDict([('summary', self.summary()), ('histograms', self.histograms())]), fobj, indent=1)
@@ -3,6 +3,7 @@
 """Interface class to communicate with a PI device."""
 
 from abc import ABCMeta, abstractmethod, abstractproperty
+from time import sleep
 
 __signature__ = 0xf7f5f54d8309be0cd27d1554c3cb5fe4
 
@@ -54,10 +55,20 @@ class PIGateway(object):
     @abstractmethod
     def read(self):
         """Return the answer to a GCS query command.
-        @return : Answer as string.
+        @return : Answer as bytes or bytes-like object, e.g. a memoryview that is only valid until the next call.
         """
         raise NotImplementedError()
 
+    def waitfordata(self, timeout):
+        """Wait until data is available to read or 'timeout' has expired.
+        Interfaces that can block on incoming data should override this method, the default
+        implementation only yields the processor for a short time.
+        @param timeout : Maximum time to wait in seconds as float.
+        @return : True if data may be available, False if 'timeout' expired without data.
+        """
+        sleep(min(timeout, 0.0005))
+        return True
+
     @abstractmethod
     def flush(self):
         """Flush input buffer. Should be called once after connect."""
@@ -0,0 +1,231 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Record the communication of a gateway and replay it later without a device.
+
+RecordingGateway writes every send() and every received chunk with its timestamp to a binary log file
+(see gcslogger.readlog). ReplayGateway feeds the recorded chunks back to GCSMessages, with the original
+timing or as fast as possible, and checks that the same commands are sent again.
+
+    with RecordingGateway(PISocket(host), 'session.bin') as gateway:
+        pidevice = GCSDevice(gateway=gateway)
+        ...
+
+    with ReplayGateway('session.bin') as gateway:
+        pidevice = GCSDevice(gateway=gateway)
+        ...
+"""
+
+from collections import deque
+from logging import debug
+from time import sleep, time
+
+from .. import GCSError, gcserror
+from ..gcslogger import GCSLogger, RECEIVED, SENT, readlog
+from ..interfaces.pigateway import PIGateway
+
+# Delays shorter than this time in seconds are waited for by polling.
+SPINTIME = 0.001
+
+
+class RecordingGateway(PIGateway):
+    """Pass all calls to 'gateway' and record sent and received data, can be used as context manager."""
+
+    def __init__(self, gateway, filepath):
+        """Record the communication of 'gateway' to 'filepath'.
+        @type gateway : pipython.pidevice.interfaces.pigateway.PIGateway
+        @param filepath : Full path to binary log file, is appended to if it exists.
+        """
+        debug('create an instance of RecordingGateway(gateway=%s, filepath=%r)', gateway, filepath)
+        self._gateway = gateway
+        self._logger = GCSLogger(filepath, binary=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return 'RecordingGateway(gateway=%s, filepath=%r)' % (self._gateway, self._logger.filepath)
+
+    @property
+    def gateway(self):
+        """Return the recorded gateway."""
+        return self._gateway
+
+    @property
+    def timeout(self):
+        """Return timeout in milliseconds."""
+        return self._gateway.timeout
+
+    def settimeout(self, value):
+        """Set timeout to 'value' in milliseconds."""
+        self._gateway.settimeout(value)
+
+    @property
+    def connected(self):
+        """Return True if a device is connected."""
+        return self._gateway.connected
+
+    @property
+    def connectionid(self):
+        """Return ID of current connection as integer."""
+        return self._gateway.connectionid
+
+    def send(self, msg):
+        """Record and send 'msg' to the device.
+        @param msg : String to send.
+        """
+        self._logger.log(SENT, self._gateway.connectionid, msg)
+        self._gateway.send(msg)
+
+    def read(self):
+        """Read and record the answer of the device.
+        @return : Answer as bytes.
+        """
+        received = self._gateway.read()
+        if received:
+            received = bytes(received)
+            self._logger.log(RECEIVED, self._gateway.connectionid, received)
+        return received
+
+    def waitfordata(self, timeout):
+        """Wait until data is available to read or 'timeout' in seconds has expired."""
+        return self._gateway.waitfordata(timeout)
+
+    def flush(self):
+        """Flush input buffer, flushed data is not recorded."""
+        self._gateway.flush()
+
+    def close(self):
+        """Close the gateway and write the log file."""
+        debug('RecordingGateway.close()')
+        self._gateway.close()
+        self._logger.close()
+
+
+# Too many instance attributes pylint: disable=R0902
+class ReplayGateway(PIGateway):
+    """Answer the sent commands with the data of a log file written by RecordingGateway, can be used as
+    context manager. The answers of a command become readable after it has been sent, with the recorded
+    delays if 'realtime' is True.
+    """
+
+    def __init__(self, filepath, connectionid=None, realtime=False, strict=True):
+        """Replay the communication in 'filepath'.
+        @param filepath : Full path to binary log file written by RecordingGateway.
+        @param connectionid : ID of the connection to replay or None for the first connection in the file.
+        @param realtime : If True answers become readable with their recorded delay, else immediately.
+        @param strict : If True sending a command that differs from the recorded one raises GCSError.
+        """
+        debug('create an instance of ReplayGateway(filepath=%r, connectionid=%r, realtime=%s)', filepath,
+              connectionid, realtime)
+        self._filepath = filepath
+        self._records = []
+        for timestamp, direction, recid, data in readlog(filepath):
+            if connectionid is None:
+                connectionid = recid
+            if recid == connectionid:
+                self._records.append((timestamp, direction, data))
+        self._connectionid = connectionid or 0
+        self._settings = {'realtime': realtime, 'strict': strict}
+        self._index = 0
+        self._pending = deque()  # (time when readable, data as bytes)
+        self._timeout = 7000  # milliseconds
+        self._connected = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return 'ReplayGateway(filepath=%r, connectionid=%s)' % (self._filepath, self._connectionid)
+
+    @property
+    def timeout(self):
+        """Return timeout in milliseconds."""
+        return self._timeout
+
+    def settimeout(self, value):
+        """Set timeout to 'value' in milliseconds."""
+        self._timeout = value
+
+    @property
+    def connected(self):
+        """Return True until the gateway is closed."""
+        return self._connected
+
+    @property
+    def connectionid(self):
+        """Return ID of the replayed connection as integer."""
+        return self._connectionid
+
+    @property
+    def done(self):
+        """True if all recorded data has been sent and read."""
+        return self._index >= len(self._records) and not self._pending
+
+    def send(self, msg):
+        """Compare 'msg' with the next recorded command and make its recorded answers readable.
+        @param msg : String to send.
+        """
+        if not isinstance(msg, bytes):
+            msg = msg.encode('cp1252')
+        now = time()
+        self._queueanswers(now, None)  # answers of the previous command that have not been read
+        if self._index >= len(self._records):
+            raise GCSError(gcserror.E_1_COM_ERROR, '@ ReplayGateway.send: end of %r reached, cannot send %r' %
+                           (self._filepath, msg))
+        timestamp, _, recorded = self._records[self._index]
+        if self._settings['strict'] and msg != recorded:
+            raise GCSError(gcserror.E_1_COM_ERROR, '@ ReplayGateway.send: record %d of %r is %r, sent %r' %
+                           (self._index, self._filepath, recorded, msg))
+        self._index += 1
+        self._queueanswers(now, timestamp if self._settings['realtime'] else None)
+
+    def _queueanswers(self, now, senttime):
+        """Make the recorded answers up to the next sent command readable.
+        @param now : Time of the current send() as float.
+        @param senttime : Recorded time of the current command or None to make the answers readable immediately.
+        """
+        while self._index < len(self._records) and self._records[self._index][1] == RECEIVED:
+            timestamp, _, data = self._records[self._index]
+            self._pending.append((now if senttime is None else now + max(0, timestamp - senttime), data))
+            self._index += 1
+
+    def read(self):
+        """Return the next recorded answer if it is readable.
+        @return : Answer as bytes, empty if the answer is not readable yet.
+        """
+        if not self._pending:
+            raise GCSError(gcserror.E_7_COM_TIMEOUT, '@ ReplayGateway.read: no more data recorded in %r before '
+                                                     'record %d' % (self._filepath, self._index))
+        if self._pending[0][0] > time():
+            return b''
+        return self._pending.popleft()[1]
+
+    def waitfordata(self, timeout):
+        """Wait until the next recorded answer is readable or 'timeout' in seconds has expired.
+        The last SPINTIME seconds are not slept, sleep() is too coarse for the short delays of TCP/IP.
+        """
+        if not self._pending:
+            return False
+        delay = self._pending[0][0] - time()
+        if delay > timeout:
+            sleep(timeout)
+            return False
+        if delay > SPINTIME:
+            sleep(delay - SPINTIME)
+        return True
+
+    def flush(self):
+        """Discard all readable answers."""
+        debug('ReplayGateway.flush()')
+        self._pending.clear()
+
+    def close(self):
+        """Close the replay."""
+        debug('ReplayGateway.close()')
+        self._connected = False
@@ -2,27 +2,45 @@
 # -*- coding: utf-8 -*-
 """Provide access to the serial port. Requires the "pyserial" package (pip install pyserial)."""
 
-from logging import debug
+from logging import debug, error
+from threading import Condition, Thread
+from time import time
 import serial
 
 from ..interfaces.pigateway import PIGateway
 
 __signature__ = 0x6cf969e1fd8746f703870b5cc9395205
 
+# Size of the receive and transmit buffers of the serial driver in bytes, only if the driver supports it.
+OSBUFSIZE = 65536
 
+# Maximum time in seconds the reader thread blocks in one read of the serial port.
+READERSLICE = 0.05
+
+
+# Too many instance attributes pylint: disable=R0902
 class PISerial(PIGateway):
     """Provide access to the serial port, can be used as context manager."""
 
-    def __init__(self, port, baudrate):
+    def __init__(self, port, baudrate, reader=False):
         """Provide access to the serial port.
         @param port : Name of the serial port to use as string, e.g. "COM1" or "/dev/ttyS0".
         @param baudrate : Baud rate as integer.
+        @param reader : If True a background thread receives all incoming data into a buffer, so that
+        read() and waitfordata() do not call the serial driver.
         """
-        debug('create an instance of PISerial(port=%s, baudrate=%s)', port, baudrate)
+        debug('create an instance of PISerial(port=%s, baudrate=%s, reader=%s)', port, baudrate, reader)
         self._timeout = 7000  # milliseconds
         self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=self._timeout / 1000.)
+        if hasattr(self._ser, 'set_buffer_size'):  # Windows only
+            self._ser.set_buffer_size(rx_size=OSBUFSIZE, tx_size=OSBUFSIZE)
+        self._pending = bytearray()  # received but not yet returned by read()
+        self._stats = {'sent': 0, 'received': 0, 'busytime': 0., 'mark': None}
+        self._reader = {'thread': None, 'condition': Condition()}
         self._connected = True
         self.flush()
+        if reader:
+            self._startreader()
 
     def __enter__(self):
         return self
@@ -41,7 +59,8 @@ class PISerial(PIGateway):
     def settimeout(self, value):
         """Set timeout to 'value' in milliseconds."""
         self._timeout = value
-        self._ser.timeout = value / 1000.
+        if self._reader['thread'] is None:
+            self._ser.timeout = value / 1000.
 
     @property
     def connected(self):
@@ -53,25 +72,104 @@ class PISerial(PIGateway):
         """Return 0 as ID of current connection."""
         return 0
 
+    @property
+    def stats(self):
+        """Return the transfer statistics as dictionary with the number of 'sent' and 'received' bytes, the
+        'busytime' in seconds from each send() to the last byte received before the next send() and the
+        achieved 'throughput' of received bytes per second of busytime.
+        """
+        with self._reader['condition']:
+            stats = dict((key, self._stats[key]) for key in ('sent', 'received', 'busytime'))
+        stats['throughput'] = stats['received'] / stats['busytime'] if stats['busytime'] else 0.
+        return stats
+
+    def resetstats(self):
+        """Reset the transfer statistics."""
+        with self._reader['condition']:
+            self._stats.update({'sent': 0, 'received': 0, 'busytime': 0., 'mark': None})
+
     def send(self, msg):
         """Send 'msg' to the serial port.
         @param msg : String to send.
         """
         debug('PISerial.send: %r', msg)
+        if not isinstance(msg, bytes):
+            msg = msg.encode('cp1252')
+        with self._reader['condition']:
+            self._stats['sent'] += len(msg)
+            self._stats['mark'] = time()
         self._ser.write(msg)
 
     def read(self):
         """Return the answer to a GCS query command.
-        @return : Answer as string.
+        @return : Answer as bytes, empty if no data is available.
         """
-        received = self._ser.read_all()
+        with self._reader['condition']:
+            if self._reader['thread'] is None:
+                waiting = self._ser.in_waiting
+                if waiting:
+                    self._addreceived(self._ser.read(waiting))
+            received = bytes(self._pending)
+            del self._pending[:]
         debug('PISerial.read: %r', received)
         return received
 
+    def waitfordata(self, timeout):
+        """Block until at least one byte has been received or 'timeout' has expired.
+        @param timeout : Maximum time to wait in seconds as float.
+        @return : True if data is available, False if 'timeout' expired without data.
+        """
+        with self._reader['condition']:
+            if self._reader['thread'] is not None:
+                if not self._pending:
+                    self._reader['condition'].wait(timeout)
+                return bool(self._pending)
+            if self._pending or self._ser.in_waiting:
+                return True
+            if self._ser.timeout != timeout:
+                self._ser.timeout = timeout
+            self._addreceived(self._ser.read(1))
+            return bool(self._pending)
+
+    def _addreceived(self, data):
+        """Append 'data' to the pending data and update the statistics, call with the condition acquired."""
+        if not data:
+            return
+        self._pending += data
+        now = time()
+        self._stats['received'] += len(data)
+        if self._stats['mark'] is not None:
+            self._stats['busytime'] += now - self._stats['mark']
+            self._stats['mark'] = now
+
+    def _startreader(self):
+        """Start the background thread that receives all incoming data."""
+        self._ser.timeout = READERSLICE
+        self._reader['thread'] = Thread(target=self._runreader, name='PISerial reader')
+        self._reader['thread'].daemon = True
+        self._reader['thread'].start()
+
+    def _runreader(self):
+        """Receive incoming data in large chunks until the port is closed."""
+        condition = self._reader['condition']
+        while self._connected:
+            try:
+                received = self._ser.read(max(1, self._ser.in_waiting))
+            except (serial.SerialException, IOError, OSError) as exc:
+                if self._connected:
+                    error('PISerial: reader thread stopped: %s', exc)
+                break
+            if received:
+                with condition:
+                    self._addreceived(received)
+                    condition.notify_all()
+
     def flush(self):
         """Flush input buffer."""
         debug('PISerial.flush()')
-        self._ser.read_all()
+        with self._reader['condition']:
+            self._ser.reset_input_buffer()
+            del self._pending[:]
 
     def close(self):
         """Close serial port if connected."""
@@ -79,4 +177,6 @@ class PISerial(PIGateway):
             return
         debug('PISerial.close: close connection to port %r', self._ser.port)
         self._connected = False
+        if self._reader['thread'] is not None:
+            self._reader['thread'].join()
         self._ser.close()
@@ -3,6 +3,7 @@
 """Provide a socket."""
 
 from logging import debug
+import select
 import socket
 
 from .. import GCSError, gcserror
@@ -10,23 +11,28 @@ from ..interfaces.pigateway import PIGateway
 
 __signature__ = 0x66cd7418d95cd620fcfaaaa18de0c3f7
 
+# Default size of the receive buffer in bytes.
+BUFSIZE = 65536
+
 
 class PISocket(PIGateway):
     """Provide a socket, can be used as context manager."""
 
-    def __init__(self, host='localhost', port=50000):
+    def __init__(self, host='localhost', port=50000, bufsize=BUFSIZE):
         """Provide a connected socket.
         @param host : IP address as string, defaults to "localhost".
         @param port : IP port to use as integer, defaults to 50000.
+        @param bufsize : Size of the reusable receive buffer in bytes, defaults to BUFSIZE.
         """
-        debug('create an instance of PISocket(host=%s, port=%s)', host, port)
+        debug('create an instance of PISocket(host=%s, port=%s, bufsize=%s)', host, port, bufsize)
         self._timeout = 7000  # milliseconds
         self._host = host
         self._port = port
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._socket.connect((self._host, self._port))
+        self._buffer = None
+        self._readable = False
+        self.bufsize = bufsize
+        self._socket = self._opensocket()
         self._socket.setblocking(0)
-        self._socket.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)  # disable Nagle algorithm
         self._connected = True
         self.flush()
 
@@ -39,6 +45,13 @@ class PISocket(PIGateway):
     def __str__(self):
         return 'PISocket(host=%s, port=%s)' % (self._host, self._port)
 
+    def _opensocket(self):
+        """Return a connected TCP/IP socket."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.connect((self._host, self._port))
+        sock.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)  # disable Nagle algorithm
+        return sock
+
     @property
     def timeout(self):
         """Return timeout in milliseconds."""
@@ -48,6 +61,19 @@ class PISocket(PIGateway):
         """Set timeout to 'value' in milliseconds."""
         self._timeout = value
 
+    @property
+    def bufsize(self):
+        """Return size of the receive buffer in bytes."""
+        return len(self._buffer)
+
+    @bufsize.setter
+    def bufsize(self, value):
+        """Allocate a new receive buffer of 'value' bytes."""
+        value = int(value)
+        if value < 1:
+            raise ValueError('bufsize must be positive, got %r' % value)
+        self._buffer = memoryview(bytearray(value))
+
     @property
     def connected(self):
         """Return True if a device is connected."""
@@ -67,24 +93,42 @@ class PISocket(PIGateway):
             raise GCSError(gcserror.E_2_SEND_ERROR)
 
     def read(self):
-        """Return the answer to a GCS query command.
-        @return : Answer as string.
+        """Return the answer to a GCS query command. The data is received into a reusable buffer and
+        returned without copying, i.e. it is only valid until the next call of read() or flush().
+        @return : Answer as memoryview of bytes, empty if no data is available.
         """
+        if not self._readable and not self.waitfordata(0):
+            return b''
+        self._readable = False
         try:
-            received = self._socket.recv(2048)
-            debug('PISocket.read: %r', received)
+            numbytes = self._socket.recv_into(self._buffer)
         except IOError:
-            return u''
-        return received
+            return b''
+        if not numbytes:
+            raise GCSError(gcserror.E_1_COM_ERROR, '@ PISocket.read: connection closed by %s:%s' %
+                           (self._host, self._port))
+        self._readable = numbytes == len(self._buffer)  # probably more data pending
+        debug('PISocket.read: %d bytes', numbytes)
+        return self._buffer[:numbytes]
+
+    def waitfordata(self, timeout):
+        """Wait until data is available to read or 'timeout' has expired.
+        @param timeout : Maximum time to wait in seconds as float.
+        @return : True if data is available, False if 'timeout' expired without data.
+        """
+        self._readable = bool(select.select([self._socket], [], [], max(0, timeout))[0])
+        return self._readable
 
     def flush(self):
         """Flush input buffer."""
         debug('PISocket.flush()')
-        while True:
+        while self.waitfordata(0):
             try:
-                self._socket.recv(2048)
+                if not self._socket.recv_into(self._buffer):
+                    break
             except IOError:
                 break
+        self._readable = False
 
     def close(self):
         """Close socket."""
@@ -92,3 +136,23 @@ class PISocket(PIGateway):
         self._connected = False
         self._socket.shutdown(socket.SHUT_RDWR)
         self._socket.close()
+
+
+class PIUnixSocket(PISocket):
+    """Provide a UNIX domain socket, e.g. to a GCSDaemon, can be used as context manager."""
+
+    def __init__(self, path, bufsize=BUFSIZE):
+        """Provide a connected UNIX domain socket.
+        @param path : Path to the socket file as string.
+        @param bufsize : Size of the reusable receive buffer in bytes, defaults to BUFSIZE.
+        """
+        super(PIUnixSocket, self).__init__(host=path, port=None, bufsize=bufsize)
+
+    def __str__(self):
+        return 'PIUnixSocket(path=%s)' % self._host
+
+    def _opensocket(self):
+        """Return a connected UNIX domain socket."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # Module has no member pylint: disable=E1101
+        sock.connect(self._host)
+        return sock
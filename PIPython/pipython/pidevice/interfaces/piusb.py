@@ -3,6 +3,9 @@
 """Provide a USB Interface over LibUSB."""
 
 from logging import debug, error
+from array import array
+from threading import Condition, Thread
+from time import time
 import re
 
 # Unable to import pylint: disable=E0401
@@ -15,19 +18,39 @@ from .. import GCSError, gcserror
 
 __signature__ = 0x34d199ab268a9db602668302be4dd668
 
+# Number of bytes requested by one bulk read. 0 reads a single packet per libusb call. A larger value
+# receives several packets with one call but relies on the controller ending each answer with a short
+# packet. An answer that is an exact multiple of wMaxPacketSize without a zero-length packet then
+# only returns when the read times out.
+READSIZE = 0
+
+# Maximum time in milliseconds the reader thread blocks in one bulk read.
+READERSLICE = 50
+
 
 class PIUSB(PIGateway):
     """Provide a PIUSB, can be used as context manager."""
 
-    def __init__(self):
-        """Provide a PIUSB."""
-        debug('create an instance of PIUSB()')
+    def __init__(self, readsize=READSIZE, reader=False):
+        """Provide a PIUSB.
+        @param readsize : Number of bytes requested by one bulk read as integer, 0 reads single packets.
+        Only use a larger value, e.g. 16384, if the controller ends each answer with a short or zero-length
+        packet, otherwise an answer of a multiple of wMaxPacketSize bytes waits for the timeout.
+        @param reader : If True a background thread drains the IN endpoint into a buffer after connect(),
+        so that read() and waitfordata() do not call libusb.
+        """
+        debug('create an instance of PIUSB(readsize=%s, reader=%s)', readsize, reader)
         self._timeout = 7000  # milliseconds
         self._ifnum = None
         self._reattach = False
         self._ep_out = None
         self._ep_in = None
         self._dev = None
+        self._readsize = readsize
+        self._buffer = None  # reusable array for bulk reads, allocated in connect()
+        self._pending = bytearray()  # received but not yet returned by read()
+        self._stats = {'sent': 0, 'received': 0, 'transfers': 0, 'busytime': 0., 'mark': None}
+        self._reader = {'enabled': reader, 'running': False, 'thread': None, 'condition': Condition()}
 
     def __enter__(self):
         return self
@@ -47,15 +70,92 @@ class PIUSB(PIGateway):
         """Set timeout to 'value' in milliseconds."""
         self._timeout = value
 
+    @property
+    def stats(self):
+        """Return the transfer statistics as dictionary with the number of 'sent' and 'received' bytes, the
+        number of bulk read 'transfers' that returned data, the 'busytime' in seconds from each send() to the
+        last byte received before the next send() and the achieved 'throughput' of received bytes per second
+        of busytime.
+        """
+        with self._reader['condition']:
+            stats = dict((key, self._stats[key]) for key in ('sent', 'received', 'transfers', 'busytime'))
+        stats['throughput'] = stats['received'] / stats['busytime'] if stats['busytime'] else 0.
+        return stats
+
+    def resetstats(self):
+        """Reset the transfer statistics."""
+        with self._reader['condition']:
+            self._stats.update({'sent': 0, 'received': 0, 'transfers': 0, 'busytime': 0., 'mark': None})
+
     def read(self):
         """Return the answer to a GCS query command.
-        @return : Answer as string.
+        @return : Answer as bytes, empty if the reader thread has not received any data.
         """
-        received = self._ep_in.read(self._ep_in.wMaxPacketSize, timeout=self.timeout).tostring()
+        with self._reader['condition']:
+            if not self._pending and self._reader['thread'] is None:
+                self._addreceived(self._bulkread(self.timeout))
+            received = bytes(self._pending)
+            del self._pending[:]
         debug('PIUSB.read: %r', received)
-        received = received.rstrip(b'\0')  # some controllers return their answer in a size of modulus 2
         return received
 
+    def waitfordata(self, timeout):
+        """Wait with a bulk read until data has been received or 'timeout' has expired.
+        @param timeout : Maximum time to wait in seconds as float.
+        @return : True if data is available, False if 'timeout' expired without data.
+        """
+        with self._reader['condition']:
+            if self._reader['thread'] is not None:
+                if not self._pending:
+                    self._reader['condition'].wait(timeout)
+            elif not self._pending:
+                try:
+                    self._addreceived(self._bulkread(max(1, int(timeout * 1000))))
+                except usb.USBError:  # timeout
+                    return False
+            return bool(self._pending)
+
+    def _bulkread(self, timeout):
+        """Receive up to 'readsize' bytes into the reusable buffer.
+        @param timeout : Timeout in milliseconds as integer.
+        @return : Number of received bytes without trailing zeros as integer.
+        """
+        numbytes = self._ep_in.read(self._buffer, timeout=timeout)
+        while numbytes and not self._buffer[numbytes - 1]:  # some controllers return their answer in a size
+            numbytes -= 1  # of modulus 2
+        return numbytes
+
+    def _addreceived(self, numbytes):
+        """Append 'numbytes' of the buffer to the pending data and update the statistics.
+        Call with the condition acquired.
+        """
+        if not numbytes:
+            return
+        self._pending += memoryview(self._buffer)[:numbytes]
+        now = time()
+        self._stats['received'] += numbytes
+        self._stats['transfers'] += 1
+        if self._stats['mark'] is not None:
+            self._stats['busytime'] += now - self._stats['mark']
+            self._stats['mark'] = now
+
+    def _runreader(self):
+        """Drain the IN endpoint until the connection is closed."""
+        condition = self._reader['condition']
+        while self._reader['running']:
+            try:
+                numbytes = self._bulkread(READERSLICE)
+            except usb.USBError as exc:
+                if istimeout(exc):
+                    continue
+                if self._reader['running']:
+                    error('PIUSB: reader thread stopped: %s', exc)
+                break
+            with condition:
+                self._addreceived(numbytes)
+                if self._pending:
+                    condition.notify_all()
+
     @property
     def connected(self):
         """Return True if a device is connected."""
@@ -114,24 +214,39 @@ class PIUSB(PIGateway):
             self._reattach = True
             self._dev.detach_kernel_driver(self._ifnum)
         usb.util.claim_interface(self._dev, self._ifnum)
+        packetsize = self._ep_in.wMaxPacketSize
+        self._buffer = array('B', [0]) * max(packetsize, self._readsize // packetsize * packetsize)
         self.flush()
+        if self._reader['enabled']:
+            self._reader['running'] = True
+            self._reader['thread'] = Thread(target=self._runreader, name='PIUSB reader')
+            self._reader['thread'].daemon = True
+            self._reader['thread'].start()
 
     def flush(self):
         """Flush input buffer."""
         debug('PIUSB.flush()')
-        while True:
-            try:
-                self._ep_in.read(self._ep_in.wMaxPacketSize, timeout=100)
-            except usb.USBError:
-                break
+        with self._reader['condition']:
+            if self._reader['thread'] is None:
+                while True:
+                    try:
+                        self._bulkread(100)
+                    except usb.USBError:
+                        break
+            del self._pending[:]
 
     def send(self, msg):
         """Send a GCS command to the device, do not query error from device.
         @param msg : GCS command as string with trailing line feed character.
         """
+        if not isinstance(msg, bytes):
+            msg = msg.encode('cp1252')
         if len(msg) % 2:  # some controllers need a string of size of modulus 2
-            msg += '\0'
+            msg += b'\0'
         debug('PIUSB.send: %r', msg)
+        with self._reader['condition']:
+            self._stats['sent'] += len(msg)
+            self._stats['mark'] = time()
         if self._ep_out.write(msg) != len(msg):
             raise GCSError(gcserror.E_2_SEND_ERROR)
 
@@ -140,6 +255,10 @@ class PIUSB(PIGateway):
         if not self.connected:
             return
         debug('PIUSB.close: close connection ID %d', self.connectionid)
+        if self._reader['thread'] is not None:
+            self._reader['running'] = False
+            self._reader['thread'].join()
+            self._reader['thread'] = None
         usb.util.release_interface(self._dev, self._ifnum)
         if self._reattach:
             self._dev.attach_kernel_driver(self._ifnum)
@@ -170,6 +289,12 @@ class PIUSB(PIGateway):
         raise GCSError(gcserror.E_6_CONNECTION_FAILED)
 
 
+def istimeout(exc):
+    """Return True if the USBError 'exc' has been raised because the timeout expired."""
+    return isinstance(exc, getattr(usb.core, 'USBTimeoutError', ())) or \
+        getattr(exc, 'backend_error_code', None) == -7  # LIBUSB_ERROR_TIMEOUT
+
+
 def getdevinfo(dev, stringid):
     """Return device info as string.
     @param dev : USB device instance.
@@ -0,0 +1,239 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Publish timestamped position and on target samples to other processes via shared memory.
+Requires Python 3.8 or later and the "numpy" package (pip install numpy).
+
+PositionFeed is the only writer of a ring buffer in a named shared memory block, PositionReader
+attaches to it by name from any process. There are no locks: each slot carries the number of the
+sample it holds and is invalidated while it is written, a reader copies a slot and accepts it only
+if the sample number is unchanged afterwards (seqlock).
+
+    feed = PositionFeed('pi_stage', axes=['1'])    # in the process that polls the controller
+    feed.publish({'1': 1.234}, {'1': True})
+
+    reader = PositionReader('pi_stage')            # in a camera or analysis process
+    timestamp, positions, ontarget = reader.latest()
+"""
+
+from collections import OrderedDict
+from logging import debug
+from time import time
+
+# Imported by _checkrequirements() on first use, numpy takes longer to import than pipython itself.
+numpy = resource_tracker = shared_memory = None
+
+# Identifies a shared memory block written by PositionFeed, the last digits are the layout version.
+MAGIC = 0x5049464545440001
+
+# Header as int64: MAGIC, capacity, number of axes, number of published samples, size of the axes names.
+HEADERSIZE = 8
+CAPACITY, NUMAXES, COUNT, NAMESIZE = 1, 2, 3, 4
+
+# Maximum size of the comma separated axes names in bytes.
+MAXNAMESIZE = 256
+
+# Columns of a slot before the positions: sample number and timestamp.
+SEQ, TIMESTAMP = 0, 1
+
+# Number of attempts of a reader to copy a slot that is written at the same time.
+MAXRETRIES = 100
+
+# Names of the shared memory blocks created by a PositionFeed of this process.
+_OWNED = set()
+
+
+def _checkrequirements():
+    """Import shared memory and numpy on first use, raise ImportError if they are not available."""
+    global numpy, resource_tracker, shared_memory  # Using the global statement pylint: disable=W0603
+    if shared_memory is None:
+        try:
+            from multiprocessing import resource_tracker, shared_memory  # pylint: disable=W0621
+        except ImportError:
+            raise ImportError('the position feed requires Python 3.8 or later (multiprocessing.shared_memory)')
+    if numpy is None:
+        try:
+            import numpy  # Redefining name from outer scope pylint: disable=W0621
+        except ImportError:
+            raise ImportError('the position feed requires the "numpy" package (pip install numpy)')
+
+
+def _getarrays(buf, capacity, numaxes):
+    """Return (header, names, slots) as numpy arrays on the shared memory 'buf'."""
+    header = numpy.ndarray((HEADERSIZE,), dtype=numpy.int64, buffer=buf)
+    names = numpy.ndarray((MAXNAMESIZE,), dtype=numpy.uint8, buffer=buf, offset=header.nbytes)
+    slots = numpy.ndarray((capacity, 2 + 2 * numaxes), dtype=numpy.float64, buffer=buf,
+                          offset=header.nbytes + names.nbytes)
+    return header, names, slots
+
+
+class PositionFeed(object):
+    """Write position samples into a ring buffer in shared memory, can be used as context manager."""
+
+    def __init__(self, name, axes, capacity=4096):
+        """Create the shared memory block 'name', an existing block of the same name is replaced.
+        @param name : Name of the shared memory block as string, readers attach with this name.
+        @param axes : List of axes names as strings in the order of the published values.
+        @param capacity : Number of samples kept in the ring buffer as integer.
+        """
+        _checkrequirements()
+        debug('create an instance of PositionFeed(name=%r, axes=%r, capacity=%d)', name, axes, capacity)
+        self._axes = [str(axis) for axis in axes]
+        names = ','.join(self._axes).encode('utf-8')
+        if len(names) > MAXNAMESIZE:
+            raise ValueError('axes names exceed %d bytes: %r' % (MAXNAMESIZE, names))
+        size = (HEADERSIZE + 2 * capacity * (1 + len(self._axes))) * 8 + MAXNAMESIZE
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:  # left over by a crashed writer
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _OWNED.add(self._shm.name)
+        self._header, self._names, self._slots = _getarrays(self._shm.buf, capacity, len(self._axes))
+        self._slots[:, SEQ] = -1.
+        self._names[:len(names)] = numpy.frombuffer(names, dtype=numpy.uint8)
+        self._header[CAPACITY], self._header[NUMAXES], self._header[NAMESIZE] = capacity, len(self._axes), len(names)
+        self._header[COUNT] = 0
+        self._header[0] = MAGIC  # readers accept the block from now on
+        self._count = 0
+
+    def __str__(self):
+        return 'PositionFeed(name=%r, axes=%r)' % (self.name, self._axes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def name(self):
+        """Name of the shared memory block as string."""
+        return self._shm.name
+
+    @property
+    def axes(self):
+        """List of axes names as strings."""
+        return list(self._axes)
+
+    @property
+    def count(self):
+        """Number of published samples as integer."""
+        return self._count
+
+    def publish(self, positions, ontarget=None, timestamp=None):
+        """Write a sample into the ring buffer.
+        @param positions : Dictionary {axis: position} or list of positions in the order of 'axes'.
+        @param ontarget : Dictionary {axis: bool} or list of bools or None if not known.
+        @param timestamp : Time of the sample in seconds since the epoch as float, defaults to time().
+        """
+        if isinstance(positions, dict):
+            positions = [positions[axis] for axis in self._axes]
+        if isinstance(ontarget, dict):
+            ontarget = [ontarget[axis] for axis in self._axes]
+        numaxes = len(self._axes)
+        slot = self._slots[self._count % self._header[CAPACITY]]
+        slot[SEQ] = -1.  # readers reject the slot while it is written
+        slot[TIMESTAMP] = time() if timestamp is None else timestamp
+        slot[2:2 + numaxes] = positions
+        slot[2 + numaxes:] = numpy.nan if ontarget is None else ontarget
+        slot[SEQ] = self._count
+        self._count += 1
+        self._header[COUNT] = self._count
+
+    def close(self):
+        """Close and remove the shared memory block, attached readers keep their mapping."""
+        if self._shm is None:
+            return
+        debug('PositionFeed.close()')
+        self._header = self._names = self._slots = None
+        self._shm.close()
+        self._shm.unlink()
+        _OWNED.discard(self._shm.name)
+        self._shm = None
+
+
+class PositionReader(object):
+    """Read position samples written by a PositionFeed in another process, can be used as context manager."""
+
+    def __init__(self, name):
+        """Attach to the shared memory block 'name' created by a PositionFeed.
+        @param name : Name of the shared memory block as string.
+        """
+        _checkrequirements()
+        debug('create an instance of PositionReader(name=%r)', name)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13 and later
+        except TypeError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.name not in _OWNED:  # else the writer of this process removes it on close
+                resource_tracker.unregister(getattr(self._shm, '_name', '/' + name), 'shared_memory')
+        header = numpy.ndarray((HEADERSIZE,), dtype=numpy.int64, buffer=self._shm.buf)
+        magic, self._capacity, numaxes = int(header[0]), int(header[CAPACITY]), int(header[NUMAXES])
+        del header  # the shared memory cannot be closed while a view exists
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError('%r is not a position feed or not initialized yet' % name)
+        self._header, names, self._slots = _getarrays(self._shm.buf, self._capacity, numaxes)
+        self._axes = bytes(names[:self._header[NAMESIZE]]).decode('utf-8').split(',')
+
+    def __str__(self):
+        return 'PositionReader(name=%r, axes=%r)' % (self._shm.name, self._axes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def axes(self):
+        """List of axes names as strings."""
+        return list(self._axes)
+
+    @property
+    def count(self):
+        """Number of samples published so far as integer."""
+        return int(self._header[COUNT])
+
+    def latest(self):
+        """Return the latest sample or None if nothing has been published yet.
+        @return : Tuple (timestamp, {axis: position}, {axis: ontarget}), ontarget is None if not known.
+        """
+        for _ in range(MAXRETRIES):
+            count = int(self._header[COUNT])
+            if not count:
+                return None
+            slot = self._slots[(count - 1) % self._capacity].copy()
+            if slot[SEQ] == count - 1 and self._slots[(count - 1) % self._capacity, SEQ] == count - 1:
+                numaxes = len(self._axes)
+                positions = OrderedDict(zip(self._axes, slot[2:2 + numaxes].tolist()))
+                ontarget = OrderedDict((axis, None if value != value else bool(value))  # NaN is unknown
+                                       for axis, value in zip(self._axes, slot[2 + numaxes:].tolist()))
+                return float(slot[TIMESTAMP]), positions, ontarget
+        raise RuntimeError('PositionReader: cannot read a consistent sample, the writer is too fast')
+
+    def recent(self, numsamples):
+        """Return up to 'numsamples' latest samples, oldest first. Samples that are overwritten while
+        they are copied are dropped.
+        @param numsamples : Maximum number of samples as integer, at most the capacity of the feed.
+        @return : Tuple (timestamps, positions, ontarget) of numpy arrays with shapes (n,), (n, numaxes)
+        and (n, numaxes), ontarget is 1., 0. or NaN if not known.
+        """
+        count = int(self._header[COUNT])
+        first = max(0, count - min(numsamples, self._capacity))
+        indices = numpy.arange(first, count) % self._capacity
+        slots = self._slots[indices]  # fancy indexing copies
+        valid = (slots[:, SEQ] == numpy.arange(first, count)) & (self._slots[indices, SEQ] == slots[:, SEQ])
+        slots = slots[valid]
+        numaxes = len(self._axes)
+        return slots[:, TIMESTAMP], slots[:, 2:2 + numaxes], slots[:, 2 + numaxes:]
+
+    def close(self):
+        """Detach from the shared memory block."""
+        if self._shm is None:
+            return
+        self._header = self._slots = None
+        self._shm.close()
+        self._shm = None
@@ -0,0 +1,1244 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Simulated GCS 2 controller whose axes move like real stages, served over TCP/IP for offline benchmarks.
+
+Unlike ReplyServer the simulator keeps the state of each axis: servo, reference, position with velocity and
+acceleration limited motion, on target state, travel range, wave tables and generators, data recorder tables
+and trigger outputs. Connect with GCSDevice().ConnectTCPIP('localhost', port) or with
+GCSDevice(gateway=PISocket(port=port)).
+
+    with SimServer(port=50000, latency=0.001, baudrate=115200) as server:
+        ...
+
+    python -m pipython.pitools.simcontroller --port 50000 --axes 1 2 --baudrate 115200
+"""
+
+from collections import OrderedDict
+from logging import debug
+from math import copysign, cos, floor, pi, sqrt
+from threading import RLock, Thread
+from time import sleep
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock
+
+# standard import comes before ... pylint: disable=C0411
+try:
+    from socketserver import BaseRequestHandler, ThreadingTCPServer
+except ImportError:
+    from SocketServer import BaseRequestHandler, ThreadingTCPServer
+
+from ..pidevice import gcserror
+from ..pidevice.gcsdaemon import splitcommands
+
+DEVNAME = 'C-413.2GA'
+SERVOTIME = 1E-4  # seconds
+NUMWAVETABLES = 8
+NUMRECTABLES = 8
+RECMAXPOINTS = 262144  # for all record tables
+
+# Axis settings, can be overwritten per axis by the 'stages' argument of SimController.
+STAGE = OrderedDict([
+    ('name', 'V-524.1AA'),
+    ('tmn', -2.5),
+    ('tmx', 2.5),
+    ('refpos', 0.0),
+    ('position', 1.0),  # position at power on, before referencing
+    ('velocity', 10.0),
+    ('maxvelocity', 250.0),
+    ('acceleration', 2500.0),
+    ('deceleration', 2500.0),
+    ('settletime', 2E-4),  # time constant of the closed loop in seconds
+    ('ontargetwindow', 1E-4),
+])
+
+# Parameters as {ID: (type, setting, description)}, settings that are not in STAGE belong to the controller.
+PARAMS = OrderedDict([
+    (0x0A, ('FLOAT', 'maxvelocity', 'Maximum closed loop velocity')),
+    (0x0B, ('FLOAT', 'acceleration', 'Closed loop acceleration')),
+    (0x0C, ('FLOAT', 'deceleration', 'Closed loop deceleration')),
+    (0x15, ('FLOAT', 'tmx', 'Maximum travel in positive direction')),
+    (0x16, ('FLOAT', 'refpos', 'Value at reference position')),
+    (0x30, ('FLOAT', 'tmn', 'Maximum travel in negative direction')),
+    (0x36, ('FLOAT', 'settletime', 'Settling time constant')),
+    (0x3C, ('CHAR', 'name', 'Stage name')),
+    (0x407, ('FLOAT', 'ontargetwindow', 'On target tolerance')),
+    (0x0E000200, ('FLOAT', 'servotime', 'Servo update time')),
+    (0x16000200, ('INT', 'recmaxpoints', 'Data recorder maximum points')),
+    (0x16000300, ('INT', 'numrectables', 'Data recorder channel number')),
+])
+
+# Supported record options of DRC, see pipython.datarectools.RecordOptions.
+RECORDOPTIONS = OrderedDict([
+    (0, 'Nothing is recorded'),
+    (1, 'Commanded position of axis'),
+    (2, 'Actual position of axis'),
+    (3, 'Position error of axis'),
+    (5, 'State of trigger output'),
+    (8, 'Time in seconds'),
+    (70, 'Commanded velocity of axis'),
+    (72, 'Actual velocity of axis'),
+])
+
+# Trigger sources of DRT as {source: event}, see pipython.datarectools.TriggerSources.
+TRIGGERSOURCES = OrderedDict([
+    (0, 'move'),  # default, any command changing the position
+    (1, 'move'),
+    (2, 'command'),  # next command, once
+    (4, 'now'),
+    (6, 'move'),  # once
+    (9, 'wavegen'),
+])
+ONCE = (2, 6)
+
+
+class SimError(Exception):
+    """GCS error of the simulated controller, the code is reported with "ERR?"."""
+
+    def __init__(self, code):
+        super(SimError, self).__init__(code)
+        self.code = code
+
+
+def tofloat(value):
+    """Return 'value' as float or raise SimError."""
+    try:
+        return float(value)
+    except ValueError:
+        raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+
+
+def toint(value):
+    """Return 'value' as integer or raise SimError, accepts hex strings and floats like "1.0"."""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value, base=0)
+    except ValueError:
+        return int(tofloat(value))
+
+
+def getpairs(args, minitems=1):
+    """Return 'args' as list of (item, value) tuples or raise SimError."""
+    if len(args) % 2 or len(args) < 2 * minitems:
+        raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+    return list(zip(args[::2], args[1::2]))
+
+
+def getramp(numpoints, speedupdown):
+    """Return 'numpoints' values from 0 to 1 with a linear speed ramp over 'speedupdown' points at both ends."""
+    if numpoints < 2:
+        return [1.0] * numpoints
+    steps = [min(1.0, float(i) / speedupdown, float(numpoints - i) / speedupdown) if speedupdown > 0 else 1.0
+             for i in range(1, numpoints)]
+    total, values = sum(steps), [0.0]
+    for step in steps:
+        values.append(values[-1] + step / total)
+    return values
+
+
+def getcurve(curvetype, args):
+    """Return the points of a WAV curve.
+    @param curvetype : "SIN_P", "LIN", "RAMP" or "PNT".
+    @param args : Arguments of the WAV command after the curve type as list of strings.
+    @return : List of floats.
+    """
+    if curvetype == 'PNT':
+        firstpoint, numpoints = toint(args[0]), toint(args[1])
+        points = [tofloat(value) for value in args[2:]]
+        if len(points) != numpoints:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        return [points[0]] * max(0, firstpoint - 1) + points if points else []
+    minargs = {'SIN_P': 6, 'LIN': 6, 'RAMP': 7}
+    if curvetype not in minargs:
+        raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+    if len(args) < minargs[curvetype]:
+        raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+    seglength, amplitude, offset = toint(args[0]), tofloat(args[1]), tofloat(args[2])
+    numpoints, firstpoint = toint(args[3]), toint(args[4])
+    if curvetype == 'LIN':
+        curve = getramp(numpoints, toint(args[5]))
+    elif curvetype == 'RAMP':
+        center = min(numpoints - 1, toint(args[6]))
+        speedupdown = toint(args[5])
+        curve = getramp(center + 1, speedupdown) + getramp(numpoints - center, speedupdown)[::-1][1:]
+    else:
+        center = max(1, min(numpoints - 1, toint(args[5])))
+        curve = [(1 - cos(pi * i / center)) / 2. if i <= center else
+                 (1 + cos(pi * (i - center) / (numpoints - center))) / 2. for i in range(numpoints)]
+    curve = [offset + amplitude * value for value in curve]
+    segment = [curve[0]] * max(0, firstpoint - 1) + curve
+    segment = segment[:seglength]
+    return segment + [segment[-1]] * (seglength - len(segment))
+
+
+def formatanswer(lines):
+    """Return 'lines' as GCS answer, i.e. all but the last line end with " \n"."""
+    return ' \n'.join(lines) + '\n'
+
+
+# Too many instance attributes pylint: disable=R0902
+# Too many public methods pylint: disable=R0904
+class SimController(object):
+    """Simulated GCS 2 controller, the state advances in servo cycles with the elapsed time."""
+
+    def __init__(self, axes=('1',), stages=None, devname=DEVNAME, servotime=SERVOTIME):
+        """Simulated GCS 2 controller.
+        @param axes : Axis names as list of strings.
+        @param stages : Dictionary {axis: {setting: value}} to overwrite the STAGE settings of single axes.
+        @param devname : Device name as string, is reported by "*IDN?".
+        @param servotime : Duration of a servo cycle in seconds as float.
+        """
+        debug('create an instance of SimController(axes=%r, devname=%r)', axes, devname)
+        self._lock = RLock()
+        self._settings = {'devname': devname, 'servotime': float(servotime), 'recmaxpoints': RECMAXPOINTS,
+                          'numrectables': NUMRECTABLES}
+        self._axes = OrderedDict()
+        for axis in axes:
+            stage = dict(STAGE, **((stages or {}).get(axis, {})))
+            self._axes[str(axis)] = {
+                'stage': stage, 'saved': dict(stage), 'servo': False, 'ron': True, 'referenced': False,
+                'referencing': False, 'pos': stage['position'], 'setpoint': stage['position'],
+                'target': stage['position'], 'vel': 0., 'actvel': 0., 'moving': False, 'settling': False,
+            }
+        self._wavetables = dict((table, []) for table in range(1, NUMWAVETABLES + 1))
+        self._wavegens = OrderedDict((gen, {'table': gen, 'cycles': 0, 'rate': 1, 'interpol': 0, 'mode': 0,
+                                            'start': None}) for gen in range(1, len(self._axes) + 1))
+        self._triggers = OrderedDict((line, {'params': {1: 0.1, 2: 1, 3: 0, 5: 0., 6: 0., 7: 1, 8: 0., 9: 0.},
+                                             'enabled': False, 'state': 0, 'count': 0}) for line in range(1, 5))
+        self._digitalout = dict((line, 0) for line in range(1, 5))
+        self._recorder = {'rate': 1, 'active': False, 'phase': 0, 'tables': OrderedDict(
+            (table, {'source': list(self._axes)[0], 'option': 0, 'trigger': 0, 'armed': True, 'data': []})
+            for table in range(1, NUMRECTABLES + 1))}
+        self._recorder['tables'][1]['option'] = 1
+        self._recorder['tables'][2]['option'] = 2
+        self._error = 0
+        self._cycle = 0
+        self._origin = clock()
+
+    def __str__(self):
+        return 'SimController(devname=%s, axes=%s)' % (self._settings['devname'], ','.join(self._axes))
+
+    @property
+    def axes(self):
+        """Return the axis names as list of strings."""
+        return list(self._axes)
+
+    @property
+    def servotime(self):
+        """Return the duration of a servo cycle in seconds as float."""
+        return self._settings['servotime']
+
+    @property
+    def triggercounts(self):
+        """Return the number of pulses of each trigger output in "position distance" mode as {line: count}."""
+        with self._lock:
+            self._advance()
+            return dict((line, trigger['count']) for line, trigger in self._triggers.items())
+
+    def getstate(self, axis):
+        """Return a copy of the state of 'axis' as dictionary, e.g. for checking a benchmark."""
+        with self._lock:
+            self._advance()
+            state = dict(self._axes[axis])
+            state['stage'] = dict(state['stage'])
+            return state
+
+    def execute(self, cmd):
+        """Execute the GCS command 'cmd' and return its answer.
+        @param cmd : Single character or command line as string, with or without trailing linefeed.
+        @return : Answer as string with trailing linefeed or None if 'cmd' has no answer.
+        """
+        if len(cmd) > 1 or cmd == '\n':
+            cmd = cmd.strip()
+            if not cmd:
+                return None
+        with self._lock:
+            self._advance()
+            if len(cmd) == 1:
+                mnemonic, args = cmd, []
+            else:
+                args = cmd.split()
+                mnemonic, args = args[0].upper(), args[1:]
+                if mnemonic == 'SAI?' and args and args[0].upper() == 'ALL':
+                    args = []
+            isquery = len(cmd) == 1 and cmd != chr(24) or mnemonic.endswith('?')
+            if mnemonic == 'ERR?':
+                err, self._error = self._error, 0
+                return '%d\n' % err
+            try:
+                if mnemonic not in COMMANDS:
+                    raise SimError(gcserror.E2_PI_CNTR_UNKNOWN_COMMAND)
+                answer = getattr(self, COMMANDS[mnemonic][0])(args)
+            except SimError as exc:
+                debug('SimController: %r failed with error %d', cmd, exc.code)
+                self._error = self._error or exc.code
+                answer = '\n' if isquery else None
+            if not isquery:
+                self._triggerrecorder('command')
+            return answer
+
+    # Servo cycles ###########################################################
+
+    def _advance(self):
+        """Run the servo cycles up to the current time."""
+        cycles = int((clock() - self._origin) / self._settings['servotime']) - self._cycle
+        while cycles > 0:
+            if self._isbusy():
+                self._step()
+                cycles -= 1
+            else:
+                self._skip(cycles)
+                cycles = 0
+
+    def _isbusy(self):
+        """Return True if the next servo cycle must be calculated, i.e. it cannot be skipped."""
+        for axis in self._axes.values():
+            if axis['moving'] or axis['settling']:
+                return True
+        if any(gen['mode'] for gen in self._wavegens.values()):
+            return self._recorder['active'] or any(trigger['enabled'] for trigger in self._triggers.values())
+        return False
+
+    def _step(self):
+        """Calculate the next servo cycle."""
+        dt = self._settings['servotime']
+        self._cycle += 1
+        previous = dict((name, axis['pos']) for name, axis in self._axes.items())
+        for gen in self._wavegens:
+            if self._wavegens[gen]['mode']:
+                self._runwavegen(gen, self._cycle)
+        for axis in self._axes.values():
+            if axis['moving']:
+                self._movesetpoint(axis, dt)
+            stage = axis['stage']
+            if axis['servo'] and axis['pos'] != axis['setpoint']:
+                axis['pos'] += (axis['setpoint'] - axis['pos']) * min(1., dt / stage['settletime'])
+                if abs(axis['setpoint'] - axis['pos']) < 1E-12:
+                    axis['pos'] = axis['setpoint']
+            axis['settling'] = axis['pos'] != axis['setpoint']
+        for name, axis in self._axes.items():
+            axis['actvel'] = (axis['pos'] - previous[name]) / dt
+        for trigger in self._triggers.values():
+            self._settrigger(trigger, previous)
+        if self._recorder['active']:
+            self._record(self._cycle, 1)
+
+    def _skip(self, cycles):
+        """Skip 'cycles' servo cycles in which the positions do not change."""
+        if self._recorder['active']:
+            self._record(self._cycle + 1, cycles)
+        self._cycle += cycles
+        for gen in self._wavegens:
+            if self._wavegens[gen]['mode']:
+                self._runwavegen(gen, self._cycle)
+                axis = self._getgenaxis(gen)
+                axis['pos'] = axis['setpoint']
+        for axis in self._axes.values():
+            axis['actvel'] = 0.
+
+    @staticmethod
+    def _movesetpoint(axis, dt):
+        """Move the setpoint of 'axis' towards its target with limited velocity and acceleration."""
+        stage = axis['stage']
+        dist = axis['target'] - axis['setpoint']
+        vel = axis['vel']
+        if abs(dist) <= abs(vel) * dt or not dist and not vel:
+            axis['setpoint'], axis['vel'], axis['moving'] = axis['target'], 0., False
+            if axis['referencing']:
+                axis['referencing'], axis['referenced'] = False, True
+            return
+        desired = copysign(min(axis['stage']['velocity'], sqrt(2. * stage['deceleration'] * abs(dist))), dist)
+        speedup = abs(desired) > abs(vel) and desired * vel >= 0
+        limit = (stage['acceleration'] if speedup else stage['deceleration']) * dt
+        axis['vel'] = vel + max(-limit, min(limit, desired - vel))
+        axis['setpoint'] += axis['vel'] * dt
+
+    def _getgenaxis(self, gen):
+        """Return the state of the axis driven by wave generator 'gen'."""
+        return self._axes[list(self._axes)[gen - 1]]
+
+    def _runwavegen(self, gen, cycle):
+        """Set the setpoint of the axis of wave generator 'gen' according to its wave table in 'cycle'."""
+        wavegen = self._wavegens[gen]
+        axis = self._getgenaxis(gen)
+        table = self._wavetables[wavegen['table']]
+        index = (cycle - wavegen['start']) // wavegen['rate']
+        if not table or wavegen['cycles'] and index >= wavegen['cycles'] * len(table):
+            wavegen['mode'] = 0
+            axis['setpoint'] = table[-1] if table else axis['setpoint']
+            axis['target'] = axis['setpoint']
+            return
+        axis['setpoint'] = axis['target'] = table[index % len(table)]
+
+    def _settrigger(self, trigger, previous):
+        """Calculate the state of the trigger output 'trigger' for the current servo cycle."""
+        if not trigger['enabled']:
+            trigger['state'] = 0
+            return
+        params = trigger['params']
+        axisname = str(int(params[2]))
+        if axisname not in self._axes:
+            return
+        axis = self._axes[axisname]
+        mode, state = int(params[3]), 0
+        if mode == 0:  # position distance between start and stop threshold, if they are different
+            low, high = sorted((params[8], params[9]))
+            step = abs(params[1])
+            if step and (low == high or low <= axis['pos'] <= high):
+                before = floor((previous[axisname] - params[8]) / step)
+                after = floor((axis['pos'] - params[8]) / step)
+                if before != after:
+                    state = 1
+                    trigger['count'] += int(abs(after - before))
+        elif mode == 2:  # on target
+            state = int(self._isontarget(axis))
+        elif mode == 3:  # between min and max threshold
+            state = int(params[5] <= axis['pos'] <= params[6])
+        elif mode == 6:  # in motion
+            state = int(axis['moving'])
+        trigger['state'] = state if params[7] else 1 - state
+
+    # Data recorder ##########################################################
+
+    def _triggerrecorder(self, event):
+        """Start recording if a record table is armed for 'event', "move", "command", "wavegen" or "now"."""
+        start = False
+        for table in self._recorder['tables'].values():
+            if table['option'] and table['armed'] and TRIGGERSOURCES.get(table['trigger']) == event:
+                if table['trigger'] in (0, 1) and self._recorder['active']:
+                    continue
+                start = True
+                table['armed'] = table['trigger'] not in ONCE
+        if start:
+            for table in self._recorder['tables'].values():
+                table['data'] = []
+            self._recorder['active'], self._recorder['phase'] = True, 0
+
+    def _getsample(self, table):
+        """Return the current value of record 'table'."""
+        option, source = table['option'], table['source']
+        if option == 8:
+            return self._cycle * self._settings['servotime']
+        if option == 5:
+            trigger = self._triggers.get(toint(source))
+            return trigger['state'] if trigger else 0
+        axis = self._axes.get(source)
+        if axis is None:
+            return 0.
+        return {1: axis['setpoint'], 2: axis['pos'], 3: axis['setpoint'] - axis['pos'], 70: axis['vel'],
+                72: axis['actvel']}.get(option, 0.)
+
+    def _record(self, firstcycle, cycles):
+        """Record the samples of 'cycles' servo cycles from 'firstcycle' on, the positions do not change in these
+        cycles, only the time does.
+        """
+        recorder = self._recorder
+        first = -recorder['phase'] % recorder['rate']
+        numsamples = 0 if first >= cycles else 1 + (cycles - 1 - first) // recorder['rate']
+        recorder['phase'] += cycles
+        maxpoints = self._settings['recmaxpoints'] // self._settings['numrectables']
+        full = True
+        for table in recorder['tables'].values():
+            if not table['option']:
+                continue
+            count = min(numsamples, maxpoints - len(table['data']))
+            if count > 0 and table['option'] == 8:
+                table['data'].extend((firstcycle + first + i * recorder['rate']) * self._settings['servotime']
+                                     for i in range(count))
+            elif count > 0:
+                table['data'].extend([self._getsample(table)] * count)
+            full &= len(table['data']) >= maxpoints
+        if full:
+            recorder['active'] = False
+
+    def _getgcsarray(self, names, columns, args, sampletime):
+        """Return GCS array data of 'columns' as answer of "DRR?" or "GWD?".
+        @param names : Dictionary {column ID: description}.
+        @param columns : Dictionary {column ID: list of values}.
+        @param args : Arguments "offset numvalues column1 column2 ..." as list of strings.
+        @param sampletime : Sample time in seconds as float or None.
+        """
+        offset = toint(args[0]) if args else 1
+        ids = [toint(arg) for arg in args[2:]] or list(columns)
+        for colid in ids:
+            if colid not in columns:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+        numvalues = toint(args[1]) if len(args) > 1 else max(len(columns[colid]) for colid in ids)
+        data = [columns[colid][max(0, offset - 1):max(0, offset - 1) + numvalues] for colid in ids]
+        numvalues = min(len(values) for values in data) if data else 0
+        header = ['# REM %s (simulated)' % self._settings['devname'], '# VERSION = 1', '# TYPE = 1',
+                  '# SEPARATOR = 32', '# DIM = %d' % len(ids)]
+        if sampletime is not None:
+            header.append('# SAMPLE_TIME = %g' % sampletime)
+        header.append('# NDATA = %d' % numvalues)
+        header.extend('# NAME%d = %s' % (i, names[colid]) for i, colid in enumerate(ids))
+        header.append('# END_HEADER')
+        lines = [' '.join('%.6f' % values[i] for values in data) for i in range(numvalues)]
+        return formatanswer(header + lines)
+
+    # Helpers ################################################################
+
+    def _getaxes(self, args):
+        """Return the axis states of 'args' or of all axes as list of (name, state) or raise SimError."""
+        if not args:
+            return list(self._axes.items())
+        for axis in args:
+            if axis not in self._axes:
+                raise SimError(gcserror.E15_PI_CNTR_INVALID_AXIS_IDENTIFIER)
+        return [(axis, self._axes[axis]) for axis in args]
+
+    def _getaxisvalues(self, args, conv=tofloat):
+        """Return pairs "axis value" in 'args' as list of (state, value) or raise SimError."""
+        pairs = getpairs(args)
+        axes = self._getaxes([axis for axis, _ in pairs])
+        return [(axis[1], conv(value)) for axis, (_, value) in zip(axes, pairs)]
+
+    def _getitems(self, args, items):
+        """Return integer items of 'args' or all 'items' as list, raise SimError for unknown items."""
+        if not args:
+            return list(items)
+        result = [toint(arg) for arg in args]
+        for item in result:
+            if item not in items:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+        return result
+
+    @staticmethod
+    def _isontarget(axis):
+        """Return True if 'axis' is on target."""
+        return axis['servo'] and not axis['moving'] and abs(axis['pos'] - axis['target']) <= \
+            axis['stage']['ontargetwindow']
+
+    def _isgenerating(self, axis):
+        """Return True if a wave generator drives 'axis'."""
+        return any(gen['mode'] and self._getgenaxis(num) is axis for num, gen in self._wavegens.items())
+
+    def _startmove(self, moves, checkref=True):
+        """Start the motion of all (axis, target) in 'moves' after checking them, or raise SimError."""
+        for axis, target in moves:
+            stage = axis['stage']
+            if not axis['servo'] or checkref and axis['ron'] and not axis['referenced']:
+                raise SimError(gcserror.E5_PI_CNTR_MOVE_WITHOUT_REF_OR_NO_SERVO)
+            if self._isgenerating(axis):
+                raise SimError(gcserror.E73_PI_CNTR_WAVE_GENERATOR_ACTIVE)
+            if checkref and not stage['tmn'] <= target <= stage['tmx']:
+                raise SimError(gcserror.E7_PI_CNTR_POS_OUT_OF_LIMITS)
+        for axis, target in moves:
+            axis['target'], axis['moving'] = target, True
+        self._triggerrecorder('move')
+
+    def _stop(self, axes, abrupt=False):
+        """Stop the motion of 'axes' and their wave generators, raise SimError(E10) if anything was moving."""
+        moving = False
+        for axis in axes:
+            moving |= axis['moving'] or self._isgenerating(axis)
+            for num, gen in self._wavegens.items():
+                if self._getgenaxis(num) is axis:
+                    gen['mode'] = 0
+            if abrupt or not axis['moving']:
+                axis['setpoint'], axis['vel'] = axis['pos'], 0.
+                axis['target'], axis['moving'] = axis['pos'], False
+            else:
+                brake = axis['vel'] ** 2 / (2. * axis['stage']['deceleration'])
+                axis['target'] = axis['setpoint'] + copysign(brake, axis['vel'])
+            axis['referencing'] = False
+        if moving:
+            raise SimError(gcserror.E10_PI_CNTR_STOP)
+
+    # GCS commands ###########################################################
+
+    def qidn(self, _args):
+        """*IDN?"""
+        return '(c)2024 Physik Instrumente (PI) GmbH & Co. KG, %s, 0000000000, 0.1.0 simulated\n' % \
+            self._settings['devname']
+
+    def qver(self, _args):
+        """VER?"""
+        return formatanswer(['FW_ARM: V0.1.0 simulated', 'PIPython simcontroller: V0.1.0'])
+
+    def qhlp(self, _args):
+        """HLP?"""
+        lines = ['The following commands are valid:']
+        for mnemonic, (_, description) in COMMANDS.items():
+            lines.append('%s %s' % ('#%d' % ord(mnemonic) if len(mnemonic) == 1 else mnemonic, description))
+        return formatanswer(lines + ['end of help'])
+
+    def qhpa(self, _args):
+        """HPA?"""
+        lines = ['The following parameters are valid:']
+        for param, (partype, _, description) in PARAMS.items():
+            lines.append('0x%X=\t0\t1\t%s\tsimulated\t%s' % (param, partype, description))
+        return formatanswer(lines + ['end of help'])
+
+    def qsai(self, _args):
+        """SAI?"""
+        return formatanswer(self.axes)
+
+    def qcst(self, args):
+        """CST?"""
+        return formatanswer(['%s=%s' % (name, axis['stage']['name']) for name, axis in self._getaxes(args)])
+
+    def cst(self, args):
+        """CST"""
+        for axis, name in self._getaxisvalues(args, conv=str):
+            axis['stage']['name'] = name
+
+    def qtmn(self, args):
+        """TMN?"""
+        return formatanswer(['%s=%.6f' % (name, axis['stage']['tmn']) for name, axis in self._getaxes(args)])
+
+    def qtmx(self, args):
+        """TMX?"""
+        return formatanswer(['%s=%.6f' % (name, axis['stage']['tmx']) for name, axis in self._getaxes(args)])
+
+    def qpos(self, args):
+        """POS?"""
+        return formatanswer(['%s=%.6f' % (name, axis['pos']) for name, axis in self._getaxes(args)])
+
+    def qmov(self, args):
+        """MOV?"""
+        return formatanswer(['%s=%.6f' % (name, axis['target']) for name, axis in self._getaxes(args)])
+
+    def mov(self, args):
+        """MOV"""
+        self._startmove(self._getaxisvalues(args))
+
+    def mvr(self, args):
+        """MVR"""
+        self._startmove([(axis, axis['target'] + value) for axis, value in self._getaxisvalues(args)])
+
+    def goh(self, args):
+        """GOH"""
+        self._startmove([(axis, 0.) for _, axis in self._getaxes(args)])
+
+    def pos(self, args):
+        """POS"""
+        for axis, value in self._getaxisvalues(args):
+            if axis['ron'] or axis['moving']:
+                raise SimError(gcserror.E34_PI_CNTR_CMD_NOT_ALLOWED_FOR_STAGE)
+            axis['pos'] = axis['setpoint'] = axis['target'] = value
+            axis['referenced'] = True
+
+    def dfh(self, args):
+        """DFH"""
+        for _, axis in self._getaxes(args):
+            shift = axis['pos']
+            for key in ('pos', 'setpoint', 'target'):
+                axis[key] -= shift
+            for key in ('tmn', 'tmx', 'refpos'):
+                axis['stage'][key] -= shift
+
+    def qsvo(self, args):
+        """SVO?"""
+        return formatanswer(['%s=%d' % (name, axis['servo']) for name, axis in self._getaxes(args)])
+
+    def svo(self, args):
+        """SVO"""
+        for axis, value in self._getaxisvalues(args, conv=toint):
+            if not value and (axis['moving'] or self._isgenerating(axis)):
+                self._stop([axis], abrupt=True)
+            axis['servo'] = bool(value)
+            axis['setpoint'] = axis['target'] = axis['pos']
+
+    def qron(self, args):
+        """RON?"""
+        return formatanswer(['%s=%d' % (name, axis['ron']) for name, axis in self._getaxes(args)])
+
+    def ron(self, args):
+        """RON"""
+        for axis, value in self._getaxisvalues(args, conv=toint):
+            axis['ron'] = bool(value)
+
+    def qfrf(self, args):
+        """FRF?"""
+        return formatanswer(['%s=%d' % (name, axis['referenced']) for name, axis in self._getaxes(args)])
+
+    def _reference(self, args, key):
+        """Move 'axes' to the stage setting 'key' and mark them as referenced when they get there."""
+        axes = [axis for _, axis in self._getaxes(args)]
+        self._startmove([(axis, axis['stage'][key]) for axis in axes], checkref=False)
+        for axis in axes:
+            axis['referencing'], axis['referenced'] = True, False
+
+    def frf(self, args):
+        """FRF"""
+        self._reference(args, 'refpos')
+
+    def fnl(self, args):
+        """FNL"""
+        self._reference(args, 'tmn')
+
+    def fpl(self, args):
+        """FPL"""
+        self._reference(args, 'tmx')
+
+    def qtrs(self, args):
+        """TRS?"""
+        return formatanswer(['%s=1' % name for name, _ in self._getaxes(args)])
+
+    def qlim(self, args):
+        """LIM?"""
+        return formatanswer(['%s=1' % name for name, _ in self._getaxes(args)])
+
+    def qont(self, args):
+        """ONT?"""
+        return formatanswer(['%s=%d' % (name, self._isontarget(axis)) for name, axis in self._getaxes(args)])
+
+    def qvel(self, args):
+        """VEL?"""
+        return formatanswer(['%s=%.6f' % (name, axis['stage']['velocity']) for name, axis in self._getaxes(args)])
+
+    def vel(self, args):
+        """VEL"""
+        values = self._getaxisvalues(args)
+        for axis, value in values:
+            if not 0 < value <= axis['stage']['maxvelocity']:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+        for axis, value in values:
+            axis['stage']['velocity'] = value
+
+    def qacc(self, args):
+        """ACC?"""
+        return formatanswer(['%s=%.6f' % (name, axis['stage']['acceleration']) for name, axis in self._getaxes(args)])
+
+    def acc(self, args):
+        """ACC"""
+        for axis, value in self._getaxisvalues(args):
+            if value <= 0:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            axis['stage']['acceleration'] = value
+
+    def qdec(self, args):
+        """DEC?"""
+        return formatanswer(['%s=%.6f' % (name, axis['stage']['deceleration']) for name, axis in self._getaxes(args)])
+
+    def dec(self, args):
+        """DEC"""
+        for axis, value in self._getaxisvalues(args):
+            if value <= 0:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            axis['stage']['deceleration'] = value
+
+    def hlt(self, args):
+        """HLT"""
+        self._stop([axis for _, axis in self._getaxes(args)])
+
+    def stp(self, _args):
+        """STP"""
+        self._stop(list(self._axes.values()), abrupt=True)
+
+    def stopall(self, _args):
+        """#24"""
+        self.stp([])
+
+    def getposstatus(self, _args):
+        """#3"""
+        return self.qpos([])
+
+    def ismoving(self, _args):
+        """#5"""
+        mask = sum(1 << i for i, axis in enumerate(self._axes.values()) if axis['moving'] or self._isgenerating(axis))
+        return '%X\n' % mask
+
+    def isrunningmacro(self, _args):
+        """#8"""
+        return '0\n'
+
+    def iscontrollerready(self, _args):
+        """#7"""
+        return '%s\n' % chr(177)
+
+    def isgeneratorrunning(self, _args):
+        """#9"""
+        mask = sum(1 << (gen - 1) for gen, wavegen in self._wavegens.items() if wavegen['mode'])
+        return '%X\n' % mask
+
+    def qspa(self, args, key='stage'):
+        """SPA?"""
+        pairs = getpairs(args) if args else [(item, param) for item in self._axes for param in PARAMS
+                                             if PARAMS[param][1] in STAGE] + \
+            [('1', param) for param in PARAMS if PARAMS[param][1] not in STAGE]
+        lines = []
+        for item, param in pairs:
+            param = toint(param) if not isinstance(param, int) else param
+            if param not in PARAMS:
+                raise SimError(gcserror.E54_PI_CNTR_UNKNOWN_PARAMETER)
+            partype, setting = PARAMS[param][:2]
+            if setting in STAGE:
+                value = self._getaxes([item])[0][1][key][setting]
+            else:
+                value = self._settings[setting]
+            value = '%.6g' % value if partype == 'FLOAT' else value
+            lines.append('%s 0x%X=%s' % (item, param, value))
+        return formatanswer(lines)
+
+    def qsep(self, args):
+        """SEP?"""
+        return self.qspa(args, key='saved')
+
+    def spa(self, args):
+        """SPA"""
+        if len(args) % 3 or not args:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        for item, param, value in zip(args[::3], args[1::3], args[2::3]):
+            param = toint(param)
+            if param not in PARAMS:
+                raise SimError(gcserror.E54_PI_CNTR_UNKNOWN_PARAMETER)
+            partype, setting = PARAMS[param][:2]
+            if setting not in STAGE:
+                raise SimError(gcserror.E60_PI_CNTR_PARAM_PROTECTION)
+            axis = self._getaxes([item])[0][1]
+            axis['stage'][setting] = {'FLOAT': tofloat, 'INT': toint}.get(partype, str)(value)
+
+    def wpa(self, _args):
+        """WPA"""
+        for axis in self._axes.values():
+            axis['saved'] = dict(axis['stage'])
+
+    def rpa(self, _args):
+        """RPA"""
+        for axis in self._axes.values():
+            axis['stage'] = dict(axis['saved'])
+
+    def wav(self, args):
+        """WAV"""
+        if len(args) < 3:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        table, append = toint(args[0]), args[1].upper()
+        if table not in self._wavetables or append not in ('X', '&', '+'):
+            raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+        curve = getcurve(args[2].upper(), args[3:])
+        if append == 'X':
+            self._wavetables[table] = curve
+        elif append == '&' and args[2].upper() == 'PNT':  # appended points start at their index in the table
+            values = self._wavetables[table]
+            start = max(0, toint(args[3]) - 1)
+            values.extend(curve[len(values):start])
+            values[start:] = curve[start:]
+        elif append == '&':
+            self._wavetables[table].extend(curve)
+        else:
+            values = self._wavetables[table]
+            values.extend([0.] * (len(curve) - len(values)))
+            for i, value in enumerate(curve):
+                values[i] += value
+
+    def qwav(self, args):
+        """WAV?"""
+        pairs = getpairs(args) if args else [(table, 1) for table in self._wavetables]
+        lines = []
+        for table, param in pairs:
+            table = toint(table)
+            if table not in self._wavetables or toint(param) != 1:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            lines.append('%d 1=%d' % (table, len(self._wavetables[table])))
+        return formatanswer(lines)
+
+    def qgwd(self, args):
+        """GWD?"""
+        names = dict((table, 'Wave table %d' % table) for table in self._wavetables)
+        return self._getgcsarray(names, self._wavetables, args, None)
+
+    def _setwavegens(self, args, key, conv=toint):
+        """Set the wave generator setting 'key' from the pairs "generator value" in 'args'."""
+        for gen, value in getpairs(args):
+            gen = self._getitems([gen], self._wavegens)[0]
+            self._wavegens[gen][key] = conv(value)
+
+    def _getwavegens(self, args, key):
+        """Return the wave generator setting 'key' of the generators in 'args' as answer."""
+        return formatanswer(['%d=%d' % (gen, self._wavegens[gen][key]) for gen in self._getitems(args,
+                                                                                                 self._wavegens)])
+
+    def wsl(self, args):
+        """WSL"""
+        for _, table in getpairs(args):
+            if toint(table) not in self._wavetables:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+        self._setwavegens(args, 'table')
+
+    def qwsl(self, args):
+        """WSL?"""
+        return self._getwavegens(args, 'table')
+
+    def wgc(self, args):
+        """WGC"""
+        self._setwavegens(args, 'cycles')
+
+    def qwgc(self, args):
+        """WGC?"""
+        return self._getwavegens(args, 'cycles')
+
+    def wtr(self, args):
+        """WTR"""
+        if len(args) % 3 or not args:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        for gen, rate, interpol in zip(args[::3], args[1::3], args[2::3]):
+            gens = list(self._wavegens) if toint(gen) == 0 else self._getitems([gen], self._wavegens)
+            for gen in gens:
+                self._wavegens[gen]['rate'] = max(1, toint(rate))
+                self._wavegens[gen]['interpol'] = toint(interpol)
+
+    def qwtr(self, args):
+        """WTR?"""
+        return formatanswer(['%d=%d %d' % (gen, self._wavegens[gen]['rate'], self._wavegens[gen]['interpol'])
+                             for gen in self._getitems(args, self._wavegens)])
+
+    def wgo(self, args):
+        """WGO"""
+        pairs = [(self._getitems([gen], self._wavegens)[0], toint(mode)) for gen, mode in getpairs(args)]
+        started = False
+        for gen, mode in pairs:
+            axis = self._getgenaxis(gen)
+            if mode and not axis['servo']:
+                raise SimError(gcserror.E5_PI_CNTR_MOVE_WITHOUT_REF_OR_NO_SERVO)
+        for gen, mode in pairs:
+            wavegen, axis = self._wavegens[gen], self._getgenaxis(gen)
+            if mode and not wavegen['mode']:
+                axis['moving'], axis['vel'] = False, 0.
+                wavegen['mode'], wavegen['start'] = mode, self._cycle + 1
+                started = True
+            elif not mode and wavegen['mode']:
+                wavegen['mode'] = 0
+                axis['target'] = axis['setpoint']
+        if started:
+            self._triggerrecorder('wavegen')
+
+    def qwgo(self, args):
+        """WGO?"""
+        return self._getwavegens(args, 'mode')
+
+    def cto(self, args):
+        """CTO"""
+        if len(args) % 3 or not args:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        for line, param, value in zip(args[::3], args[1::3], args[2::3]):
+            line, param = self._getitems([line], self._triggers)[0], toint(param)
+            if param not in self._triggers[line]['params']:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            self._triggers[line]['params'][param] = tofloat(value)
+
+    def qcto(self, args):
+        """CTO?"""
+        pairs = getpairs(args) if args else [(line, param) for line in self._triggers
+                                             for param in self._triggers[line]['params']]
+        lines = []
+        for line, param in pairs:
+            line, param = self._getitems([line], self._triggers)[0], toint(param)
+            if param not in self._triggers[line]['params']:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            lines.append('%d %d=%g' % (line, param, self._triggers[line]['params'][param]))
+        return formatanswer(lines)
+
+    def tro(self, args):
+        """TRO"""
+        for line, value in getpairs(args):
+            self._triggers[self._getitems([line], self._triggers)[0]]['enabled'] = bool(toint(value))
+
+    def qtro(self, args):
+        """TRO?"""
+        return formatanswer(['%d=%d' % (line, self._triggers[line]['enabled'])
+                             for line in self._getitems(args, self._triggers)])
+
+    def dio(self, args):
+        """DIO"""
+        for line, value in getpairs(args):
+            self._digitalout[self._getitems([line], self._digitalout)[0]] = int(bool(toint(value)))
+
+    def qdio(self, args):
+        """DIO?"""
+        return formatanswer(['%d=0' % line for line in self._getitems(args, self._digitalout)])
+
+    def qtnr(self, _args):
+        """TNR?"""
+        return '%d\n' % len(self._recorder['tables'])
+
+    def qrtr(self, _args):
+        """RTR?"""
+        return '%d\n' % self._recorder['rate']
+
+    def rtr(self, args):
+        """RTR"""
+        if len(args) != 1 or toint(args[0]) < 1:
+            raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+        self._recorder['rate'] = toint(args[0])
+
+    def drc(self, args):
+        """DRC"""
+        if len(args) % 3 or not args:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        for table, source, option in zip(args[::3], args[1::3], args[2::3]):
+            table, option = self._getitems([table], self._recorder['tables'])[0], toint(option)
+            if option not in RECORDOPTIONS:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            self._recorder['tables'][table].update({'source': source, 'option': option, 'data': []})
+
+    def qdrc(self, args):
+        """DRC?"""
+        tables = self._recorder['tables']
+        return formatanswer(['%d=%s %d' % (table, tables[table]['source'], tables[table]['option'])
+                             for table in self._getitems(args, tables)])
+
+    def drt(self, args):
+        """DRT"""
+        if len(args) % 3 or not args:
+            raise SimError(gcserror.E1_PI_CNTR_PARAM_SYNTAX)
+        tables = self._recorder['tables']
+        for table, source, _ in zip(args[::3], args[1::3], args[2::3]):
+            source = toint(source)
+            if source not in TRIGGERSOURCES:
+                raise SimError(gcserror.E17_PI_CNTR_PARAM_OUT_OF_RANGE)
+            for table in list(tables) if toint(table) == 0 else self._getitems([table], tables):
+                tables[table]['trigger'], tables[table]['armed'] = source, True
+            self._recorder['active'] = False
+        self._triggerrecorder('now')
+
+    def qdrt(self, args):
+        """DRT?"""
+        tables = self._recorder['tables']
+        return formatanswer(['%d=%d 0' % (table, tables[table]['trigger']) for table in self._getitems(args, tables)])
+
+    def qdrl(self, args):
+        """DRL?"""
+        tables = self._recorder['tables']
+        return formatanswer(['%d=%d' % (table, len(tables[table]['data'])) for table in self._getitems(args, tables)])
+
+    def qdrr(self, args):
+        """DRR?"""
+        tables = self._recorder['tables']
+        columns = OrderedDict((table, tables[table]['data']) for table in tables if tables[table]['option'])
+        names = dict((table, '%s of %s' % (RECORDOPTIONS[tables[table]['option']], tables[table]['source']))
+                     for table in tables)
+        if args[2:]:
+            columns = OrderedDict((table, tables[table]['data']) for table in self._getitems(args[2:], tables))
+        sampletime = self._settings['servotime'] * self._recorder['rate']
+        return self._getgcsarray(names, columns, args, sampletime)
+
+
+# Supported commands as {mnemonic: (method of SimController, description for "HLP?")}.
+COMMANDS = OrderedDict([
+    (chr(3), ('getposstatus', 'Get real position')),
+    (chr(5), ('ismoving', 'Request motion status')),
+    (chr(7), ('iscontrollerready', 'Request controller ready status')),
+    (chr(8), ('isrunningmacro', 'Query if macro is running')),
+    (chr(9), ('isgeneratorrunning', 'Get wave generator status')),
+    (chr(24), ('stopall', 'Stop all axes')),
+    ('*IDN?', ('qidn', 'Get device identification')),
+    ('ACC', ('acc', 'Set closed-loop acceleration')),
+    ('ACC?', ('qacc', 'Get closed-loop acceleration')),
+    ('CST', ('cst', 'Set assignment of stages to axes')),
+    ('CST?', ('qcst', 'Get assignment of stages to axes')),
+    ('CTO', ('cto', 'Set configuration of trigger output')),
+    ('CTO?', ('qcto', 'Get configuration of trigger output')),
+    ('DEC', ('dec', 'Set closed-loop deceleration')),
+    ('DEC?', ('qdec', 'Get closed-loop deceleration')),
+    ('DFH', ('dfh', 'Define current position as axis home position')),
+    ('DIO', ('dio', 'Set digital output lines')),
+    ('DIO?', ('qdio', 'Get digital input lines')),
+    ('DRC', ('drc', 'Set data recorder configuration')),
+    ('DRC?', ('qdrc', 'Get data recorder configuration')),
+    ('DRL?', ('qdrl', 'Get number of recorded points')),
+    ('DRR?', ('qdrr', 'Get recorded data values')),
+    ('DRT', ('drt', 'Set data recorder trigger source')),
+    ('DRT?', ('qdrt', 'Get data recorder trigger source')),
+    ('ERR?', ('', 'Get error number')),
+    ('FNL', ('fnl', 'Fast reference move to negative limit')),
+    ('FPL', ('fpl', 'Fast reference move to positive limit')),
+    ('FRF', ('frf', 'Fast reference move to reference switch')),
+    ('FRF?', ('qfrf', 'Get referencing result')),
+    ('GOH', ('goh', 'Go to home position')),
+    ('GWD?', ('qgwd', 'Get wave table data')),
+    ('HLP?', ('qhlp', 'Get list of available commands')),
+    ('HLT', ('hlt', 'Halt motion smoothly')),
+    ('HPA?', ('qhpa', 'Get list of available parameters')),
+    ('LIM?', ('qlim', 'Indicate limit switches')),
+    ('MOV', ('mov', 'Set target position')),
+    ('MOV?', ('qmov', 'Get target position')),
+    ('MVR', ('mvr', 'Set target relative to current target')),
+    ('ONT?', ('qont', 'Get on-target state')),
+    ('POS', ('pos', 'Set real position')),
+    ('POS?', ('qpos', 'Get real position')),
+    ('RON', ('ron', 'Set reference mode')),
+    ('RON?', ('qron', 'Get reference mode')),
+    ('RPA', ('rpa', 'Reset volatile memory parameters')),
+    ('RTR', ('rtr', 'Set record table rate')),
+    ('RTR?', ('qrtr', 'Get record table rate')),
+    ('SAI?', ('qsai', 'Get list of current axis identifiers')),
+    ('SEP?', ('qsep', 'Get non-volatile memory parameters')),
+    ('SPA', ('spa', 'Set volatile memory parameters')),
+    ('SPA?', ('qspa', 'Get volatile memory parameters')),
+    ('STP', ('stp', 'Stop all axes')),
+    ('SVO', ('svo', 'Set servo mode')),
+    ('SVO?', ('qsvo', 'Get servo mode')),
+    ('TMN?', ('qtmn', 'Get minimum commandable position')),
+    ('TMX?', ('qtmx', 'Get maximum commandable position')),
+    ('TNR?', ('qtnr', 'Get number of record tables')),
+    ('TRO', ('tro', 'Set trigger output state')),
+    ('TRO?', ('qtro', 'Get trigger output state')),
+    ('TRS?', ('qtrs', 'Indicate reference switch')),
+    ('VEL', ('vel', 'Set closed-loop velocity')),
+    ('VEL?', ('qvel', 'Get closed-loop velocity')),
+    ('VER?', ('qver', 'Get versions of firmware and drivers')),
+    ('WAV', ('wav', 'Set waveform definition')),
+    ('WAV?', ('qwav', 'Get waveform definition')),
+    ('WGC', ('wgc', 'Set number of wave generator cycles')),
+    ('WGC?', ('qwgc', 'Get number of wave generator cycles')),
+    ('WGO', ('wgo', 'Set wave generator start/stop mode')),
+    ('WGO?', ('qwgo', 'Get wave generator start/stop mode')),
+    ('WPA', ('wpa', 'Save parameters to non-volatile memory')),
+    ('WSL', ('wsl', 'Set connection of wave table to wave generator')),
+    ('WSL?', ('qwsl', 'Get connection of wave table to wave generator')),
+    ('WTR', ('wtr', 'Set wave generator table rate')),
+    ('WTR?', ('qwtr', 'Get wave generator table rate')),
+])
+
+
+class SimHandler(BaseRequestHandler):
+    """Execute the received commands with the SimController of the server and send the answers."""
+
+    def handle(self):
+        """Receive commands until the client disconnects."""
+        debug('SimHandler: client connected')
+        rcvbuf = ''
+        try:
+            while True:
+                received = self.request.recv(4096)
+                if not received:
+                    break
+                cmds, rcvbuf = splitcommands(rcvbuf + received.decode('cp1252', 'ignore'))
+                for cmd in cmds:
+                    self.server.link.transfer(len(cmd))
+                    answer = self.server.controller.execute(cmd)
+                    if answer is not None:
+                        self.server.link.send(self.request, answer.encode('cp1252'))
+        except (IOError, OSError) as exc:
+            debug('SimHandler: %s', exc)
+        debug('SimHandler: client disconnected')
+
+
+class SimLink(object):
+    """Delay and throttle the transfer of commands and answers like a serial line."""
+
+    def __init__(self, latency=0., baudrate=None):
+        """Delay and throttle the transfer of commands and answers.
+        @param latency : Delay in seconds before each answer is sent.
+        @param baudrate : Transfer rate in baud with 10 bits per byte or None for no throttling.
+        """
+        self.latency = float(latency)
+        self.baudrate = baudrate
+
+    def transfer(self, numbytes):
+        """Wait until 'numbytes' have been transferred to the controller."""
+        if self.baudrate:
+            sleep(numbytes * 10. / self.baudrate)
+
+    def send(self, conn, data):
+        """Send 'data' with the configured latency and transfer rate via socket 'conn'."""
+        if self.latency:
+            sleep(self.latency)
+        if not self.baudrate:
+            conn.sendall(data)
+            return
+        chunksize = max(1, int(self.baudrate / 10000.))  # bytes per millisecond
+        start = clock()
+        for pos in range(0, len(data), chunksize):
+            conn.sendall(data[pos:pos + chunksize])
+            delay = start + (pos + chunksize) * 10. / self.baudrate - clock()
+            if delay > 0:
+                sleep(delay)
+
+
+class SimServer(object):
+    """Serve a SimController over TCP/IP, can be used as context manager."""
+
+    def __init__(self, controller=None, host='localhost', port=50000, latency=0., baudrate=None):
+        """Serve 'controller' over TCP/IP.
+        @type controller : SimController
+        @param host : IP address to listen on as string.
+        @param port : Port to listen on as integer.
+        @param latency : Delay in seconds before each answer is sent.
+        @param baudrate : Transfer rate in baud with 10 bits per byte or None for no throttling.
+        """
+        debug('create an instance of SimServer(host=%r, port=%s)', host, port)
+        ThreadingTCPServer.allow_reuse_address = True
+        self._server = ThreadingTCPServer((host, port), SimHandler)
+        self._server.daemon_threads = True
+        self._server.controller = controller or SimController()
+        self._server.link = SimLink(latency, baudrate)
+        self._thread = Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __str__(self):
+        return 'SimServer(address=%r, controller=%s)' % (self._server.server_address, self.controller)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def controller(self):
+        """Return the served SimController."""
+        return self._server.controller
+
+    @property
+    def port(self):
+        """Return the port the server listens on as integer."""
+        return self._server.server_address[1]
+
+    @property
+    def latency(self):
+        """Delay in seconds before each answer is sent."""
+        return self._server.link.latency
+
+    @latency.setter
+    def latency(self, value):
+        """Set the delay in seconds before each answer is sent."""
+        self._server.link.latency = float(value)
+
+    @property
+    def baudrate(self):
+        """Transfer rate in baud with 10 bits per byte or None for no throttling."""
+        return self._server.link.baudrate
+
+    @baudrate.setter
+    def baudrate(self, value):
+        """Set the transfer rate in baud with 10 bits per byte or None for no throttling."""
+        self._server.link.baudrate = value
+
+    def close(self):
+        """Shut down server and close connection."""
+        debug('SimServer.close')
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    """Serve a simulated controller until the process is interrupted."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve a simulated PI controller over TCP/IP.')
+    parser.add_argument('--host', default='localhost', help='IP address to listen on')
+    parser.add_argument('--port', type=int, default=50000, help='TCP/IP port to listen on')
+    parser.add_argument('--axes', nargs='+', default=['1'], help='axis names')
+    parser.add_argument('--servotime', type=float, default=SERVOTIME, help='servo cycle time in seconds')
+    parser.add_argument('--latency', type=float, default=0., help='delay in seconds before each answer')
+    parser.add_argument('--baudrate', type=int, help='throttle the transfer to this baud rate')
+    args = parser.parse_args()
+    controller = SimController(axes=args.axes, servotime=args.servotime)
+    with SimServer(controller, args.host, args.port, args.latency, args.baudrate) as server:
+        print('serving %s, press CTRL+C to stop' % server)
+        try:
+            while True:
+                sleep(1)
+        except KeyboardInterrupt:
+            pass
+    debug('SimServer stopped')
+
+
+if __name__ == '__main__':
+    main()
@@ -82,6 +82,7 @@ if __name__ == '__main__':
               'pipython.interfaces.gcsdll',
               'pipython.interfaces.pigateway',
               'pipython.pidevice',
+              'pipython.pidevice.aio',
               'pipython.pidevice.common',
               'pipython.pidevice.gcs2',
               'pipython.pidevice.interfaces',
@@ -0,0 +1,164 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of AsyncGCSDevice against the simulated controller and a slow blocking gateway."""
+
+import asyncio
+import unittest
+from time import perf_counter, sleep
+
+try:
+    from pipython.pidevice import GCSError
+    from pipython.pidevice.aio import AsyncGCSDevice
+    from pipython.pidevice.interfaces.pigateway import PIGateway
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.aio import AsyncGCSDevice
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pigateway import PIGateway
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+DELAY = 0.2
+
+
+class SlowGateway(PIGateway):
+    """Answer from a SimController, read() blocks for 'delay' seconds like a slow transfer of PIUSB without
+    reader thread.
+    """
+
+    def __init__(self):
+        self._controller = SimController()
+        self._answers = []
+        self.delay = 0.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return 'SlowGateway()'
+
+    @property
+    def timeout(self):
+        return 7000
+
+    def settimeout(self, value):
+        pass
+
+    @property
+    def connected(self):
+        return True
+
+    @property
+    def connectionid(self):
+        return 0
+
+    def send(self, msg):
+        answer = self._controller.execute(msg)
+        if answer is not None:
+            self._answers.append(answer.encode())
+
+    def read(self):
+        if not self._answers:
+            return b''
+        sleep(self.delay)
+        return self._answers.pop(0)
+
+    def flush(self):
+        self._answers = []
+
+    def close(self):
+        pass
+
+
+def run(coro):
+    """Run 'coro' in a new event loop and return its result."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAsyncDevice(unittest.TestCase):
+    """AsyncGCSDevice over TCP/IP against SimServer."""
+
+    def setUp(self):
+        self.server = SimServer(SimController(), port=0)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_move(self):
+        async def move():
+            async with await AsyncGCSDevice.connecttcpip(port=self.server.port) as pidevice:
+                self.assertEqual(pidevice.axes, ['1'])
+                await pidevice.SVO('1', True)
+                await pidevice.FRF('1')
+                while not (await pidevice.qFRF('1'))['1']:
+                    await asyncio.sleep(0.01)
+                await pidevice.MOV('1', 0.5)
+                await pidevice.waitontarget('1', timeout=10, polldelay=0.01)
+                return (await pidevice.qPOS('1'))['1']
+        self.assertAlmostEqual(run(move()), 0.5, places=3)
+
+    def test_error(self):
+        async def move():
+            async with await AsyncGCSDevice.connecttcpip(port=self.server.port) as pidevice:
+                await pidevice.MOV('1', 0.5)  # servo is off
+        with self.assertRaises(GCSError):
+            run(move())
+
+
+class TestExecutorTransport(unittest.TestCase):
+    """AsyncGCSDevice with a synchronous gateway whose read() blocks."""
+
+    def test_overlap(self):
+        async def query(pidevice):
+            return await pidevice.qIDN()
+
+        async def overlap():
+            gateways = [SlowGateway(), SlowGateway()]
+            pidevices = [await AsyncGCSDevice.connectgateway(gateway) for gateway in gateways]
+            for gateway in gateways:
+                gateway.delay = DELAY
+            start = perf_counter()
+            await query(pidevices[0])
+            single = perf_counter() - start
+            start = perf_counter()
+            answers = await asyncio.gather(*[query(pidevice) for pidevice in pidevices])
+            both = perf_counter() - start
+            for pidevice in pidevices:
+                await pidevice.close()
+            return answers, single, both
+
+        answers, single, both = run(overlap())
+        self.assertEqual(answers[0], answers[1])
+        self.assertGreaterEqual(single, DELAY)
+        self.assertLess(both, 1.5 * single)  # sequential queries would take twice as long
+
+    def test_loop_not_blocked(self):
+        async def ticks(stop):
+            count = 0
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                count += 1
+            return count
+
+        async def query():
+            gateway = SlowGateway()
+            pidevice = await AsyncGCSDevice.connectgateway(gateway)
+            gateway.delay = DELAY
+            stop = asyncio.Event()
+            ticker = asyncio.ensure_future(ticks(stop))
+            await pidevice.qIDN()
+            stop.set()
+            await pidevice.close()
+            return await ticker
+
+        self.assertGreater(run(query()), DELAY / 0.01 / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of the wave table upload in bunches."""
+
+import random
+import unittest
+
+try:
+    from pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from pipython.pidevice.gcs2.gcs2waveupload import formatwavepoints, getbunches, readwavetable, uploadwavepoints
+    from pipython.pidevice.gcsmessages import GCSMessages
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2waveupload import formatwavepoints, getbunches, \
+        readwavetable, uploadwavepoints
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsmessages import GCSMessages
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+
+def getcommand(points, wavetable, start, stop):
+    """Return the "WAV" command line of the bunch 'start':'stop' as sent by uploadwavepoints()."""
+    return 'WAV %s %s PNT %d %d %s\n' % (wavetable, '&' if start else 'X', start + 1, stop - start,
+                                         ' '.join(points[start:stop]))
+
+
+class TestGetBunches(unittest.TestCase):
+    """Bunches fit into the maximum command length and are as large as possible."""
+
+    def check(self, points, wavetable, maxcmdlen, bunchsize=None):
+        bunches = getbunches(points, wavetable, maxcmdlen, bunchsize)
+        self.assertEqual(bunches[0][0], 0)
+        self.assertEqual(bunches[-1][1], len(points))
+        for (_, stop), (start, _) in zip(bunches, bunches[1:]):
+            self.assertEqual(stop, start)
+        for start, stop in bunches:
+            self.assertLessEqual(len(getcommand(points, wavetable, start, stop)), maxcmdlen)
+            if bunchsize:
+                self.assertLessEqual(stop - start, bunchsize)
+            if stop < len(points) and (not bunchsize or stop - start < bunchsize):  # the next point does not fit
+                self.assertGreater(len(getcommand(points, wavetable, start, stop + 1)), maxcmdlen)
+        return bunches
+
+    def test_lengths(self):
+        rand = random.Random(4711)
+        for numpoints in (1, 9, 10, 99, 100, 1000, 12345):
+            points = formatwavepoints([rand.uniform(-1E3, 1E3) for _ in range(numpoints)], '.12g')
+            for maxcmdlen in (64, 100, 1024):
+                self.check(points, 1, maxcmdlen)
+                self.check(points, 12, maxcmdlen, bunchsize=3)
+
+    def test_exact_fit(self):
+        points = ['1.5'] * 10
+        maxcmdlen = len(getcommand(points, 1, 0, 4))
+        self.assertEqual(self.check(points, 1, maxcmdlen)[0], (0, 4))
+
+    def test_point_too_long(self):
+        with self.assertRaises(ValueError):
+            getbunches(['1' * 100], 1, maxcmdlen=64)
+
+
+class TestUpload(unittest.TestCase):
+    """Upload to the simulated controller and read back."""
+
+    def setUp(self):
+        self.server = SimServer(SimController(), port=0)
+        self.gateway = PISocket(port=self.server.port)
+        self.pidevice = GCS2Commands(GCSMessages(self.gateway))
+
+    def tearDown(self):
+        self.gateway.close()
+        self.server.close()
+
+    def test_upload(self):
+        wavepoints = [0.001 * i for i in range(500)]
+        self.assertGreater(uploadwavepoints(self.pidevice, 1, wavepoints, maxcmdlen=256, verify=True), 1)
+        readback = readwavetable(self.pidevice, 1, len(wavepoints))
+        self.assertEqual(len(readback), len(wavepoints))
+        for expected, value in zip(wavepoints, readback):
+            self.assertAlmostEqual(expected, value, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
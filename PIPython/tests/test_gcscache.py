@@ -0,0 +1,222 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of the capability and parameter caches."""
+
+import shutil
+import tempfile
+import unittest
+
+try:
+    from pipython.pidevice import GCSError
+    from pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from pipython.pidevice.gcscache import CapabilityCache, ParamCache, ParamCacheMessages
+    from pipython.pidevice.gcsmessages import GCSMessages
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2device import GCS2Device
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcscache import CapabilityCache, ParamCache, \
+        ParamCacheMessages
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsmessages import GCSMessages
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+
+class TestCapabilityCache(unittest.TestCase):
+    """Restore capabilities and keep the cached stage names up to date."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = CapabilityCache(self.directory)
+        self.server = SimServer(SimController(), port=0)
+        self.gateway = PISocket(port=self.server.port)
+        self.pidevice = GCS2Commands(GCSMessages(self.gateway))
+
+    def tearDown(self):
+        self.gateway.close()
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def test_restore(self):
+        caps = self.pidevice.restorecapabilities(self.cache)
+        self.assertEqual(caps['stages'], {'1': 'V-524.1AA'})
+        self.assertEqual(self.cache.load(self.pidevice.qIDN()), caps)
+        self.assertEqual(GCS2Commands(GCSMessages(self.gateway)).restorecapabilities(self.cache), caps)
+
+    def test_cst_clears_entry(self):
+        self.pidevice.restorecapabilities(self.cache)
+        self.pidevice.CST('1', 'M-111.1DG')
+        self.assertIsNone(self.cache.load(self.pidevice.qIDN()))
+        caps = self.pidevice.restorecapabilities(self.cache)
+        self.assertEqual(caps['stages'], {'1': 'M-111.1DG'})
+
+    def test_close_keeps_entry(self):
+        pidevice = GCS2Device(gateway=PISocket(port=self.server.port))
+        caps = pidevice.restorecapabilities(self.cache)
+        idn = pidevice.qIDN().strip()
+        pidevice.close()  # closes the gateway
+        self.assertEqual(self.cache.load(idn), caps)
+        del pidevice.axes  # no KeyError after close()
+
+
+class TestParamCache(unittest.TestCase):
+    """Answer qSPA(), qSEP() and qHPA() from the cache and remove values changed by the controller."""
+
+    def setUp(self):
+        self.server = SimServer(SimController(), port=0)
+        self.gateway = PISocket(port=self.server.port)
+        self.pidevice = GCS2Commands(GCSMessages(self.gateway))
+        self.pidevice.paramcache = True
+        self.paramcache = self.pidevice.paramcache
+
+    def tearDown(self):
+        self.gateway.close()
+        self.server.close()
+
+    def assertCached(self, func, *args):
+        """Assert that func(*args) is answered from the cache and return its answer."""
+        hits = self.paramcache.stats['hits']
+        answer = func(*args)
+        self.assertGreater(self.paramcache.stats['hits'], hits)
+        return answer
+
+    def assertNotCached(self, func, *args):
+        """Assert that func(*args) is read from the controller and return its answer."""
+        misses = self.paramcache.stats['misses']
+        answer = func(*args)
+        self.assertGreater(self.paramcache.stats['misses'], misses)
+        return answer
+
+    def test_lookup(self):
+        answer = self.assertNotCached(self.pidevice.qSPA, ['1', '1'], [0x0A, 0x3C])
+        self.assertEqual(answer, {'1': {0x0A: 250., 0x3C: 'V-524.1AA'}})
+        self.assertEqual(self.assertCached(self.pidevice.qSPA, ['1', '1'], [0x0A, 0x3C]), answer)
+        self.assertEqual(self.assertCached(self.pidevice.qSPA, '1', 0x3C), {'1': {0x3C: 'V-524.1AA'}})
+        self.assertIsInstance(self.pidevice.qSPA('1', 0x0A)['1'][0x0A], float)
+
+    def test_hpa(self):
+        answer = self.pidevice.qHPA()
+        self.assertEqual(self.paramcache.hpa, answer)
+        self.server.close()  # no communication for a cached answer
+        self.assertEqual(self.pidevice.qHPA(), answer)
+
+    def test_spa(self):
+        self.pidevice.qSPA('1', 0x0A)
+        self.pidevice.SPA('1', 0x0A, 0.75)  # float values are read again, the controller may round them
+        self.assertEqual(self.assertNotCached(self.pidevice.qSPA, '1', 0x0A), {'1': {0x0A: 0.75}})
+
+    def test_wpa_rpa(self):
+        self.assertEqual(self.pidevice.qSEP('1', 0x0A), {'1': {0x0A: 250.}})
+        self.pidevice.SPA('1', 0x0A, 0.75)
+        self.pidevice.WPA('100')
+        self.assertEqual(self.assertNotCached(self.pidevice.qSEP, '1', 0x0A), {'1': {0x0A: 0.75}})
+        self.pidevice.SPA('1', 0x0A, 0.5)
+        self.pidevice.qSPA('1', 0x0A)
+        self.pidevice.RPA('1', 0x0A)
+        self.assertEqual(self.assertNotCached(self.pidevice.qSPA, '1', 0x0A), {'1': {0x0A: 0.75}})
+
+    def test_cst(self):
+        self.pidevice.qSPA('1', 0x3C)
+        self.pidevice.CST('1', 'M-111.1DG')
+        self.assertEqual(self.assertNotCached(self.pidevice.qSPA, '1', 0x3C), {'1': {0x3C: 'M-111.1DG'}})
+
+    def test_batch(self):
+        self.pidevice.qSPA('1', 0x0A)
+        with self.pidevice.batch():
+            self.pidevice.SPA('1', 0x0A, 0.5)
+            self.assertEqual(self.pidevice.qSPA('1', 0x0A), {'1': {0x0A: 0.5}})  # sends the queued command first
+
+    def test_failing_spa(self):
+        self.pidevice.qSPA('1', 0x0A)
+        with self.assertRaises(GCSError):
+            self.pidevice.SPA('1', 0x0A, 'abc')
+        self.assertNotCached(self.pidevice.qSPA, '1', 0x0A)
+
+    def test_disable(self):
+        msgs = self.pidevice._msgs  # Access to a protected member pylint: disable=W0212
+        self.assertIsInstance(msgs, ParamCacheMessages)
+        self.pidevice.errcheck = False  # passed to the wrapped messages object
+        self.assertFalse(msgs.messages.errcheck)
+        self.pidevice.paramcache = None
+        self.assertIs(self.pidevice._msgs, msgs.messages)  # Access to a protected member pylint: disable=W0212
+
+
+class FakeMessages(object):
+    """Messages object that records the sent commands and answers "SPA?" with 'answer'."""
+
+    def __init__(self):
+        self.errcheck = True
+        self.inbatch = False
+        self.sent = []
+        self.answer = ''
+
+    def send(self, tosend):
+        """Record 'tosend'."""
+        self.sent.append(tosend)
+
+    def read(self, tosend, gcsdata=0):
+        """Record 'tosend' and return 'answer'."""
+        self.sent.append(tosend)
+        return self.answer
+
+
+class TestParamCacheMessages(unittest.TestCase):
+    """Cache values of integer parameters after SPA and SEP and remove the values changed by other commands."""
+
+    def setUp(self):
+        self.msgs = FakeMessages()
+        self.paramcache = ParamCache()
+        intparams = (0x16000200,)
+        self.cached = ParamCacheMessages(self.msgs, self.paramcache,
+                                         lambda param, value: int(value) if int(param, 0) in intparams else None)
+
+    def lookup(self, memory, item, param):
+        answer = self.paramcache.lookup(memory, [item], [param])
+        return None if answer is None else answer[item][param]
+
+    def test_intvalues(self):
+        self.cached.send('SPA 1 0x16000200 1024 1 0xA 0.5')
+        self.assertEqual(self.lookup('SPA', '1', 0x16000200), '1024')
+        self.assertIsNone(self.lookup('SPA', '1', 0x0A))
+        self.assertEqual(self.cached.read('SPA? 1 0x16000200'), '1 0x16000200=1024\n')
+        self.assertEqual(self.msgs.sent, ['SPA 1 0x16000200 1024 1 0xA 0.5'])
+
+    def test_sep(self):
+        self.paramcache.update('SPA', {'1': {0x16000200: '1'}})
+        self.cached.send('SEP 100 1 0x16000200 1024')
+        self.assertIsNone(self.lookup('SPA', '1', 0x16000200))
+        self.assertEqual(self.lookup('SEP', '1', 0x16000200), '1024')
+
+    def test_not_confirmed(self):
+        for errcheck, inbatch in ((False, False), (True, True)):
+            self.paramcache.update('SPA', {'1': {0x16000200: '1'}})
+            self.msgs.errcheck, self.msgs.inbatch = errcheck, inbatch
+            self.cached.send('SPA 1 0x16000200 1024')
+            self.assertIsNone(self.lookup('SPA', '1', 0x16000200))
+
+    def test_invalidate(self):
+        cmds = (('WPA 100', 'SEP', '1', 0x0A), ('WPA 100 1 0xA', 'SEP', '1', 0x0A), ('DPA 100 1 0xA', 'SPA', '1', 0x0A),
+                ('RPA', 'SPA', '2', 0x0B), ('RPA 1 0xA', 'SPA', '1', 0x0A), ('INI 1', 'SPA', '1', 0x0B),
+                ('CST 1 M-111.1DG', 'SPA', '1', 0x3C), ('SAI 1 X', 'SEP', '2', 0x0A), ('RBT', 'SEP', '1', 0x0A))
+        for cmd, memory, item, param in cmds:
+            for mem in ('SPA', 'SEP'):
+                self.paramcache.update(mem, {'1': {0x0A: '0.5', 0x0B: '1', 0x3C: 'V-524.1AA'},
+                                             '2': {0x0A: '0.5', 0x0B: '1'}})
+            self.cached.send(cmd)
+            self.assertIsNone(self.lookup(memory, item, param), cmd)
+            if cmd.split()[0] in ('RPA', 'INI', 'CST') and len(cmd.split()) > 1:
+                self.assertEqual(self.lookup(memory, '2', 0x0A), '0.5', cmd)  # other items are kept
+
+    def test_readall(self):
+        self.msgs.answer = '1 0x16000200=1024 \n1 0x3C=M-111.1DG\n'
+        self.assertEqual(self.cached.read('SPA?'), self.msgs.answer)
+        self.assertEqual(self.lookup('SPA', '1', 0x3C), 'M-111.1DG')
+        self.assertEqual(self.cached.read('SPA? 1 0x3C'), '1 0x3C=M-111.1DG\n')
+        self.assertEqual(self.msgs.sent, ['SPA?'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of GCSDaemon against the simulated controller."""
+
+import socket
+import unittest
+
+try:
+    from pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from pipython.pidevice.gcsdaemon import STATUS, SUBSCRIBE, GCSDaemon, GCSSubscriber
+    from pipython.pidevice.gcsmessages import GCSMessages
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsdaemon import STATUS, SUBSCRIBE, GCSDaemon, GCSSubscriber
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsmessages import GCSMessages
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+
+def readline(conn, rcvbuf):
+    """Receive from 'conn' until 'rcvbuf' contains a complete line and return (line, rest)."""
+    while '\n' not in rcvbuf:
+        received = conn.recv(4096)
+        if not received:
+            raise IOError('connection closed')
+        rcvbuf += received.decode('cp1252')
+    line, rest = rcvbuf.split('\n', 1)
+    return line, rest
+
+
+class MuteSocket(PISocket):
+    """PISocket that drops all answers while 'mute' is True."""
+
+    mute = False
+
+    def read(self):
+        received = super(MuteSocket, self).read()
+        return b'' if self.mute else received
+
+
+class TestGCSDaemon(unittest.TestCase):
+    """Clients and subscribers of a GCSDaemon connected to SimServer."""
+
+    def setUp(self):
+        self.server = SimServer(SimController(), port=0)
+        self.gateway = MuteSocket(port=self.server.port)
+        self.daemon = GCSDaemon(self.gateway, port=0, pollinterval=0.01)
+        self.daemon.start()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.daemon.close()
+        self.gateway.close()
+        self.server.close()
+
+    def connect(self):
+        conn = socket.create_connection(self.daemon.address)
+        conn.settimeout(5.)
+        self.clients.append(conn)
+        return conn
+
+    def test_client(self):
+        with PISocket(port=self.daemon.address[1]) as gateway:
+            pidevice = GCS2Commands(GCSMessages(gateway))
+            self.assertEqual(pidevice.axes, ['1'])
+            pidevice.SVO('1', True)
+            self.assertTrue(pidevice.qSVO('1')['1'])
+        self.assertIn('*IDN?\n', self.daemon.cache)
+
+    def test_failing_query(self):
+        conn = self.connect()
+        self.gateway.settimeout(200)
+        self.gateway.mute = True
+        conn.sendall(b'POS?\n')
+        line, rcvbuf = readline(conn, '')
+        self.assertEqual(line, '')  # answered instead of leaving the client blocking
+        self.gateway.mute = False
+        conn.sendall(b'ERR?\n')
+        line, _ = readline(conn, rcvbuf)
+        self.assertNotEqual(int(line), 0)
+
+    def test_subscribe_and_query(self):
+        conn = self.connect()
+        conn.sendall(('%s\n' % SUBSCRIBE).encode('cp1252'))
+        rcvbuf = ''
+        for _ in range(50):
+            conn.sendall(b'POS?\n')
+            while True:
+                line, rcvbuf = readline(conn, rcvbuf)
+                if not line.startswith(STATUS):
+                    break
+                self.assertEqual(len(line.split()), 3)
+            self.assertTrue(line.startswith('1='), line)
+
+    def test_subscriber(self):
+        with GCSSubscriber(port=self.daemon.address[1]) as subscriber:
+            _, positions, _ = subscriber.read(timeout=5.)
+        self.assertEqual(list(positions), ['1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of DaisyChain against simulated controllers behind one link."""
+
+from collections import OrderedDict
+import unittest
+
+try:
+    from pipython.pidevice import GCSError
+    from pipython.pidevice.gcsdaisychain import DaisyChain, getaddressed
+    from pipython.pidevice.interfaces.pigateway import PIGateway
+    from pipython.pitools.simcontroller import SimController
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsdaisychain import DaisyChain, getaddressed
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pigateway import PIGateway
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController
+
+
+class ChainGateway(PIGateway):
+    """Simulated daisy chain. The answers of each write are grouped by controller in reverse order of the
+    addressed controllers, continuation lines of controller 2 carry the address prefix, those of the others do not.
+    """
+
+    def __init__(self, deviceids):
+        self.controllers = dict((deviceid, SimController(devname='C-863.11 %d' % deviceid)) for deviceid in deviceids)
+        self.unaddressed = []  # lines that no controller of a real chain would execute
+        self.failsend = False
+        self._rcvbuf = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return 'ChainGateway()'
+
+    @property
+    def timeout(self):
+        return 1000
+
+    def settimeout(self, value):
+        pass
+
+    @property
+    def connected(self):
+        return True
+
+    @property
+    def connectionid(self):
+        return 0
+
+    def send(self, msg):
+        if self.failsend:
+            raise IOError('link lost')
+        answers = OrderedDict()  # {address: answers in the order of the commands}
+        for line in msg.splitlines():
+            address, _, cmd = line.partition(' ')
+            if not address.isdigit() or int(address) not in self.controllers:
+                self.unaddressed.append(line)
+                continue
+            cmd = chr(int(cmd[1:])) if cmd.startswith('#') else cmd + '\n'
+            answer = self.controllers[int(address)].execute(cmd)
+            if answer is not None:
+                lines = answer.splitlines(True)
+                answers.setdefault(address, []).append(''.join('0 %s %s' % (address, text) if not i or address == '2' else text
+                                       for i, text in enumerate(lines)))
+        self._rcvbuf += ''.join(''.join(answers[address]) for address in reversed(answers)).encode()
+
+    def read(self):
+        received, self._rcvbuf = self._rcvbuf, b''
+        return received
+
+    def flush(self):
+        self._rcvbuf = b''
+
+    def close(self):
+        pass
+
+
+class TestDaisyChain(unittest.TestCase):
+    """Demultiplexing, batches and error handling of a daisy chain."""
+
+    def setUp(self):
+        self.gateway = ChainGateway([1, 2, 3])
+        self.chain = DaisyChain(self.gateway)
+        self.devices = dict((deviceid, self.chain.device(deviceid)) for deviceid in (1, 2, 3))
+        for pidevice in self.devices.values():
+            pidevice.SVO('1', True)
+            pidevice.FRF('1')
+        for pidevice in self.devices.values():
+            while not pidevice.qFRF('1')['1']:
+                pass
+
+    def tearDown(self):
+        self.chain.close()
+
+    def test_getaddressed(self):
+        self.assertEqual(getaddressed(2, 'POS?'), '2 POS?\n')
+        self.assertEqual(getaddressed(2, chr(24)), '2 #24\n')
+
+    def test_demux(self):
+        for deviceid, pidevice in self.devices.items():
+            self.assertIn(', C-863.11 %d,' % deviceid, pidevice.qIDN())
+        self.devices[1].MOV('1', 0.25)
+        self.devices[3].MOV('1', 0.75)
+        self.assertAlmostEqual(self.devices[1].qMOV('1')['1'], 0.25)
+        self.assertAlmostEqual(self.devices[3].qMOV('1')['1'], 0.75)
+        while any(pidevice.IsMoving('1')['1'] for pidevice in self.devices.values()):
+            pass
+        positions = self.chain.poll()
+        self.assertEqual(list(positions), [1, 2, 3])
+        self.assertAlmostEqual(positions[1]['1'], 0.25, places=3)
+        self.assertAlmostEqual(positions[3]['1'], 0.75, places=3)
+
+    def test_multiline(self):
+        for pidevice in self.devices.values():
+            self.assertEqual(pidevice.qHLP(), self.devices[1].qHLP())
+            self.assertGreater(len(pidevice.qHLP().splitlines()), 10)
+
+    def test_batch(self):
+        for locate in (False, True):
+            with self.devices[2].batch(locate):
+                self.devices[2].MOV('1', 0.1)
+                self.devices[2].VEL('1', 5.)
+            self.assertAlmostEqual(self.devices[2].qMOV('1')['1'], 0.1)
+            self.assertEqual(self.gateway.unaddressed, [])
+
+    def test_failing_batch(self):
+        for locate in (False, True):
+            with self.assertRaises(GCSError):
+                with self.devices[2].batch(locate):
+                    self.devices[2].MOV('1', 0.1)
+                    self.devices[2].MOV('9', 0.1)  # unknown axis
+            self.assertFalse(self.devices[2]._msgs.inbatch)  # Access to a protected member pylint: disable=W0212
+            self.assertEqual(self.gateway.unaddressed, [])
+            self.devices[2].MOV('1', 0.2)  # sent immediately, not queued
+            self.assertAlmostEqual(self.devices[2].qMOV('1')['1'], 0.2)
+
+    def test_unknown_device(self):
+        with self.assertRaises(ValueError):
+            self.chain.poll(deviceids=[4])
+
+    def test_failing_write(self):
+        self.gateway.failsend = True
+        with self.assertRaises(GCSError):
+            self.devices[1].qPOS('1')
+        self.gateway.failsend = False
+        self.assertIn('1', self.devices[1].qPOS('1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
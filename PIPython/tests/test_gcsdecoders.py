@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of the fast decoders against the generic parser of gcscommands_helpers."""
+
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from pipython.pidevice.common import gcscommands_helpers
+    from pipython.pidevice.common.gcsdecoders import decodeoneitem, decodetwoitems, decodevalue, decodevalues
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.common import gcscommands_helpers
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.common.gcsdecoders import decodeoneitem, decodetwoitems, \
+        decodevalue, decodevalues
+
+# (answer, items, itemconv, valueconv, decoded by the fast path)
+ONEITEM = [
+    ('1=12.345678\n2=-0.5\n', ['1', '2'], None, [float], True),
+    ('1=12.345678\n2=-0.5\n', None, str, [float], True),
+    ('1 = 0.5 \n2=1e-3\n', None, str, [float], True),
+    ('1=1\n2=0\n3=True\n', None, str, [bool], True),
+    ('1=0x1F\n2=17\n', None, str, [int], True),
+    ('A=M-111.1DG\n', None, None, [str], True),
+    ('A=M-111.1DG\n', None, None, [None], True),
+    ('1=1\n', None, int, [bool], True),
+    ('1=1 2 3\n', ['1'], None, [float], False),  # several values
+    ('1=0.5\n\n2=0.25\n', None, str, [float], False),  # blank line
+    ('1=0.5\n', ['1'], None, [True], False),  # automatic conversion
+    ('1=0.5\n', ['1'], None, [float, int], False),
+]
+
+# (answer, items1, items2, itemconv, valueconv, decoded by the fast path)
+TWOITEMS = [
+    ('1 0x1=0.5\n1 0x2=3\n', ['1'], [1, 2], [str, int], [float], True),
+    ('1 0x1=0.5\n2 0x1=0.25\n', [], [], [str, int], [float], True),
+    ('1 0x3C=M-111.1DG\n', ['1'], [0x3c], [str, int], [None], True),
+    ('1 0x3C=M-111.1DG\n', [], [], [str, int], [str], True),
+    ('1 1=1\n1 2=0\n', [], [], [str, int], [bool], True),
+    ('1 0x1=1 2\n', [], [], [str, int], [float], False),  # several values
+    ('1 0x1=0.5\n2 0x1=0.25\n', ['1', '2'], [1], [str, int], [float], False),  # items do not fit
+]
+
+
+def generic_oneitem(answer, items, itemconv, valueconv):
+    """Return the result of getdict_oneitem() without fast path."""
+    with mock.patch.object(gcscommands_helpers, 'decodeoneitem', return_value=None):
+        return gcscommands_helpers.getdict_oneitem(answer, items, itemconv, valueconv)
+
+
+def generic_twoitems(answer, items1, items2, itemconv, valueconv):
+    """Return the result of getdict_twoitems() without fast path."""
+    with mock.patch.object(gcscommands_helpers, 'decodetwoitems', return_value=None):
+        return gcscommands_helpers.getdict_twoitems(answer, items1, items2, list(itemconv), valueconv)
+
+
+class TestDecoders(unittest.TestCase):
+    """The fast decoders return the same values and types as the generic parser or None."""
+
+    def assertSameTypes(self, first, second):
+        """Assert equal dictionaries with equal types of keys and values."""
+        self.assertEqual(first, second)
+        self.assertEqual(list(first.keys()), list(second.keys()))
+        for key in first:
+            self.assertIs(type(key), type([other for other in second if other == key][0]))
+            if isinstance(first[key], dict):
+                self.assertSameTypes(first[key], second[key])
+            else:
+                self.assertIs(type(first[key]), type(second[key]))
+
+    def test_oneitem(self):
+        for answer, items, itemconv, valueconv, fast in ONEITEM:
+            decoded = decodeoneitem(answer, items, itemconv, valueconv)
+            self.assertEqual(decoded is not None, fast, answer)
+            expected = generic_oneitem(answer, items, itemconv, valueconv)
+            self.assertSameTypes(gcscommands_helpers.getdict_oneitem(answer, items, itemconv, valueconv), expected)
+
+    def test_twoitems(self):
+        for answer, items1, items2, itemconv, valueconv, fast in TWOITEMS:
+            decoded = decodetwoitems(answer, items1, items2, itemconv, valueconv)
+            self.assertEqual(decoded is not None, fast, answer)
+            if fast:
+                self.assertSameTypes(decoded, generic_twoitems(answer, items1, items2, itemconv, valueconv))
+
+    def test_errors(self):
+        for answer, valueconv in (('1=2\n', [bool]), ('1=abc\n', [float]), ('1=0.5\n', [int])):
+            with self.assertRaises(ValueError):
+                generic_oneitem(answer, None, str, valueconv)
+            with self.assertRaises(ValueError):
+                decodeoneitem(answer, None, str, valueconv)
+
+    def test_values(self):
+        self.assertEqual(decodevalue('1=0.5\n'), generic_oneitem('1=0.5\n', None, str, [float])['1'])
+        self.assertIsNone(decodevalue('1=0.5\n2=0.25\n'))
+        self.assertIsNone(decodevalue('1=0.5 1\n'))
+        self.assertEqual(decodevalues('1=0.5\n2=0.25\n'), (['1', '2'], [0.5, 0.25]))
+        self.assertEqual(decodevalues('1=1\n2=0\n', bool), (['1', '2'], [True, False]))
+        self.assertIsNone(decodevalues('1=1 2\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
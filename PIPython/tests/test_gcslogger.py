@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of the background GCSLogger."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from pipython.pidevice.gcslogger import RECEIVED, SENT, GCSLogger, readlog
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcslogger import RECEIVED, SENT, GCSLogger, readlog
+
+
+class TestGCSLogger(unittest.TestCase):
+    """Text and binary log files, rotation and dropped records."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, 'gcs.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_text(self):
+        with GCSLogger(self.filepath) as logger:
+            logger.log(SENT, 0, 'POS?\n')
+            logger.log(RECEIVED, 0, b'1=0.5\n')
+            logger.log(SENT, 0, chr(5))
+        with open(self.filepath, 'rb') as fobj:
+            self.assertEqual(fobj.read().decode().splitlines(), ['POS?', '  1=0.5', '\\x05'])
+
+    def test_binary(self):
+        with GCSLogger(self.filepath, binary=True) as logger:
+            logger.log(SENT, 3, 'POS?\n')
+            logger.log(RECEIVED, 3, b'1=0.5\n')
+        with GCSLogger(self.filepath, binary=True) as logger:  # appended without second header
+            logger.log(SENT, 4, b'\x05')
+        records = list(readlog(self.filepath))
+        self.assertEqual([record[1:] for record in records],
+                         [(SENT, 3, b'POS?\n'), (RECEIVED, 3, b'1=0.5\n'), (SENT, 4, b'\x05')])
+        self.assertEqual([record[0] for record in records], sorted(record[0] for record in records))
+
+    def test_readlog_text(self):
+        with GCSLogger(self.filepath) as logger:
+            logger.log(SENT, 0, 'POS?\n')
+        with self.assertRaises(ValueError):
+            list(readlog(self.filepath))
+
+    def test_rotation(self):
+        with GCSLogger(self.filepath, maxbytes=100, backups=2) as logger:
+            for i in range(100):
+                logger.log(SENT, 0, 'MOV 1 %d\n' % i)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['gcs.log', 'gcs.log.1', 'gcs.log.2'])
+        for name in os.listdir(self.directory):
+            self.assertLess(os.path.getsize(os.path.join(self.directory, name)), 120)
+        with open(self.filepath) as fobj:
+            self.assertEqual(fobj.read().splitlines()[-1], 'MOV 1 99')
+
+    def test_dropped(self):
+        with GCSLogger(self.filepath, binary=True, maxrecords=10) as logger:
+            for i in range(1000):
+                logger.log(SENT, 0, 'MOV 1 %d\n' % i)
+            self.assertTrue(logger.flush())
+            self.assertGreater(logger.dropped, 0)
+            logger.log(SENT, 0, 'POS?\n')  # logged again after the writer caught up
+        self.assertEqual(len(list(readlog(self.filepath))), 1001 - logger.dropped)
+
+
+if __name__ == '__main__':
+    unittest.main()
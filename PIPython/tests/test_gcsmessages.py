@@ -0,0 +1,65 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of the command batches of GCSMessages against the simulated controller."""
+
+import unittest
+
+try:
+    from pipython.pidevice import GCSError
+    from pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from pipython.pidevice.gcsmessages import GCSMessages
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2commands import GCS2Commands
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsmessages import GCSMessages
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+
+class TestBatch(unittest.TestCase):
+    """Batches of set commands with a single error check."""
+
+    def setUp(self):
+        self.server = SimServer(SimController(), port=0)
+        self.gateway = PISocket(port=self.server.port)
+        self.msgs = GCSMessages(self.gateway)
+        self.pidevice = GCS2Commands(self.msgs)
+        self.pidevice.SVO('1', True)
+        self.pidevice.FRF('1')
+        while not self.pidevice.qFRF('1')['1']:
+            pass
+
+    def tearDown(self):
+        self.gateway.close()
+        self.server.close()
+
+    def test_batch(self):
+        with self.pidevice.batch():
+            self.pidevice.MOV('1', 0.1)
+            self.assertTrue(self.msgs.inbatch)
+        self.assertFalse(self.msgs.inbatch)
+        self.assertAlmostEqual(self.pidevice.qMOV('1')['1'], 0.1)
+
+    def test_failing_batch(self):
+        for locate in (False, True):
+            with self.assertRaises(GCSError):
+                with self.pidevice.batch(locate):
+                    self.pidevice.MOV('1', 0.1)
+                    self.pidevice.MOV('9', 0.1)  # unknown axis
+            self.assertFalse(self.msgs.inbatch)
+            self.pidevice.MOV('1', 0.2)  # sent immediately, not queued
+            self.assertAlmostEqual(self.pidevice.qMOV('1')['1'], 0.2)
+
+    def test_nested_batch(self):
+        with self.pidevice.batch():
+            with self.pidevice.batch():
+                self.pidevice.MOV('1', 0.3)
+            self.assertTrue(self.msgs.inbatch)
+        self.assertFalse(self.msgs.inbatch)
+        self.assertAlmostEqual(self.pidevice.qMOV('1')['1'], 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
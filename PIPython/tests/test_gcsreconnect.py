@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of ReconnectingDevice against the simulated controller."""
+
+import socket
+import unittest
+
+try:
+    from pipython.pidevice import GCSError, gcserror
+    from pipython.pidevice.gcsdevice import GCSDevice
+    from pipython.pidevice.gcsreconnect import ReconnectingDevice
+    from pipython.pidevice.interfaces.pisocket import PISocket
+    from pipython.pitools.simcontroller import SimController, SimServer
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError, gcserror
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsdevice import GCSDevice
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsreconnect import ReconnectingDevice
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.interfaces.pisocket import PISocket
+    from PI_ScopeFoundry.PIPython.pipython.pitools.simcontroller import SimController, SimServer
+
+
+class TestReconnectingDevice(unittest.TestCase):
+    """Record the configuration, reconnect after a lost link and restore the configuration."""
+
+    def setUp(self):
+        self.servers = [SimServer(SimController(), port=0)]
+        self.available = True
+        self.pidevice = ReconnectingDevice(self.connect, heartbeat=None, retryinterval=0.05, waitreconnect=5.)
+        self.pidevice.SVO('1', True)
+        self.pidevice.FRF('1')
+        while not self.pidevice.qFRF('1')['1']:
+            pass
+
+    def tearDown(self):
+        self.pidevice.close()
+        for server in self.servers:
+            server.close()
+
+    def connect(self):
+        if not self.available:
+            raise IOError('controller switched off')
+        return GCSDevice(gateway=PISocket(port=self.servers[-1].port))
+
+    def breaklink(self):
+        """Shut down the socket of the connected device like a pulled cable."""
+        self.pidevice.device.dll._socket.shutdown(socket.SHUT_RDWR)  # Access to a protected member pylint: disable=W0212
+        with self.assertRaises((GCSError, IOError, OSError)):
+            self.pidevice.qPOS('1')
+        self.assertIsNotNone(self.pidevice.status['lasterror'])
+
+    def test_record(self):
+        self.pidevice.VEL('1', 2.5)
+        with self.assertRaises(GCSError):
+            with self.pidevice.batch():
+                self.pidevice.VEL('1', 1.5)
+                self.pidevice.MOV('9', 0.1)  # unknown axis
+        with self.pidevice.batch():
+            self.pidevice.RON('1', False)
+        self.assertEqual(list(self.pidevice.snapshot.items()),
+                         [(('SVO', '1'), True), (('VEL', '1'), 2.5), (('RON', '1'), False)])
+
+    def test_restore(self):
+        self.pidevice.VEL('1', 2.5)
+        self.breaklink()
+        controller = self.servers[-1].controller
+        controller.execute('SVO 1 0\n')  # e.g. reset by another client while the link was lost
+        controller.execute('VEL 1 1.0\n')
+        self.assertTrue(self.pidevice.qSVO('1')['1'])  # waits for the reconnect
+        self.assertAlmostEqual(self.pidevice.qVEL('1')['1'], 2.5)
+        self.assertEqual(self.pidevice.status['reconnects'], 1)
+        self.assertTrue(self.pidevice.status['referenced'])
+        self.assertTrue(self.pidevice.connected)
+
+    def test_lost_reference(self):
+        self.servers.append(SimServer(SimController(), port=0))  # power cycled controller
+        self.breaklink()
+        self.assertFalse(self.pidevice.qFRF('1')['1'])
+        self.assertFalse(self.pidevice.status['referenced'])
+        self.assertTrue(self.pidevice.qSVO('1')['1'])
+
+    def test_unavailable(self):
+        self.pidevice._settings['waitreconnect'] = 0.2  # Access to a protected member pylint: disable=W0212
+        self.available = False
+        self.breaklink()
+        with self.assertRaises(GCSError) as context:
+            self.pidevice.qPOS('1')
+        self.assertEqual(context.exception.val, gcserror.E_4_NOT_CONNECTED_ERROR)
+        self.assertFalse(self.pidevice.connected)
+        self.available = True
+        self.pidevice._settings['waitreconnect'] = 5.  # Access to a protected member pylint: disable=W0212
+        self.assertIn('1', self.pidevice.qPOS('1'))
+        self.assertEqual(self.pidevice.status['reconnects'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of the priorities of PriorityLock."""
+
+from threading import Thread, current_thread
+from time import sleep
+import unittest
+
+try:
+    from pipython.pidevice import GCSError
+    from pipython.pidevice.gcsscheduler import DIAGNOSTIC, EMERGENCY, MOTION, POLL, PriorityLock, getpriority
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pidevice import GCSError
+    from PI_ScopeFoundry.PIPython.pipython.pidevice.gcsscheduler import DIAGNOSTIC, EMERGENCY, MOTION, POLL, \
+        PriorityLock, getpriority
+
+
+def waitfor(condition, timeout=5.):
+    """Wait until 'condition()' is True."""
+    for _ in range(int(timeout / 0.001)):
+        if condition():
+            return
+        sleep(0.001)
+    raise AssertionError('condition not met within %s seconds' % timeout)
+
+
+class TestPriorityLock(unittest.TestCase):
+    """Handover order, reentrance, limits and interrupted waits."""
+
+    def setUp(self):
+        self.lock = PriorityLock()
+        self.acquired = []
+
+    def numwaiting(self):
+        return len(self.lock._waiting)  # Access to a protected member pylint: disable=W0212
+
+    def startwaiter(self, name, priority):
+        """Start a thread that acquires the lock with 'priority' and wait until it is queued."""
+        numwaiting = self.numwaiting()
+
+        def run():
+            with self.lock(priority):
+                self.acquired.append(name)
+
+        thread = Thread(target=run, name=name)
+        thread.start()
+        waitfor(lambda: self.numwaiting() > numwaiting)
+        return thread
+
+    def test_getpriority(self):
+        self.assertEqual(getpriority('STP\n'), EMERGENCY)
+        self.assertEqual(getpriority(chr(24)), EMERGENCY)
+        self.assertEqual(getpriority('MOV 1 1.0\n'), MOTION)
+        self.assertEqual(getpriority('POS? 1\n'), POLL)
+        self.assertEqual(getpriority(chr(5)), POLL)
+        self.assertEqual(getpriority('HLP?\n'), DIAGNOSTIC)
+
+    def test_handover_order(self):
+        self.lock.acquire()
+        threads = [self.startwaiter(name, priority) for name, priority in (
+            ('diagnostic', DIAGNOSTIC), ('poll', POLL), ('motion1', MOTION), ('emergency', EMERGENCY),
+            ('motion2', MOTION))]
+        self.lock.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.acquired, ['emergency', 'motion1', 'motion2', 'poll', 'diagnostic'])
+        self.assertEqual(self.numwaiting(), 0)
+
+    def test_reentrant(self):
+        with self.lock(POLL):
+            with self.lock(MOTION):
+                thread = self.startwaiter('other', MOTION)
+            self.assertEqual(self.acquired, [])
+        thread.join()
+        self.assertEqual(self.acquired, ['other'])
+
+    def test_unbounded_by_default(self):
+        self.lock.acquire()
+        threads = [self.startwaiter('poll%d' % i, POLL) for i in range(20)]
+        self.lock.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.acquired), 20)
+
+    def test_maxwaiting(self):
+        self.lock = PriorityLock(maxwaiting={POLL: 1})
+        self.lock.acquire()
+        thread = self.startwaiter('poll', POLL)
+        errors = []
+
+        def run():
+            try:
+                self.lock.acquire(POLL)
+            except GCSError as exc:
+                errors.append(exc)
+
+        other = Thread(target=run)
+        other.start()
+        other.join()
+        self.assertEqual(len(errors), 1)
+        self.lock.release()
+        thread.join()
+        self.assertEqual(self.acquired, ['poll'])
+
+    def test_interrupted_wait(self):
+        cond = self.lock._cond  # Access to a protected member pylint: disable=W0212
+        wait = cond.wait
+
+        def interruptingwait(*args):
+            if current_thread().name == 'interrupted':
+                raise KeyboardInterrupt()
+            return wait(*args)
+
+        cond.wait = interruptingwait
+        interrupted = []
+
+        def run():
+            try:
+                self.lock.acquire(EMERGENCY)
+            except KeyboardInterrupt:
+                interrupted.append(True)
+
+        self.lock.acquire()
+        waiter = self.startwaiter('poll', POLL)
+        thread = Thread(target=run, name='interrupted')
+        thread.start()
+        thread.join()
+        self.assertEqual(interrupted, [True])
+        self.assertEqual(self.numwaiting(), 1)
+        self.lock.release()
+        waiter.join()
+        self.assertEqual(self.acquired, ['poll'])
+        with self.lock:  # not owned by the interrupted thread
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests of PositionFeed and PositionReader, skipped without numpy or Python 3.8."""
+
+import multiprocessing
+import os
+import unittest
+
+try:
+    from pipython.pitools import positionfeed
+except ImportError:
+    from PI_ScopeFoundry.PIPython.pipython.pitools import positionfeed
+
+try:
+    positionfeed._checkrequirements()  # Access to a protected member pylint: disable=W0212
+except ImportError as exc:
+    raise unittest.SkipTest(str(exc))
+
+
+def readlatest(name, queue):
+    """Put the latest sample of the feed 'name' into 'queue', runs in another process."""
+    with positionfeed.PositionReader(name) as reader:
+        queue.put(reader.latest())
+
+
+class TestPositionFeed(unittest.TestCase):
+    """Publish samples and read them in this and in another process."""
+
+    def setUp(self):
+        self.name = 'pipython_test_%d' % os.getpid()
+        self.feed = positionfeed.PositionFeed(self.name, axes=['1', '2'], capacity=8)
+        self.reader = positionfeed.PositionReader(self.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.feed.close()
+
+    def test_latest(self):
+        self.assertIsNone(self.reader.latest())
+        self.assertEqual(self.reader.axes, ['1', '2'])
+        self.feed.publish({'1': 1.5, '2': -2.5}, {'1': True, '2': False}, timestamp=10.)
+        self.assertEqual(self.reader.latest(), (10., {'1': 1.5, '2': -2.5}, {'1': True, '2': False}))
+        self.feed.publish([0.5, 0.25], timestamp=11.)
+        self.assertEqual(self.reader.latest(), (11., {'1': 0.5, '2': 0.25}, {'1': None, '2': None}))
+        self.assertEqual(self.reader.count, 2)
+
+    def test_recent(self):
+        for i in range(20):  # wraps around the ring buffer of 8 slots
+            self.feed.publish([i, -i], [True, True], timestamp=float(i))
+        timestamps, positions, ontarget = self.reader.recent(5)
+        self.assertEqual(timestamps.tolist(), [15., 16., 17., 18., 19.])
+        self.assertEqual(positions[:, 1].tolist(), [-15., -16., -17., -18., -19.])
+        self.assertEqual(ontarget.tolist(), [[1., 1.]] * 5)
+        self.assertEqual(len(self.reader.recent(100)[0]), 8)
+
+    def test_other_process(self):
+        self.feed.publish([1.25, 2.5], [True, False], timestamp=12.)
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=readlatest, args=(self.name, queue))
+        process.start()
+        self.assertEqual(queue.get(timeout=30), (12., {'1': 1.25, '2': 2.5}, {'1': True, '2': False}))
+        process.join()
+
+    def test_not_a_feed(self):
+        with self.assertRaises((ValueError, OSError)):
+            positionfeed.PositionReader(self.name + '_missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,13 +25,15 @@ class PI_CG_Device(object):
         self.axis = axis
         self.pi_device = GCSDevice()                       
         self.pi_device.ConnectUSB (serial)
+        caps = self.pi_device.restorecapabilities()
 
         self.set_servo(mode = True)
         self.gotoRefSwitch()
         self.pi_device.RON(self.axis, True) 
         # self.set_home()    already done in the gotoRefSwitch
         self.direction = 1 # to be used for backslash correction (sign of the direction, +1 or -1)
-        self.name = self.pi_device.qCST()[axis]
+        # stage names are only cached if the controller supports qCST
+        self.name = caps['stages'].get(axis) or (self.pi_device.qCST(axis)[axis] if self.pi_device.HasqCST() else '')
         
     def get_info(self):
         # info  = f'{self.pi_device.qIDN()}'
@@ -87,6 +89,11 @@ class PI_CG_Device(object):
         position = self.pi_device.qPOS(self.axis)[self.axis]    
         return position
     
+    def get_snapshot(self):
+        # position, velocity and servo state with a single round trip and one error check
+        self.wait_on_target()
+        return self.pi_device.GetSnapshot(self.axis, fields=('position', 'velocity', 'servo'))[self.axis]
+
     def set_home(self):
         self.pi_device.DFH(self.axis)
         
@@ -6,6 +6,7 @@ Created on Tue Jun 21 12:45:26 2021
 """
 
 from pipython import GCSDevice, pitools
+from pipython.pidevice.gcsreconnect import ReconnectingDevice
 import time
 from numpy import sign
 import warnings
@@ -24,15 +25,23 @@ class PI_VC_Device(object):
     def __init__(self, serial='0000000000', axis='1'):
         self.serial = serial
         self.axis = axis
-        self.pi_device = GCSDevice()
-        self.pi_device.ConnectUSB(serial)
+        # reconnects in the background if the USB link drops and restores servo, velocity and trigger
+        # settings without a new reference move
+        self.pi_device = ReconnectingDevice(self.connect)
 
         self.set_servo(mode=True)
         self.gotoRefSwitch()
         self.pi_device.RON(self.axis, True)
         self.home = 0;    #already done in the gotoRefSwitch
         self.direction = 1  # to be used for backslash correction (sign of the direction, +1 or -1)
-        self.name = self.pi_device.qCST()[axis]
+        # stage names are only cached if the controller supports qCST
+        self.name = self.caps['stages'].get(axis) or (self.pi_device.qCST(axis)[axis] if self.pi_device.HasqCST() else '')
+
+    def connect(self):
+        pi_device = GCSDevice()
+        pi_device.ConnectUSB(self.serial)
+        self.caps = pi_device.restorecapabilities()
+        return pi_device
 
     def get_info(self):
         # info  = f'{self.pi_device.qIDN()}'
@@ -93,6 +102,12 @@ class PI_VC_Device(object):
         print('real position: ', f"{self.pi_device.qPOS(self.axis)[self.axis]:.6f}")
         return position
 
+    def get_snapshot(self):
+        # position, velocity and servo state with a single round trip and one error check
+        self.wait_on_target()
+        snapshot = self.pi_device.GetSnapshot(self.axis, fields=('position', 'velocity', 'servo'))[self.axis]
+        return snapshot._replace(position=snapshot.position - self.home)
+
     def set_home(self):
         self.home = self.pi_device.qPOS(self.axis)[self.axis]
         # print('home position: ', self.home)
@@ -103,7 +118,7 @@ class PI_VC_Device(object):
     #     return home
 
     def go_home(self):
-        pitools.moveandwait(self.pi_device, self.axis, self.home)
+        pitools.moveandwait(self.pi_device.device, self.axis, self.home)
 
     def stop(self):
         self.pi_device.HLT(self.axis)
@@ -151,30 +166,33 @@ class PI_VC_Device(object):
 
     '''given a start and stop position there will be a trigger every step'''
     def trigger(self, trigger_step, trigger_start, trigger_stop, ch, ch_tot):        
-        self.trigger_disable(ch_tot)
+        # all set commands are sent with a single write and a single error check
+        with self.pi_device.batch():
+            self.trigger_disable(ch_tot)
 
-        # trigger output conditions configuration
-        self.pi_device.CTO(ch, 2, 1)
-        self.pi_device.CTO(ch, 3, 0)
-        self.pi_device.CTO(ch, 1, trigger_step)
-        self.pi_device.CTO(ch, 8, trigger_start)
-        self.pi_device.CTO(ch, 9, trigger_stop)
+            # trigger output conditions configuration
+            self.pi_device.CTO(ch, 2, 1)
+            self.pi_device.CTO(ch, 3, 0)
+            self.pi_device.CTO(ch, 1, trigger_step)
+            self.pi_device.CTO(ch, 8, trigger_start)
+            self.pi_device.CTO(ch, 9, trigger_stop)
 
-        # enable the condition for trigger output
-        self.pi_device.TRO(ch, 1)
+            # enable the condition for trigger output
+            self.pi_device.TRO(ch, 1)
 
     '''given a start position and an end position le trigger will remain high between these two value'''
     def trigger_start(self, trigger_start, trigger_stop, ch, ch_tot):
-        self.trigger_disable(ch_tot)
+        with self.pi_device.batch():
+            self.trigger_disable(ch_tot)
 
-        # trigger output conditions configuration
-        self.pi_device.CTO(ch, 2, 1)
-        self.pi_device.CTO(ch, 3, 3)
-        self.pi_device.CTO(ch, 5, trigger_start)
-        self.pi_device.CTO(ch, 6, trigger_stop)
+            # trigger output conditions configuration
+            self.pi_device.CTO(ch, 2, 1)
+            self.pi_device.CTO(ch, 3, 3)
+            self.pi_device.CTO(ch, 5, trigger_start)
+            self.pi_device.CTO(ch, 6, trigger_stop)
 
-        # enable the condition for trigger output
-        self.pi_device.TRO(ch, 1)
+            # enable the condition for trigger output
+            self.pi_device.TRO(ch, 1)
 
     def trigger_disable(self, ch_tot):
         for i in range(1, ch_tot):
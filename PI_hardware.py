@@ -49,6 +49,12 @@ class PI_HW(HardwareComponent):
         self.add_operation('Stop', self.stop)
         self.add_operation('GotoRefSwitch', self.gotoRefSwitch)
         
+        # opt-in latency statistics per GCS command, saved as CSV or JSON (according to the file extension)
+        self.instrumentation = self.settings.New(name='instrumentation', initial=False, dtype=bool)
+        self.latency_stats = self.settings.New(name='latency_stats', dtype=str, ro=True)
+        self.stats_file = self.settings.New(name='stats_file', dtype=str, initial='pi_stats.csv')
+        self.add_operation('SaveStats', self.save_stats)
+        
         
     def connect(self):
         # connect settings to Device methods
@@ -68,10 +74,25 @@ class PI_HW(HardwareComponent):
         self.servo.hardware_set_func = self.motor.set_servo        
         self.servo.hardware_read_func = self.motor.get_servo        
         
+        self.instrumentation.hardware_set_func = self.set_instrumentation
+        self.latency_stats.hardware_read_func = self.get_latency_stats
+        self.set_instrumentation(self.instrumentation.val)
+        
         # self.home.hardware_read_func = self.motor.get_home
         
         self.read_from_hardware()
         
+    def read_from_hardware(self):
+        # position, velocity and servo are read with a single round trip instead of one per setting
+        if not hasattr(self, 'motor'):
+            return
+        snapshot = self.motor.get_snapshot()
+        self.position.update_value(snapshot.position, update_hardware=False)
+        self.velocity.update_value(snapshot.velocity, update_hardware=False)
+        self.servo.update_value(snapshot.servo, update_hardware=False)
+        self.info.read_from_hardware()
+        self.latency_stats.read_from_hardware()
+        
     def disconnect(self):
         if hasattr(self, 'motor'):
             self.motor.close() 
@@ -95,6 +116,26 @@ class PI_HW(HardwareComponent):
         self.motor.move_relative(self.step.value)
         self.position.read_from_hardware()
         
+    def set_instrumentation(self, enable):
+        # keep the statistics collected so far if the instrumentation is already enabled
+        if not enable:
+            self.motor.pi_device.stats = None
+        elif not self.motor.pi_device.stats:
+            self.motor.pi_device.stats = True
+        
+    def get_latency_stats(self):
+        stats = self.motor.pi_device.stats
+        return stats.totext(maxrows=10) if stats else ''
+        
+    def save_stats(self):
+        if not hasattr(self, 'motor') or not self.motor.pi_device.stats:
+            self.log.warning('instrumentation is not enabled, statistics are not saved')
+            return
+        if self.stats_file.val.lower().endswith('.json'):
+            self.motor.pi_device.stats.tojson(self.stats_file.val)
+        else:
+            self.motor.pi_device.stats.tocsv(self.stats_file.val)
+        
     def gotoRefSwitch(self):
         self.motor.gotoRefSwitch()
           
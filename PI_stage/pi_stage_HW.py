@@ -1,8 +1,10 @@
 from ScopeFoundry import HardwareComponent
 from collections import OrderedDict
 from ScopeFoundry.helper_funcs import sibling_path
+import logging
 import time
 from pipython import GCSDevice, pitools, GCSError, gcserror
+from pipython.pitools.positionfeed import PositionFeed
 
 from qtpy import QtCore
 import threading
@@ -11,6 +13,9 @@ from _tracemalloc import stop
 default_axes = OrderedDict(
     [(1,'x')])
 
+# suffix of the axis setting for each field of the status snapshot returned by GetSnapshot()
+SNAPSHOT_SETTINGS = {'position': '_position', 'ontarget': '_on_target', 'velocity': '_velocity', 'servo': '_servo'}
+
 class PIStage(HardwareComponent):
     
     name = 'pi_stage'
@@ -26,6 +31,19 @@ class PIStage(HardwareComponent):
         
         #self.settings.New('port', dtype=str, initial='')
         
+        # optional: poll position and motion with the single character commands #3 and #5,
+        # on target is confirmed with ONT? when an axis stops
+        self.settings.New("fast_poll", dtype=bool, initial=False, ro=False)
+        self.settings.New("poll_interval", dtype=float, unit='s', si=False, spinbox_decimals=3,
+                          initial=0.05, vmin=0.001, ro=False)
+        
+        # name of the shared memory block the polled positions are published to, read them in other processes
+        # with pitools.positionfeed.PositionReader, empty to disable
+        self.settings.New("position_feed", dtype=str, initial='', ro=False)
+        self.position_feed = None  # PositionFeed while connected, read_snapshot() runs before it is created
+        
+        # query functions, parameter types, axes and stages at connect instead of restoring them from the cache
+        self.settings.New("refresh_capabilities", dtype=bool, initial=False, ro=False)
         
         for ax_num, ax_name in self.axes.items():
             
@@ -63,6 +81,7 @@ class PIStage(HardwareComponent):
         self.gcs = GCSDevice(S.controller.val)        
         self.gcs.ConnectRS232(comport=8, baudrate=38400)
         #self.gcs.ConnectUSB(serialnum='0135500849')
+        self.gcs.restorecapabilities(refresh=S.refresh_capabilities.val)
         print(self.gcs.qPOS(self.gcs.axes)['1'])
         if S.initial_ref_mode.val != 'None':
             pitools.startup(self.gcs, stages=S.stage.val, refmode=S.ref_mode.val)
@@ -91,7 +110,6 @@ class PIStage(HardwareComponent):
             lq.connect_to_hardware(
                 read_func = lambda n=ax_num: self.gcs.qPOS()[str(n)]
                 )
-            lq.read_from_hardware()
             
             lq = S.get_lq(ax_name + "_target")
             lq.connect_to_hardware(
@@ -105,23 +123,28 @@ class PIStage(HardwareComponent):
                 read_func  = lambda n=ax_num: self.gcs.qSVO()[str(n)],
                 write_func = lambda enable, n=ax_num: self.gcs.SVO(n, enable )
                 )
-            lq.read_from_hardware()
             
             lq = S.get_lq(ax_name + "_on_target")
             lq.connect_to_hardware(
                 read_func  = lambda n=ax_num: self.gcs.qONT()[str(n)],
                 )
-            lq.read_from_hardware()
             
             lq = S.get_lq(ax_name + "_velocity")
             lq.connect_to_hardware(
                 read_func  = lambda n=ax_num: self.gcs.qVEL()[str(n)],
                 write_func = lambda new_vel, n=ax_num: self.gcs.VEL(n, new_vel )
                 )
-            lq.read_from_hardware()
             
+        # position, servo, on target and velocity of all axes are read with a single round trip
+        self.read_snapshot()
         
         
+        self.fast_poll_supported = self.gcs.HasGetPosStatus() and self.gcs.HasIsMoving()
+        self.last_error_check = time.time()
+        self.fast_poll_on_target = {}
+        self.position_feed = None
+        if self.settings['position_feed']:
+            self.position_feed = PositionFeed(self.settings['position_feed'], [str(i) for i in self.axes])
         self.update_thread_interrupted = False
         self.update_thread = threading.Thread(target=self.update_thread_run)
         self.update_thread.start()   
@@ -144,6 +167,10 @@ class PIStage(HardwareComponent):
             self.update_thread.join(timeout=1.0)
             del self.update_thread
             
+        if getattr(self, 'position_feed', None):
+            self.position_feed.close()
+            self.position_feed = None
+            
         if hasattr(self, 'gcs'):
             self.gcs.close()
             del self.gcs
@@ -157,10 +184,52 @@ class PIStage(HardwareComponent):
         
     def update_thread_run(self):
         while not self.update_thread_interrupted:
-            for ax_num, ax_name in self.axes.items():
-                self.settings.get_lq(ax_name + "_position").read_from_hardware()
-                self.settings.get_lq(ax_name + "_on_target").read_from_hardware()
-            time.sleep(0.050)
+            if self.settings['fast_poll'] and self.fast_poll_supported:
+                self.poll_fast_status()
+            else:
+                self.read_snapshot(fields=('position', 'ontarget'))
+            time.sleep(self.settings['poll_interval'])
+            
+    def read_snapshot(self, fields=None):
+        # POS?, ONT?, VEL? and SVO? are sent in a single write with one error check
+        snapshot = self.gcs.GetSnapshot(fields=fields)
+        for ax_num, ax_name in self.axes.items():
+            for field, value in snapshot[str(ax_num)]._asdict().items():
+                if value is not None:
+                    self.settings.get_lq(ax_name + SNAPSHOT_SETTINGS[field]).update_value(value, update_hardware=False)
+        fields = fields or SNAPSHOT_SETTINGS
+        if self.position_feed and 'position' in fields:
+            ontarget = [snapshot[str(i)].ontarget for i in self.axes] if 'ontarget' in fields else None
+            self.position_feed.publish([snapshot[str(i)].position for i in self.axes], ontarget)
+            
+    def poll_fast_status(self):
+        # single round trip without error check, the error is checked once per second
+        status = self.gcs.GetFastStatus()
+        recheck = time.time() - self.last_error_check > 1.0
+        ontarget = self.confirm_on_target(status, recheck)
+        for ax_num, ax_name in self.axes.items():
+            self.settings.get_lq(ax_name + "_position").update_value(status[str(ax_num)].position, update_hardware=False)
+            self.settings.get_lq(ax_name + "_on_target").update_value(ontarget[str(ax_num)], update_hardware=False)
+        if self.position_feed:
+            self.position_feed.publish([status[str(i)].position for i in self.axes], [ontarget[str(i)] for i in self.axes])
+        if recheck:
+            self.last_error_check = time.time()
+            try:
+                self.gcs.checkerror()
+            except GCSError as exc:
+                logging.warning('controller error during fast polling: %s', exc)
+
+    def confirm_on_target(self, status, recheck):
+        # not moving alone does not mean on target (servo off, stopped by HLT or error), idle axes
+        # are queried with ONT? after they stopped and once per second
+        for axis, axis_status in status.items():
+            if axis_status.moving:
+                self.fast_poll_on_target[axis] = None
+        unconfirmed = [axis for axis, axis_status in status.items()
+                       if not axis_status.moving and (recheck or self.fast_poll_on_target.get(axis) is None)]
+        if unconfirmed:
+            self.fast_poll_on_target.update(self.gcs.qONT(unconfirmed))
+        return {axis: bool(self.fast_poll_on_target.get(axis)) for axis in status}
             
     def stop(self):
         if hasattr(self, 'gcs'):
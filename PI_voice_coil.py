@@ -20,6 +20,8 @@ from PI_ScopeFoundry.PIPython.pipython.interfaces.piserial import PISerial
 from PI_ScopeFoundry.PIPython.pipython.gcsmessages import GCSMessages
 from PI_ScopeFoundry.PIPython.pipython import pitools
 from PI_ScopeFoundry.PIPython.pipython.pidevice.gcs2.gcs2pitools import startup
+from PI_ScopeFoundry.PIPython.pipython.pitools.positionfeed import PositionFeed
+import logging
 import threading
 import time
 import sys
@@ -37,6 +39,9 @@ default_axes = OrderedDict( [(1,'x')] )
 # here we use only one axis but more axes can be included...
 #self.pidevice=GCSDevice(CONTROLLERNAME)
 
+# suffix of the axis setting for each field of the status snapshot returned by GetSnapshot()
+SNAPSHOT_SETTINGS = {'position': '_position', 'ontarget': '_on_target', 'velocity': '_velocity', 'servo': '_servo'}
+
 class PIStage(HardwareComponent):
     
     def __init__(self, app, debug=False, name=None, axes=default_axes):
@@ -89,6 +94,19 @@ class PIStage(HardwareComponent):
 
         self.settings.New(ax_name + "_on_target", dtype=bool, ro=True)
 
+        # optional: poll position and motion with the single character commands #3 and #5, on target is confirmed
+        # with ONT? when an axis stops, the error is checked once per second
+        self.settings.New("fast_poll", dtype=bool, initial=False, ro=False)
+        self.settings.New("poll_interval", dtype=float, unit='s', si=False, spinbox_decimals=3, initial=0.05, vmin=0.001, ro=False)
+
+        # name of the shared memory block the polled positions are published to, read them in other processes
+        # with pitools.positionfeed.PositionReader, empty to disable
+        self.settings.New("position_feed", dtype=str, initial='', ro=False)
+        self.position_feed = None  # PositionFeed while connected, read_snapshot() runs before it is created
+
+        # query functions, parameter types, axes and stages at connect instead of restoring them from the cache
+        self.settings.New("refresh_capabilities", dtype=bool, initial=False, ro=False)
+
         #===================================================================
         # self.rangemin = self.add_logged_quantity("rangemin", dtype=float, unit='mm', ro=True)
         # self.rangemax = self.add_logged_quantity("rangemax", dtype=float, unit='mm', ro=True)
@@ -121,7 +139,7 @@ class PIStage(HardwareComponent):
 
             # self.pidevice.ConnectRS232(comport=1, baudrate=115200)
 
-            print('connected: {}'.format(self.pidevice.qIDN().strip()))
+            self.pidevice.restorecapabilities(refresh=S.refresh_capabilities.val)
 
             # Show the version info which is helpful for PI support when there
             # are any issues.
@@ -132,6 +150,9 @@ class PIStage(HardwareComponent):
             print('initialize connected stages...')
 
             startup(self.pidevice, stages=STAGES, refmodes=REFMODES)
+            # after startup(), its CST() removes the cached stage names, so they are queried again
+            caps = self.pidevice.restorecapabilities()
+            print('connected: {} {}'.format(self.pidevice.devname, caps['stages']))
             #pitools.startup(self.pidevice, stages=STAGES)
             #pitools.startup(self.pidevice, stages=None, refmodes=None, servostates=True)
             # Now we query the allowed motion range and current position of all
@@ -151,7 +172,6 @@ class PIStage(HardwareComponent):
             lq.connect_to_hardware(
                 read_func=lambda n=ax_num: self.pidevice.qPOS()[str(n)]
             )
-            lq.read_from_hardware()
 
             lq = S.get_lq(ax_name + "_target")
             # move the stage to the specified value
@@ -167,20 +187,20 @@ class PIStage(HardwareComponent):
                 read_func=lambda n=ax_num: self.pidevice.qSVO()[str(n)],
                 write_func=lambda enable, n=ax_num: self.pidevice.SVO(n, enable)
             )
-            lq.read_from_hardware()
 
             lq = S.get_lq(ax_name + "_on_target")
             lq.connect_to_hardware(
                 read_func=lambda n=ax_num: self.pidevice.qONT()[str(n)],
             )
-            lq.read_from_hardware()
 
             lq = S.get_lq(ax_name + "_velocity")
             lq.connect_to_hardware(
                 read_func=lambda n=ax_num: self.pidevice.qVEL()[str(n)],
                 write_func=lambda new_vel, n=ax_num: self.pidevice.VEL(n, new_vel)
             )
-            lq.read_from_hardware()
+
+            # position, servo, on target and velocity are read with a single round trip
+            self.read_snapshot()
             
             self.settings.frequency_periodic_motion.hardware_set_func = self.set_numpoints_from_frequency
             # lq = S.get_lq("pp_amplitude")
@@ -193,6 +213,12 @@ class PIStage(HardwareComponent):
             #     write_func=self.read_cycles,
             # )
 
+            self.fast_poll_supported = self.pidevice.HasGetPosStatus() and self.pidevice.HasIsMoving()
+            self.last_error_check = time.time()
+            self.fast_poll_on_target = {}
+            self.position_feed = None
+            if self.settings['position_feed']:
+                self.position_feed = PositionFeed(self.settings['position_feed'], [str(i) for i in self.axes])
             self.update_thread_interrupted = False
             self.update_thread = threading.Thread(target=self.update_thread_run)
             self.update_thread.start()
@@ -224,6 +250,10 @@ class PIStage(HardwareComponent):
                 self.update_thread.join(timeout=1.0)
                 del self.update_thread
 
+            if getattr(self, 'position_feed', None):
+                self.position_feed.close()
+                self.position_feed = None
+
             if hasattr(self, 'pidevice'):
                 print("closing")
                 self.pidevice.close()
@@ -246,10 +276,53 @@ class PIStage(HardwareComponent):
 
     def update_thread_run(self):
         while not self.update_thread_interrupted:
-            for ax_num, ax_name in self.axes.items():
-                self.settings.get_lq(ax_name + "_position").read_from_hardware()
-                self.settings.get_lq(ax_name + "_on_target").read_from_hardware()
-            time.sleep(0.050)
+            if self.settings['fast_poll'] and self.fast_poll_supported:
+                self.poll_fast_status()
+            else:
+                self.read_snapshot(fields=('position', 'ontarget'))
+            time.sleep(self.settings['poll_interval'])
+
+    def read_snapshot(self, fields=None):
+        '''update the axis settings with POS?, ONT?, VEL? and SVO? sent in a single write and one error check'''
+        snapshot = self.pidevice.GetSnapshot(fields=fields)
+        for ax_num, ax_name in self.axes.items():
+            for field, value in snapshot[str(ax_num)]._asdict().items():
+                if value is not None:
+                    self.settings.get_lq(ax_name + SNAPSHOT_SETTINGS[field]).update_value(value, update_hardware=False)
+        fields = fields or SNAPSHOT_SETTINGS
+        if self.position_feed and 'position' in fields:
+            ontarget = [snapshot[str(i)].ontarget for i in self.axes] if 'ontarget' in fields else None
+            self.position_feed.publish([snapshot[str(i)].position for i in self.axes], ontarget)
+
+    def poll_fast_status(self):
+        '''update position of all axes with a single round trip and no error check, on target is
+        confirmed with ONT? when an axis stops and for all idle axes once per second'''
+        status = self.pidevice.GetFastStatus()
+        recheck = time.time() - self.last_error_check > 1.0
+        ontarget = self.confirm_on_target(status, recheck)
+        for ax_num, ax_name in self.axes.items():
+            self.settings.get_lq(ax_name + "_position").update_value(status[str(ax_num)].position, update_hardware=False)
+            self.settings.get_lq(ax_name + "_on_target").update_value(ontarget[str(ax_num)], update_hardware=False)
+        if self.position_feed:
+            self.position_feed.publish([status[str(i)].position for i in self.axes], [ontarget[str(i)] for i in self.axes])
+        if recheck:
+            self.last_error_check = time.time()
+            try:
+                self.pidevice.checkerror()
+            except GCSError as exc:
+                logging.warning('controller error during fast polling: %s', exc)
+
+    def confirm_on_target(self, status, recheck):
+        '''return {axis: on target} for the fast 'status', idle axes are queried with ONT? after they stopped
+        or if 'recheck' is True, not moving alone does not mean on target (servo off, stopped by HLT or error)'''
+        for axis, axis_status in status.items():
+            if axis_status.moving:
+                self.fast_poll_on_target[axis] = None
+        unconfirmed = [axis for axis, axis_status in status.items()
+                       if not axis_status.moving and (recheck or self.fast_poll_on_target.get(axis) is None)]
+        if unconfirmed:
+            self.fast_poll_on_target.update(self.pidevice.qONT(unconfirmed))
+        return {axis: bool(self.fast_poll_on_target.get(axis)) for axis in status}
     
     def threaded_periodic_motion(self):
         thread = threading.Thread(target=self.periodic_motion)